@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'blog.routers.ReplicaMiddleware', # Request chỉ đọc dùng DB bản sao (nếu có)
     'django.contrib.sessions.middleware.SessionMiddleware',
     # 'django.middleware.locale.LocaleMiddleware', # Hỗ trợ đa ngôn ngữ
     'django.middleware.common.CommonMiddleware',
@@ -72,6 +73,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'blog.context_processors.notifications', # Thêm context processor cho notifications
                 'blog.context_processors.active_announcement', # <-- THÊM DÒNG NÀY ĐỂ KÍCH HOẠT TÍNH NĂNG THÔNG BÁO
+                'blog.context_processors.content_version', # Phiên bản nội dung cho {% cache %} trong template
             ],
         },
     },
@@ -83,13 +85,45 @@ WSGI_APPLICATION = 'Bai1.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite cho nhiều người dùng đồng thời:
+# - WAL: người đọc không chặn người ghi và ngược lại; synchronous=NORMAL là đủ an toàn với WAL
+#   (mất điện chỉ có thể mất transaction cuối, không hỏng DB) và đỡ một lần fsync mỗi commit.
+# - busy_timeout (timeout): chờ tối đa 5 giây khi DB đang bị ghi thay vì báo "database is locked" ngay.
+# - transaction_mode IMMEDIATE: transaction lấy khoá ghi ngay từ BEGIN, tránh lỗi locked không thể
+#   chờ khi hai transaction cùng đọc rồi cùng muốn nâng lên ghi.
+# - mmap_size/cache_size: đọc qua bộ nhớ ánh xạ (256 MiB) và 64 MiB page cache mỗi kết nối.
+# - CONN_MAX_AGE: giữ kết nối (và các PRAGMA đã đặt) giữa các request, kiểm tra trước khi dùng lại.
+SQLITE_INIT_COMMAND = (
+    'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; '
+    'PRAGMA mmap_size=268435456; PRAGMA cache_size=-65536; PRAGMA temp_store=MEMORY'
+)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND,
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 5,
+        },
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Bản sao chỉ đọc (blog/routers.py), vd. file SQLite do Litestream/LiteFS sao chép từ db.sqlite3.
+# Không đặt biến môi trường thì mọi truy vấn dùng DB chính như trước.
+if os.environ.get('DATABASE_REPLICA_PATH'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['DATABASE_REPLICA_PATH'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['blog.routers.PrimaryReplicaRouter']
+# Số giây người dùng vừa gửi POST/PUT/DELETE được ghim vào DB chính (đọc được dữ liệu mình vừa ghi)
+REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -171,4 +205,87 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 # Cấu hình session để hết hạn khi đóng trình duyệt nếu không chọn "Remember me"
-SESSION_EXPIRE_AT_BROWSER_CLOSE = True
\ No newline at end of file
+SESSION_EXPIRE_AT_BROWSER_CLOSE = True
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Mặc định dùng bộ nhớ cục bộ; có thể thay bằng Redis/Memcached để các tiến trình dùng chung.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'serene-default',
+    },
+    'view_counter': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'serene-view-counter',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# Alias cache dùng cho các lớp cache của blog (blog/caching.py). Mọi việc vô hiệu hoá
+# đều là tăng phiên bản trong cache này, nên khi chạy nhiều tiến trình (gunicorn
+# workers...) cần một cache dùng chung (Redis, Memcached); với LocMemCache thay đổi
+# chỉ có hiệu lực ngay trong tiến trình xử lý nó.
+BLOG_CACHE_ALIAS = 'default'
+# Số giây tối đa một tiến trình giữ announcement đang hiển thị trước khi đọc lại từ DB
+# (chặn trên cho trường hợp cache không dùng chung giữa các tiến trình).
+ANNOUNCEMENT_CACHE_TIMEOUT = 60
+# Thời gian sống (giây) của tóm tắt thông báo trong dropdown; vẫn bị vô hiệu hoá ngay khi có thay đổi.
+NOTIFICATION_SUMMARY_TIMEOUT = 300
+# Thời gian sống tối đa (giây) của trang cache cho khách và các mảnh template;
+# nội dung thay đổi thì cache bị vô hiệu hoá ngay qua phiên bản (blog/caching.py).
+PAGE_CACHE_TIMEOUT = 600
+
+# Backend tìm kiếm toàn văn cho bài viết (blog/search.py)
+BLOG_SEARCH_BACKEND = 'blog.search.SQLiteFTS5Backend'
+# Thời gian (giây) cache gợi ý live search theo tiền tố, cả phía server lẫn trình duyệt
+LIVE_SEARCH_CACHE_TIMEOUT = 60
+
+# Bộ đếm lượt xem ghi trễ (blog/view_counter.py)
+VIEW_COUNTER_CACHE = 'view_counter'
+# Số giây tối đa giữa hai lần ghi dồn lượt xem xuống DB; 0 = ghi ngay mỗi lượt xem.
+VIEW_COUNTER_FLUSH_INTERVAL = 10
+# Ghi dồn sớm khi số lượt xem đang chờ vượt quá ngưỡng này.
+VIEW_COUNTER_MAX_PENDING = 500
+# Luồng nền ghi dồn theo chu kỳ và ghi nốt khi tiến trình thoát; False = chỉ ghi trong
+# request (khi tới hạn) hoặc bằng manage.py flush_view_counts.
+VIEW_COUNTER_FLUSHER = True
+
+# Số luồng tạo thumbnail nền trong mỗi tiến trình web (blog/thumbnails.py);
+# 0 = chỉ xếp hàng, xử lý bằng manage.py process_thumbnail_jobs.
+THUMBNAIL_WORKERS = 2
+# Job "running" lâu hơn số giây này được coi là bị bỏ dở (tiến trình chết) và được xếp hàng lại.
+THUMBNAIL_JOB_TIMEOUT = 600
+
+# Upload: đếm byte và chặn file quá lớn ngay khi đọc request (blog/uploads.py),
+# sau đó file nhỏ giữ trong RAM, file lớn được ghi dần ra file tạm.
+BLOG_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'blog.uploads.UploadSizeLimitHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Hàng đợi thông báo (blog/notifications.py): số giây giữa hai lần luồng nền ghi dồn,
+# và ghi sớm khi số sự kiện đang chờ vượt ngưỡng.
+NOTIFICATION_FLUSH_INTERVAL = 2
+NOTIFICATION_MAX_PENDING = 500
+# Các like/trả lời cùng bài viết cho cùng người nhận trong khoảng này (giây) được gộp làm một.
+NOTIFICATION_COALESCE_WINDOW = 3600
+# True: ghi thông báo ngay trong request, không dùng luồng nền (chỉ cho test/chạy local).
+NOTIFICATION_QUEUE_SYNC = False
+# Thông báo đã đọc cũ hơn số ngày này bị xoá bởi manage.py purge_notifications.
+NOTIFICATION_RETENTION_DAYS = 90
+
+# Bài viết thịnh hành (blog/trending.py): điểm của mỗi like/lượt xem/bình luận giảm một nửa
+# sau TRENDING_HALF_LIFE_HOURS giờ; chỉ xét các bài đăng trong TRENDING_WINDOW_DAYS ngày.
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_WINDOW_DAYS = 7
+# Số giây giữa hai lần luồng nền tính lại bảng; 0 = chỉ tính bằng manage.py refresh_trending.
+TRENDING_REFRESH_INTERVAL = 300
+
+# Đo số truy vấn/dòng của từng view theo ngân sách @query_budget (blog/query_budget.py)
+# và ghi cảnh báo vào logger 'blog.query_budget' khi vượt; mặc định bật khi DEBUG.
+QUERY_BUDGET_CHECK = DEBUG
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import Post
 from .models import Post, ContactMessage, Announcement
+from .caching import invalidate_active_announcement
 # admin kaka13111
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
@@ -26,8 +27,11 @@ class AnnouncementAdmin(admin.ModelAdmin):
 
     def activate_announcements(self, request, queryset):
         queryset.update(is_active=True)
+        # update() không phát signal post_save nên phải tự làm mới cache
+        invalidate_active_announcement()
     activate_announcements.short_description = "Mark selected announcements as active"
 
     def deactivate_announcements(self, request, queryset):
         queryset.update(is_active=False)
+        invalidate_active_announcement()
     deactivate_announcements.short_description = "Mark selected announcements as inactive"
@@ -0,0 +1,48 @@
+"""
+Tiện ích dùng chung cho các lệnh benchmark (manage.py bench_*).
+
+Các benchmark chạy trên một cơ sở dữ liệu tạm (giống khi chạy test) nên không
+làm bẩn dữ liệu thật trong db.sqlite3.
+"""
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import connection
+
+
+@contextmanager
+def isolated_database(verbosity=0, name=None):
+    """
+    Tạo DB test tạm thời (đã migrate) và huỷ nó khi kết thúc.
+    `name`: đường dẫn file cho DB tạm (SQLite mặc định dùng DB trong bộ nhớ).
+    """
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    if name is not None:
+        test_settings['NAME'] = name
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity)
+        test_settings['NAME'] = old_test_name
+
+
+def timed(func, repeat=1):
+    """Chạy `func` `repeat` lần, trả về tổng thời gian (giây)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return time.perf_counter() - start
+
+
+def bench_user(username='bench'):
+    user, _ = User.objects.get_or_create(username=username)
+    return user
+
+
+def report(stdout, label, seconds, operations):
+    rate = operations / seconds if seconds else float('inf')
+    stdout.write(f'{label:<40} {seconds * 1000:10.1f} ms  {rate:12.0f} ops/s')
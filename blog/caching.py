@@ -0,0 +1,249 @@
+"""
+Các lớp cache dùng chung của blog.
+
+Mọi khoá đều gắn một "phiên bản": khi dữ liệu thay đổi, signal (hoặc view)
+chỉ cần tăng phiên bản, các khoá cũ tự bị bỏ qua và hết hạn dần.
+Backend cache được chọn qua settings.BLOG_CACHE_ALIAS (mặc định LocMemCache).
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+NOTIFICATION_SUMMARY_SIZE = 5
+
+
+def get_cache():
+    return caches[getattr(settings, 'BLOG_CACHE_ALIAS', 'default')]
+
+
+def get_version(key):
+    """Phiên bản hiện tại của `key`; khởi tạo theo thời gian để không trùng phiên bản cũ đã bị xoá."""
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+# --- Tóm tắt thông báo cho dropdown trên thanh điều hướng ---
+
+def _notification_version_key(user_id):
+    return f'notifications:version:{user_id}'
+
+
+def get_notification_version(user_id):
+    return get_version(_notification_version_key(user_id))
+
+
+def invalidate_notification_summary(user_id):
+    bump_version(_notification_version_key(user_id))
+
+
+def get_notification_summary(user):
+    """
+    Số thông báo chưa đọc và vài thông báo mới nhất của `user`.
+    Chỉ truy vấn DB khi người dùng có hoạt động mới kể từ lần dựng trước.
+    """
+    key = f'notifications:summary:{user.pk}:{get_notification_version(user.pk)}'
+    cache = get_cache()
+    summary = cache.get(key)
+    if summary is None:
+        summary = _build_notification_summary(user)
+        cache.set(key, summary, getattr(settings, 'NOTIFICATION_SUMMARY_TIMEOUT', 300))
+    return summary
+
+
+def _build_notification_summary(user):
+    from .models import Notification
+
+    notifications = Notification.objects.filter(recipient=user)
+    latest = notifications.order_by('-timestamp')\
+                          .values('id', 'verb', 'actor_ids', 'sender__username')[:NOTIFICATION_SUMMARY_SIZE]
+    return {
+        'unread_count': notifications.filter(read=False).count(),
+        'latest': [
+            {'id': item['id'], 'verb': item['verb'], 'sender_username': item['sender__username'],
+             'others_count': max(len(item['actor_ids']) - 1, 0)}
+            for item in latest
+        ],
+    }
+
+
+# --- Thông báo chung (Announcement) đang được kích hoạt ---
+
+ANNOUNCEMENT_VERSION_KEY = 'announcement:version'
+# (phiên bản, announcement, hạn dùng theo time.monotonic()) giữ ngay trong tiến trình
+_active_announcement = (None, None, 0.0)
+
+
+def invalidate_active_announcement():
+    bump_version(ANNOUNCEMENT_VERSION_KEY)
+
+
+def _announcement_state(announcement):
+    if announcement is None:
+        return None
+    return announcement.pk, announcement.content, announcement.level, announcement.link
+
+
+def get_active_announcement():
+    """
+    Announcement đang hiển thị (hoặc None). Kết quả được giữ trong bộ nhớ tiến trình
+    cho tới khi phiên bản trong cache thay đổi, nên các trang thông thường không tốn truy vấn nào.
+
+    Với cache không dùng chung giữa các tiến trình (LocMemCache), thay đổi ở tiến trình
+    khác không tăng phiên bản ở đây: kết quả còn được đọc lại sau tối đa
+    ANNOUNCEMENT_CACHE_TIMEOUT giây, và nếu khác trước thì phiên bản được tăng tại chỗ
+    để các trang đã cache kèm announcement cũ cũng được làm mới.
+    """
+    global _active_announcement
+    version = get_version(ANNOUNCEMENT_VERSION_KEY)
+    cached_version, announcement, expires = _active_announcement
+    now = time.monotonic()
+    if cached_version != version or now >= expires:
+        from .models import Announcement
+        fresh = Announcement.objects.filter(is_active=True).first()
+        if cached_version == version and _announcement_state(fresh) != _announcement_state(announcement):
+            invalidate_active_announcement()
+            version = get_version(ANNOUNCEMENT_VERSION_KEY)
+        announcement = fresh
+        _active_announcement = (version, announcement, now + getattr(settings, 'ANNOUNCEMENT_CACHE_TIMEOUT', 60))
+    return announcement
+
+
+# --- Cache toàn trang cho khách (chưa đăng nhập) và cache từng mảnh template ---
+# Mọi trang công khai dùng chung một "phiên bản nội dung": thay đổi ở Post, tag,
+# tên/avatar/bio tác giả... tăng phiên bản (signal trong models.py), các trang và
+# mảnh template đã cache theo phiên bản cũ tự bị bỏ qua.
+# Like và bình luận chỉ tăng phiên bản riêng của bài viết đó (trang chi tiết); số
+# like/bình luận trên thẻ ở các trang danh sách có thể trễ tối đa PAGE_CACHE_TIMEOUT giây.
+
+CONTENT_VERSION_KEY = 'content:version'
+
+
+def get_content_version():
+    return get_version(CONTENT_VERSION_KEY)
+
+
+def invalidate_content():
+    bump_version(CONTENT_VERSION_KEY)
+
+
+def _post_version_key(post_id):
+    return f'post:{post_id}:version'
+
+
+def get_post_version(post_id):
+    return get_version(_post_version_key(post_id))
+
+
+def invalidate_post(post_id):
+    """Làm mới trang chi tiết của một bài viết (like, bình luận) mà không động tới các trang khác."""
+    bump_version(_post_version_key(post_id))
+
+
+def _post_slug_key(slug):
+    return f'post:slug:{slug}'
+
+
+def post_id_for_slug(slug):
+    """id của bài viết có `slug` (None nếu không có), nhớ trong cache để trang cache không tốn truy vấn."""
+    from .models import Post
+
+    cache = get_cache()
+    post_id = cache.get(_post_slug_key(slug))
+    if post_id is None:
+        post_id = Post.objects.filter(slug=slug).values_list('id', flat=True).first()
+        if post_id is not None:
+            cache.set(_post_slug_key(slug), post_id, timeout=None)
+    return post_id
+
+
+def forget_post_slug(slug):
+    get_cache().delete(_post_slug_key(slug))
+
+
+def _page_cache_key(request, extra=''):
+    # Thanh announcement hiển thị hay không tuỳ phiên bản announcement và việc khách đã đóng nó chưa
+    announcement = get_active_announcement()
+    if announcement is None:
+        announcement_part = 'none'
+    else:
+        dismissed = request.session.get(f'dismissed_announcement_{announcement.id}', False)
+        announcement_part = f'{get_version(ANNOUNCEMENT_VERSION_KEY)}.{announcement.id}.{int(bool(dismissed))}'
+    url = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{get_content_version()}{extra}:{announcement_part}:{url}'
+
+
+def _request_cacheable(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # Trang sắp hiển thị flash message thì không được lấy từ cache (và không được cache lại)
+    return not len(messages.get_messages(request))
+
+
+def _response_cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # Trang có CSRF token gắn với từng khách, không được dùng chung
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+        and not len(messages.get_messages(request))
+    )
+
+
+def cache_anonymous_page(on_hit=None, version=None):
+    """
+    Decorator cho view công khai: với khách chưa đăng nhập, trả nguyên trang đã
+    render từ cache (khoá theo URL + phiên bản nội dung + trạng thái announcement).
+
+    View có thể gắn `response.page_cache_context` (dict) để lưu kèm; khi trang được
+    phục vụ từ cache, `on_hit(request, page_cache_context)` được gọi (vd. đếm lượt xem).
+    `version(request, *args, **kwargs)`: phần phiên bản riêng của trang thêm vào khoá
+    (vd. phiên bản của bài viết trên trang chi tiết).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _request_cacheable(request):
+                return view(request, *args, **kwargs)
+
+            cache = get_cache()
+            extra = f'.{version(request, *args, **kwargs)}' if version is not None else ''
+            key = _page_cache_key(request, extra)
+            entry = cache.get(key)
+            if entry is not None:
+                response, context = entry
+                if on_hit is not None:
+                    on_hit(request, context)
+                # Trang đã lưu kèm ETag/Last-Modified (nếu view có) thì vẫn trả được 304
+                return get_conditional_response(
+                    request,
+                    etag=response.get('ETag'),
+                    last_modified=parse_http_date_safe(response['Last-Modified']) if response.has_header('Last-Modified') else None,
+                    response=response,
+                )
+
+            response = view(request, *args, **kwargs)
+            if _response_cacheable(request, response):
+                context = getattr(response, 'page_cache_context', None)
+                cache.set(key, (response, context), getattr(settings, 'PAGE_CACHE_TIMEOUT', 600))
+            return response
+        return wrapper
+    return decorator
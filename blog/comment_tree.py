@@ -0,0 +1,55 @@
+"""
+Dựng cây bình luận lồng nhau cho trang chi tiết bài viết.
+
+Thay vì để template đệ quy gọi `comment.replies.all` (mỗi nút một truy vấn),
+toàn bộ trả lời của các bình luận gốc trong trang được lấy bằng một truy vấn
+(theo cột `root`) rồi ghép cha-con trong Python.
+
+Trạng thái "người xem đã like" là cột `liked` (Exists trên bảng trung gian) được
+annotate ngay trong các truy vấn đó, nên chỉ xét các bình luận trên trang, không
+phụ thuộc người xem đã like bao nhiêu bình luận trên toàn site.
+"""
+from django.db.models import BooleanField, Exists, OuterRef, Value
+
+from .models import Comment
+
+
+def liked_by(user):
+    """Biểu thức cho annotate(liked=...): `user` đã like bình luận hay chưa (luôn False với khách)."""
+    if not user.is_authenticated:
+        return Value(False, output_field=BooleanField())
+    likes = Comment.liked_by.through.objects.filter(comment_id=OuterRef('pk'), user_id=user.pk)
+    return Exists(likes)
+
+
+def build_comment_tree(root_comments, user=None):
+    """
+    Gắn danh sách trả lời `children` (đã sắp theo thời gian) vào từng bình luận
+    gốc trong `root_comments` và vào mọi trả lời bên dưới chúng.
+    Nếu có `user`, mỗi trả lời được gắn cờ `liked` (bình luận gốc cần được
+    annotate sẵn bằng liked_by(user)). Trả về danh sách bình luận gốc.
+    """
+    roots = list(root_comments)
+    nodes = {}
+    for comment in roots:
+        comment.children = []
+        nodes[comment.id] = comment
+    if not roots:
+        return roots
+
+    replies = Comment.objects.filter(root__in=[comment.id for comment in roots], active=True)\
+                             .select_related('author__profile')\
+                             .order_by('created', 'id')
+    if user is not None:
+        replies = replies.annotate(liked=liked_by(user))
+    replies = list(replies)
+    for reply in replies:
+        reply.children = []
+        nodes[reply.id] = reply
+
+    # Trả lời có cha không nằm trong trang hiện tại (hoặc cha đã bị ẩn) sẽ bị bỏ qua
+    for reply in replies:
+        parent = nodes.get(reply.parent_id)
+        if parent is not None:
+            parent.children.append(reply)
+    return roots
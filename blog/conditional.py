@@ -0,0 +1,74 @@
+"""
+Conditional GET (ETag / Last-Modified) cho các trang và endpoint JSON.
+
+Mỗi view khai báo một hàm tính validator thật rẻ (một truy vấn nhỏ hoặc chỉ đọc
+cache) thay vì render cả trang. Nếu trình duyệt/proxy gửi If-None-Match hoặc
+If-Modified-Since khớp, view trả 304 ngay mà không chạy.
+"""
+import hashlib
+from collections import namedtuple
+from functools import wraps
+
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .caching import ANNOUNCEMENT_VERSION_KEY, get_active_announcement, get_notification_version, get_version
+
+# context: dữ liệu tuỳ ý chuyển cho on_not_modified (vd. id bài viết để đếm lượt xem)
+Validators = namedtuple('Validators', ['etag', 'last_modified', 'context'], defaults=[None, None])
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest())
+
+
+def viewer_parts(request):
+    """
+    Phần validator phụ thuộc người xem: trang HTML còn chứa thanh điều hướng
+    (thông báo của user) và announcement, nên ETag phải đổi theo chúng.
+    """
+    user_id = request.user.pk if request.user.is_authenticated else 0
+    notifications = get_notification_version(user_id) if user_id else 0
+    # Thanh announcement bị ẩn khi người xem đã đóng nó (lưu trong session)
+    announcement = get_active_announcement()
+    dismissed = announcement is not None and request.session.get(f'dismissed_announcement_{announcement.id}', False)
+    return user_id, notifications, get_version(ANNOUNCEMENT_VERSION_KEY), int(bool(dismissed))
+
+
+def conditional_page(compute_validators, on_not_modified=None, vary_on_cookie=True):
+    """
+    Decorator: `compute_validators(request, *args, **kwargs)` trả về Validators
+    (hoặc None nếu tài nguyên không tồn tại - khi đó view chạy bình thường).
+    Response 200 được gắn ETag/Last-Modified; request khớp nhận 304.
+    `vary_on_cookie=False` cho tài nguyên giống nhau với mọi người xem (vd. JSON công khai).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # Trang còn flash message chưa hiển thị thì luôn render lại
+            if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+                return view(request, *args, **kwargs)
+
+            validators = compute_validators(request, *args, **kwargs)
+            if validators is None:
+                return view(request, *args, **kwargs)
+            last_modified = int(validators.last_modified.timestamp()) if validators.last_modified else None
+
+            response = get_conditional_response(request, etag=validators.etag, last_modified=last_modified)
+            if response is not None:
+                if on_not_modified is not None and response.status_code == 304:
+                    on_not_modified(request, validators.context)
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    if validators.etag and not response.has_header('ETag'):
+                        response['ETag'] = validators.etag
+                    if last_modified and not response.has_header('Last-Modified'):
+                        response['Last-Modified'] = http_date(last_modified)
+            if vary_on_cookie:
+                # Nội dung khác nhau theo phiên đăng nhập
+                patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -1,26 +1,27 @@
-from .models import Notification, Announcement
+from .caching import get_active_announcement, get_content_version, get_notification_summary
 
 def notifications(request):
     if request.user.is_authenticated:
-        # Lấy tất cả thông báo của người dùng, sắp xếp từ mới nhất đến cũ nhất
-        all_notifications = Notification.objects.filter(recipient=request.user)\
-                                                .select_related('sender', 'post', 'comment__post')\
-                                                .order_by('-timestamp')
-        # Đếm số thông báo chưa đọc
-        unread_count = all_notifications.filter(read=False).count()
-        # Lấy 5 thông báo gần nhất để hiển thị trong dropdown
-        latest_notifications_list = all_notifications[:5]
+        # Tóm tắt (số chưa đọc + 5 thông báo gần nhất) được cache theo phiên bản của từng user,
+        # chỉ dựng lại khi có thông báo mới / đã đọc / bị xoá
+        summary = get_notification_summary(request.user)
         return {
-            'unread_notifications_count': unread_count,
-            'latest_notifications': latest_notifications_list,
+            'unread_notifications_count': summary['unread_count'],
+            'latest_notifications': summary['latest'],
         }
     return {}
 
 def active_announcement(request):
-    announcement = Announcement.objects.filter(is_active=True).first()
+    # Lấy từ cache trong tiến trình, chỉ truy vấn lại khi announcement thay đổi
+    announcement = get_active_announcement()
     if announcement:
         # Sử dụng session để kiểm tra xem người dùng đã đóng thông báo này chưa
         dismissed_key = f'dismissed_announcement_{announcement.id}'
         if not request.session.get(dismissed_key, False):
             return {'active_announcement': announcement}
-    return {}
\ No newline at end of file
+    return {}
+
+
+def content_version(request):
+    # Dùng làm tham số vary_on của {% cache %}: mảnh template tự hết hiệu lực khi nội dung đổi
+    return {'content_version': get_content_version()}
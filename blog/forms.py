@@ -1,5 +1,6 @@
 from django import forms
 from .models import Comment, Post, Profile
+from .uploads import size_error
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
 
@@ -16,6 +17,16 @@ class PostForm(forms.ModelForm):
             'body': forms.Textarea(attrs={'class': 'form-control', 'rows': 5})
         }
 
+    def __init__(self, *args, rejected_uploads=None, **kwargs):
+        # Các file đã bị UploadSizeLimitHandler bỏ qua khi đọc request (blog/uploads.py)
+        self.rejected_uploads = rejected_uploads or {}
+        super().__init__(*args, **kwargs)
+
+    def clean_attachment(self):
+        if 'attachment' in self.rejected_uploads:
+            raise forms.ValidationError(size_error(self.rejected_uploads['attachment']))
+        return self.cleaned_data.get('attachment')
+
 
 class SearchForm(forms.ModelForm):
     q = forms.CharField(label='Search', max_length=100)
@@ -44,6 +55,15 @@ class ProfileUpdateForm(forms.ModelForm):
     class Meta:
         model = Profile
         fields = ['avatar', 'bio']
+
+    def __init__(self, *args, rejected_uploads=None, **kwargs):
+        self.rejected_uploads = rejected_uploads or {}
+        super().__init__(*args, **kwargs)
+
+    def clean_avatar(self):
+        if 'avatar' in self.rejected_uploads:
+            raise forms.ValidationError(size_error(self.rejected_uploads['avatar']))
+        return self.cleaned_data.get('avatar')
         
 class SignupForm(UserCreationForm):
     email = forms.EmailField(required=True, widget=forms.EmailInput(attrs={
@@ -0,0 +1,80 @@
+"""
+Like/unlike cho bài viết và bình luận.
+
+Không bao giờ tải toàn bộ quan hệ `liked_by`: trạng thái like được kiểm tra và
+đảo ngay trên bảng trung gian (có chỉ mục unique (đối tượng, user)), còn bộ đếm
+`likes` được cộng/trừ bằng một câu UPDATE trả về giá trị mới.
+Mỗi lần bấm like là O(1) về số truy vấn lẫn bộ nhớ.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from .caching import invalidate_post
+
+
+def toggle_like(obj, user):
+    """
+    Đảo trạng thái like của `user` với `obj` (Post hoặc Comment).
+    Trả về bộ (liked, likes): trạng thái mới và số like sau khi cập nhật.
+    """
+    model = type(obj)
+    field = model._meta.get_field('liked_by')
+    through = field.remote_field.through
+    link = {
+        f'{field.m2m_field_name()}_id': obj.pk,
+        f'{field.m2m_reverse_field_name()}_id': user.pk,
+    }
+
+    with transaction.atomic():
+        removed, _ = through.objects.filter(**link).delete()
+        if removed:
+            liked, delta = False, -1
+        else:
+            try:
+                with transaction.atomic():
+                    through.objects.create(**link)
+                liked, delta = True, 1
+            except IntegrityError:
+                # Một request song song của cùng user vừa like trước: bộ đếm đã được cộng
+                liked, delta = True, 0
+        likes = add_likes(model, obj.pk, delta)
+    # Chỉ trang chi tiết của bài viết được làm mới; số like trên thẻ ở các trang danh sách
+    # được cập nhật khi trang cache hết hạn (blog/caching.py)
+    invalidate_post(obj.pk if model._meta.model_name == 'post' else obj.post_id)
+    return liked, likes
+
+
+def supports_update_returning():
+    """
+    DB có hỗ trợ UPDATE ... RETURNING hay không. Cờ can_return_columns_from_insert của
+    Django chỉ nói về INSERT (vd. MariaDB có INSERT ... RETURNING nhưng không có UPDATE ... RETURNING).
+    """
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return connection.vendor == 'postgresql'
+
+
+def add_likes(model, pk, delta):
+    """Cộng `delta` vào cột likes của một dòng (không xuống dưới 0) và trả về giá trị mới."""
+    if delta == 0:
+        return model.objects.filter(pk=pk).values_list('likes', flat=True).get()
+
+    if supports_update_returning():
+        # UPDATE ... RETURNING: cập nhật và đọc lại trong cùng một lượt gọi DB
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        likes = quote(model._meta.get_field('likes').column)
+        pk_column = quote(model._meta.pk.column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET {likes} = CASE WHEN {likes} + %s < 0 THEN 0 ELSE {likes} + %s END '
+                f'WHERE {pk_column} = %s RETURNING {likes}',
+                [delta, delta, pk],
+            )
+            return cursor.fetchone()[0]
+
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(likes__gte=-delta)
+    queryset.update(likes=F('likes') + delta)
+    return model.objects.filter(pk=pk).values_list('likes', flat=True).get()
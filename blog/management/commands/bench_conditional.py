@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from blog.benchmarks import bench_user, isolated_database, report, timed
+from blog.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Phát lại các request lặp lại tới trang bài viết và live search, có và không có If-None-Match.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--comments', type=int, default=50)
+
+    def handle(self, *args, requests, comments, **options):
+        with isolated_database(), override_settings(ALLOWED_HOSTS=['*']):
+            author = bench_user()
+            post = Post.objects.create(author=author, title='Conditional GET benchmark', slug='conditional-get',
+                                       content='<p>benchmark</p>' * 200)
+            Comment.objects.bulk_create([Comment(post=post, author=author, body=f'Comment {i}') for i in range(comments)])
+
+            client = Client()
+            # Người dùng đã đăng nhập: không đi qua cache trang của khách, đo riêng phần validator
+            client.force_login(author)
+            for label, url in (('post_detail', post.get_absolute_url()), ('live_search', '/live-search/?q=condi')):
+                etag = client.get(url)['ETag']
+                for mode, headers in (('full', {}), ('If-None-Match', {'HTTP_IF_NONE_MATCH': etag})):
+                    sizes = []
+
+                    def replay():
+                        response = client.get(url, **headers)
+                        sizes.append(len(response.content))
+
+                    seconds = timed(replay, requests)
+                    report(self.stdout, f'{label} {mode} (x{requests})', seconds, requests)
+                    self.stdout.write(f'{"":<40} {sum(sizes) / 1024:10.1f} KiB transferred')
@@ -0,0 +1,111 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.test.utils import override_settings
+
+from blog.benchmarks import bench_user, isolated_database, report
+from blog.likes import toggle_like
+from blog.models import Comment, Post
+
+# (nhãn, OPTIONS của kết nối, journal_mode của file DB)
+MODES = [
+    ('django defaults', {}, 'DELETE'),
+    ('tuned (settings.DATABASES)', settings.DATABASES['default'].get('OPTIONS', {}), 'WAL'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Tải đồng thời (nhiều luồng đọc trang danh sách, nhiều luồng like/bình luận/đếm lượt xem) '
+            'trên một file SQLite tạm: so sánh cấu hình mặc định của Django với cấu hình trong settings.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--posts', type=int, default=50)
+
+    def handle(self, *args, readers, writers, seconds, posts, **options):
+        if connection.vendor != 'sqlite':
+            self.stderr.write('This benchmark only applies to SQLite.')
+            return
+        options_before = connection.settings_dict.get('OPTIONS', {})
+        # Luồng tạo thumbnail (avatar mặc định của user bench) sẽ giữ kết nối tới file DB tạm
+        with tempfile.TemporaryDirectory() as directory, override_settings(THUMBNAIL_WORKERS=0), \
+                isolated_database(name=os.path.join(directory, 'bench.sqlite3')):
+            author = bench_user()
+            self.users = [bench_user(f'bench{i}') for i in range(20)]
+            self.post_ids = [Post.objects.create(author=author, title=f'Bench {i}', slug=f'bench-{i}',
+                                                 content='<p>lorem ipsum</p>').id for i in range(posts)]
+            try:
+                for label, db_options, journal_mode in MODES:
+                    self.run_mode(label, db_options, journal_mode, readers, writers, seconds)
+            finally:
+                connection.close()
+                connection.settings_dict['OPTIONS'] = options_before
+
+    def run_mode(self, label, db_options, journal_mode, readers, writers, seconds):
+        # Các luồng mở kết nối mới từ chính settings_dict này
+        connection.close()
+        connection.settings_dict['OPTIONS'] = db_options
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+        connection.close()
+
+        stats = {'read': [0, 0], 'write': [0, 0]}
+        lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+        threads = [threading.Thread(target=self.worker, args=('read', seed, deadline, stats, lock))
+                   for seed in range(readers)]
+        threads += [threading.Thread(target=self.worker, args=('write', seed, deadline, stats, lock))
+                    for seed in range(writers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f'{label} ({readers} readers, {writers} writers, journal_mode={journal_mode})')
+        for kind in ('read', 'write'):
+            done, locked = stats[kind]
+            report(self.stdout, f'  {kind}s', elapsed, done)
+            self.stdout.write(f'  {kind}s failed with "database is locked": {locked}')
+
+    def worker(self, kind, seed, deadline, stats, lock):
+        rng = random.Random(seed)
+        done = locked = 0
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    if kind == 'read':
+                        list(Post.objects.for_listing().order_by('-created')[:10])
+                    else:
+                        self.write(rng)
+                    done += 1
+                except OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+                    locked += 1
+        finally:
+            connection.close()
+        with lock:
+            stats[kind][0] += done
+            stats[kind][1] += locked
+
+    def write(self, rng):
+        """Một thao tác ghi điển hình: like, bình luận hoặc ghi dồn lượt xem."""
+        post_id = rng.choice(self.post_ids)
+        action = rng.random()
+        if action < 0.5:
+            toggle_like(Post(pk=post_id), rng.choice(self.users))
+        elif action < 0.8:
+            Comment.objects.create(post_id=post_id, author=rng.choice(self.users), body='Bench comment')
+        else:
+            Post.objects.filter(pk=post_id).update(viewer=F('viewer') + 1)
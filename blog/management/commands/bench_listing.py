@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db.models import Count
+
+from blog.benchmarks import bench_user, isolated_database, report, timed
+from blog.models import Comment, Post, reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    help = 'Đo độ trễ trang danh sách bài viết: Count(\'comments\') so với cột comment_count.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, posts, comments, repeat, **options):
+        with isolated_database():
+            author = bench_user()
+            Post.objects.bulk_create([Post(author=author, title=f'Bench {i}', slug=f'bench-{i}', content='x')
+                                      for i in range(posts)], batch_size=1000)
+            post_ids = list(Post.objects.values_list('id', flat=True))
+            # bulk_create không phát signal: bộ đếm được dựng lại bằng reconcile như khi sửa lệch
+            batch = []
+            for i in range(comments):
+                batch.append(Comment(post_id=post_ids[i % len(post_ids)], author=author, body='x'))
+                if len(batch) == 10000:
+                    Comment.objects.bulk_create(batch)
+                    batch = []
+            Comment.objects.bulk_create(batch)
+            reconcile_comment_counts()
+
+            def render_page(queryset):
+                def run():
+                    page = Paginator(queryset.select_related('author__profile').order_by('-created'), 4).get_page(1)
+                    return list(page)
+                return run
+
+            annotated = Post.objects.annotate(num_comments=Count('comments'))
+            report(self.stdout, f'annotate Count (x{repeat})', timed(render_page(annotated), repeat), repeat)
+            report(self.stdout, f'comment_count column (x{repeat})', timed(render_page(Post.objects.all()), repeat), repeat)
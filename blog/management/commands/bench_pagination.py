@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+
+from blog.benchmarks import bench_user, isolated_database, report, timed
+from blog.models import Post
+from blog.pagination import CursorPaginator
+
+
+class Command(BaseCommand):
+    help = 'So sánh độ trễ trang 1 và trang sâu: Paginator (COUNT + OFFSET) và CursorPaginator.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--per-page', type=int, default=4)
+        parser.add_argument('--deep-page', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, per_page, deep_page, repeat, **options):
+        with isolated_database():
+            author = bench_user()
+            total = per_page * (deep_page + 1)
+            Post.objects.bulk_create([Post(author=author, title=f'Bench {i}', slug=f'bench-{i}', content='x')
+                                      for i in range(total)], batch_size=5000)
+            queryset = Post.objects.select_related('author__profile')
+
+            offset_paginator = Paginator(queryset.order_by('-created', '-id'), per_page)
+            cursor_paginator = CursorPaginator(queryset, per_page)
+
+            # Con trỏ của trang sâu lấy bằng cách đi lần lượt từ trang đầu, như người dùng bấm "Next"
+            page = cursor_paginator.get_page()
+            for _ in range(deep_page - 1):
+                page = cursor_paginator.get_page(page.next_cursor)
+            deep_cursor = page.next_cursor
+
+            for number, cursor in ((1, None), (deep_page, deep_cursor)):
+                report(self.stdout, f'Paginator page {number} (x{repeat})',
+                       timed(lambda: list(offset_paginator.get_page(number)), repeat), repeat)
+                report(self.stdout, f'CursorPaginator page {number} (x{repeat})',
+                       timed(lambda: list(cursor_paginator.get_page(cursor)), repeat), repeat)
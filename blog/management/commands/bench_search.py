@@ -0,0 +1,73 @@
+import random
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from taggit.models import Tag, TaggedItem
+
+from blog import search
+from blog.benchmarks import bench_user, isolated_database, report, timed
+from blog.models import Post, text_fields
+
+
+class Command(BaseCommand):
+    help = 'So sánh tìm kiếm LIKE cũ với chỉ mục toàn văn trên một kho bài viết tổng hợp.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, posts, queries, seed, **options):
+        rng = random.Random(seed)
+        vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10)))
+                      for _ in range(5000)]
+
+        with isolated_database():
+            author = bench_user()
+            self.stdout.write(f'Building corpus of {posts} posts...')
+            corpus = []
+            for i in range(posts):
+                content = ' '.join(rng.choices(vocabulary, k=150))
+                # bulk_create bỏ qua Post.save(): tự điền plain_text mà chỉ mục FTS5 đọc
+                corpus.append(Post(author=author, slug=f'post-{i}', title=' '.join(rng.choices(vocabulary, k=6)),
+                                   content=content, **text_fields(content)))
+            Post.objects.bulk_create(corpus, batch_size=2000)
+            tags = Tag.objects.bulk_create([Tag(name=word, slug=word) for word in vocabulary[:300]])
+            content_type = ContentType.objects.get_for_model(Post)
+            TaggedItem.objects.bulk_create(
+                [TaggedItem(tag=tag, content_type=content_type, object_id=post_id)
+                 for post_id in Post.objects.values_list('id', flat=True)
+                 for tag in rng.sample(tags, 2)],
+                batch_size=5000,
+            )
+
+            backend = search.SQLiteFTS5Backend()
+            index_seconds = timed(backend.rebuild)
+            report(self.stdout, 'FTS5 index rebuild', index_seconds, posts)
+
+            words = rng.sample(vocabulary, queries)
+
+            def like_live():
+                for word in words:
+                    list(Post.objects.filter(Q(title__icontains=word[:4]) | Q(tags__name__icontains=word[:4]))
+                                     .order_by('-created').distinct()[:5])
+
+            def fts_live():
+                for word in words:
+                    backend.search(word[:4], fields=('title', 'tags'), prefix=True, limit=5)
+
+            def like_full():
+                for word in words:
+                    list(Post.objects.filter(Q(title__icontains=word) | Q(content__icontains=word)
+                                             | Q(tags__name__icontains=word))
+                                     .order_by('-created').distinct().values_list('id', flat=True)[:100])
+
+            def fts_full():
+                for word in words:
+                    backend.search(word, limit=100)
+
+            report(self.stdout, 'live search, LIKE title/tags', timed(like_live), queries)
+            report(self.stdout, 'live search, FTS5 prefix', timed(fts_live), queries)
+            report(self.stdout, 'full search, LIKE title/content/tags', timed(like_full), queries)
+            report(self.stdout, 'full search, FTS5 bm25', timed(fts_full), queries)
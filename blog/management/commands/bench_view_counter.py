@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from blog import view_counter
+from blog.benchmarks import bench_user, isolated_database, report, timed
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'So sánh số lượt xem/giây giữa cách cũ (UPDATE + refresh mỗi lượt) và bộ đếm ghi trễ.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hits', type=int, default=5000)
+        parser.add_argument('--posts', type=int, default=20)
+
+    def handle(self, *args, hits, posts, **options):
+        with isolated_database():
+            author = bench_user()
+            post_ids = [Post.objects.create(author=author, title=f'Bench {i}', slug=f'bench-{i}', content='x').id
+                        for i in range(posts)]
+            targets = [post_ids[i % posts] for i in range(hits)]
+
+            posts_by_id = Post.objects.in_bulk(post_ids)
+
+            def legacy():
+                for post_id in targets:
+                    post = posts_by_id[post_id]
+                    post.viewer = F('viewer') + 1
+                    post.save(update_fields=['viewer'])
+                    post.refresh_from_db()
+
+            def buffered():
+                for post_id in targets:
+                    view_counter.record_view(post_id)
+                    view_counter.pending_views(post_id)
+                view_counter.flush()
+
+            legacy_seconds = timed(legacy)
+            buffered_seconds = timed(buffered)
+            report(self.stdout, 'synchronous UPDATE + refresh', legacy_seconds, hits)
+            report(self.stdout, 'buffered write-behind', buffered_seconds, hits)
+
+            total = sum(Post.objects.values_list('viewer', flat=True))
+            self.stdout.write(f'Total views recorded: {total} (expected {2 * hits})')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog import view_counter
+
+
+class Command(BaseCommand):
+    help = 'Ghi ngay toàn bộ lượt xem đang nằm trong bộ đệm xuống cơ sở dữ liệu.'
+
+    def handle(self, *args, **options):
+        flushed = view_counter.flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} pending view(s).'))
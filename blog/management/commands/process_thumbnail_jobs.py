@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from blog import thumbnails
+from blog.models import ThumbnailJob
+
+
+class Command(BaseCommand):
+    help = 'Xử lý hàng đợi ThumbnailJob ngay trong tiến trình này (dùng khi THUMBNAIL_WORKERS = 0 hoặc sau khi deploy).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--retry-failed', action='store_true', help='Đưa các job đã thất bại về hàng đợi.')
+
+    def handle(self, *args, limit, retry_failed, **options):
+        if retry_failed:
+            ThumbnailJob.objects.filter(status=ThumbnailJob.FAILED).update(status=ThumbnailJob.PENDING, attempts=0)
+        # Job "running" còn sót lại do tiến trình trước bị tắt giữa chừng được nhận lại trong
+        # process_pending() khi quá THUMBNAIL_JOB_TIMEOUT, để không chạy trùng với worker đang sống
+        done = thumbnails.process_pending(limit=limit)
+        failed = ThumbnailJob.objects.filter(status=ThumbnailJob.FAILED).count()
+        self.stdout.write(self.style.SUCCESS(f'Processed {done} job(s); {failed} failed job(s) in queue.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from blog import notifications
+
+
+class Command(BaseCommand):
+    help = 'Xoá theo lô các thông báo đã đọc cũ hơn NOTIFICATION_RETENTION_DAYS ngày (chạy định kỳ, vd. cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Mặc định theo NOTIFICATION_RETENTION_DAYS.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, days, batch_size, **options):
+        deleted = notifications.purge_read(days=days, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} read notification(s).'))
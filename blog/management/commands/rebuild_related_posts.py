@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog.related import rebuild_related_posts
+
+
+class Command(BaseCommand):
+    help = 'Tính lại toàn bộ bảng bài viết liên quan (RelatedPost) theo IDF của tag.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        count = rebuild_related_posts(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} related post row(s).'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from blog import search
+
+
+class Command(BaseCommand):
+    help = 'Dựng lại toàn bộ chỉ mục tìm kiếm toàn văn cho bài viết.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, batch_size, **options):
+        backend = search.get_backend()
+        count = backend.rebuild(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} post(s) with {type(backend).__name__}.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    help = 'Đếm lại bình luận và sửa cột Post.comment_count ở những bài bị lệch.'
+
+    def handle(self, *args, **options):
+        fixed = reconcile_comment_counts()
+        self.stdout.write(self.style.SUCCESS(f'Fixed comment_count on {fixed} post(s).'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Tính lại điểm bài viết thịnh hành (TrendingPost) từ hoạt động mới (chạy định kỳ, vd. cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, batch_size, **options):
+        count = refresh_trending(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Updated trending scores for {count} post(s) with new activity.'))
@@ -0,0 +1,82 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blog import thumbnails
+from blog.models import ThumbnailJob
+from blog.uploads import IMAGE_MIME_TYPES
+
+
+def _init_worker():
+    # Tiến trình con không được dùng chung kết nối DB đã mở của tiến trình cha
+    django.setup()
+    connections.close_all()
+
+
+def _generate_chunk(model_label, spec, pks):
+    """Chạy trong tiến trình con: tạo file, trả về [(pk, tên ảnh gốc, giá trị cần ghi)] đã xong và số lỗi."""
+    model = apps.get_model(model_label)
+    source = thumbnails.all_specs(model_label)[spec]
+    done, errors = [], 0
+    for instance in model.objects.filter(pk__in=pks).only('pk', source):
+        name = getattr(instance, source).name
+        if not name:
+            continue
+        try:
+            done.append((instance.pk, name, thumbnails.render(instance, spec)))
+        except Exception:
+            errors += 1
+    connections.close_all()
+    return model_label, spec, done, errors
+
+
+class Command(BaseCommand):
+    help = 'Tạo trước toàn bộ thumbnail và biến thể ảnh còn thiếu, song song trên nhiều tiến trình.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Số tiến trình (mặc định: số CPU).')
+        parser.add_argument('--chunk-size', type=int, default=50)
+        parser.add_argument('--all', action='store_true', help='Kiểm tra cả những ảnh đã được đánh dấu sẵn sàng.')
+
+    def handle(self, *args, workers, chunk_size, all, **options):
+        tasks = []
+        for model_label in thumbnails.SPECS:
+            model = apps.get_model(model_label)
+            for spec, source in thumbnails.all_specs(model_label).items():
+                queryset = model.objects.exclude(**{source: ''}).exclude(**{f'{source}__isnull': True})
+                default = thumbnails.default_source(model, source)
+                if default is not None:
+                    # Ảnh mặc định dùng chung được phục vụ trực tiếp, không tạo bản riêng cho từng dòng
+                    queryset = queryset.exclude(**{source: default})
+                if not all:
+                    queryset = queryset.filter(**thumbnails.pending_filter(model_label, spec))
+                if model_label == 'blog.post':
+                    # Tệp đính kèm không phải ảnh thì không có thumbnail
+                    queryset = queryset.filter(mime_type__in=IMAGE_MIME_TYPES)
+                pks = list(queryset.values_list('pk', flat=True))
+                tasks += [(model_label, spec, pks[i:i + chunk_size]) for i in range(0, len(pks), chunk_size)]
+
+        if not tasks:
+            self.stdout.write('All thumbnails are ready.')
+            return
+
+        generated = errors = 0
+        connections.close_all()
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+            futures = [pool.submit(_generate_chunk, *task) for task in tasks]
+            for future in as_completed(futures):
+                model_label, spec, done, failed = future.result()
+                thumbnails.mark_ready(apps.get_model(model_label), done, spec)
+                # Job trong hàng đợi cho các ảnh này không còn cần thiết
+                for pk, _, _ in done:
+                    ThumbnailJob.objects.filter(model=model_label, object_id=pk, spec=spec,
+                                                status=ThumbnailJob.PENDING).delete()
+                generated += len(done)
+                errors += failed
+
+        self.stdout.write(self.style.SUCCESS(f'Warmed {generated} thumbnail(s), {errors} error(s).'))
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_comment_tree(apps, schema_editor):
+    Comment = apps.get_model('blog', 'Comment')
+    parents = dict(Comment.objects.values_list('id', 'parent_id'))
+    resolved = {}  # id -> (root_id, depth, path)
+
+    def resolve(comment_id):
+        chain = []
+        while comment_id not in resolved:
+            chain.append(comment_id)
+            parent_id = parents.get(comment_id)
+            if parent_id is None:
+                resolved[comment_id] = (None, 0, '')
+                chain.pop()
+                break
+            comment_id = parent_id
+        for child_id in reversed(chain):
+            parent_id = parents[child_id]
+            root_id, depth, path = resolved[parent_id]
+            resolved[child_id] = (root_id or parent_id, depth + 1, f'{path}{parent_id:010d}/')
+
+    for comment_id in parents:
+        resolve(comment_id)
+
+    to_update = []
+    for comment in Comment.objects.filter(parent__isnull=False).only('id'):
+        comment.root_id, comment.depth, comment.path = resolved[comment.id]
+        to_update.append(comment)
+    Comment.objects.bulk_update(to_update, ['root', 'depth', 'path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_notification_post_alter_notification_comment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='root',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='descendants', to='blog.comment'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['root', 'path'], name='comment_root_path_idx'),
+        ),
+        migrations.RunPython(backfill_comment_tree, migrations.RunPython.noop),
+    ]
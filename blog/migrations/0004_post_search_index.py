@@ -0,0 +1,51 @@
+import html
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+FTS_TABLE = 'blog_post_fts'
+
+
+def create_search_index(apps, schema_editor):
+    # Bảng ảo FTS5 chỉ có trên SQLite; backend khác dùng cơ chế riêng (xem blog/search.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    cursor = schema_editor.connection.cursor()
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "title, content, tags, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+    Post = apps.get_model('blog', 'Post')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+
+    tags = {}
+    content_type = ContentType.objects.filter(app_label='blog', model='post').first()
+    if content_type is not None:
+        for object_id, name in TaggedItem.objects.filter(content_type=content_type).values_list('object_id', 'tag__name'):
+            tags.setdefault(object_id, []).append(name)
+
+    for post_id, title, content in Post.objects.values_list('id', 'title', 'content').iterator():
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)',
+            [post_id, title, html.unescape(strip_tags(content)), ' '.join(tags.get(post_id, []))],
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.connection.cursor().execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_comment_tree_path'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:54
+
+import math
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+RELATED_POSTS_STORED = 10
+
+
+# Bản sao cách tính điểm tại thời điểm viết migration (blog/related.py), để migration
+# cũ không đổi hành vi khi code của ứng dụng thay đổi
+def score_related(pairs, total_posts, limit=RELATED_POSTS_STORED):
+    posts_by_tag = defaultdict(set)
+    for post_id, tag_id in pairs:
+        posts_by_tag[tag_id].add(post_id)
+
+    scores = defaultdict(lambda: defaultdict(float))
+    for post_ids in posts_by_tag.values():
+        weight = math.log(1 + total_posts / len(post_ids))
+        for post_id in post_ids:
+            for other_id in post_ids:
+                if other_id != post_id:
+                    scores[post_id][other_id] += weight
+
+    return {
+        post_id: sorted(related.items(), key=lambda item: (-item[1], -item[0]))[:limit]
+        for post_id, related in scores.items()
+    }
+
+
+def backfill_related_posts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    RelatedPost = apps.get_model('blog', 'RelatedPost')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+
+    content_type = ContentType.objects.filter(app_label='blog', model='post').first()
+    if content_type is None:
+        return
+    pairs = TaggedItem.objects.filter(content_type=content_type).values_list('object_id', 'tag_id')
+    related = score_related(pairs, Post.objects.count())
+    RelatedPost.objects.bulk_create([
+        RelatedPost(post_id=post_id, related_id=related_id, score=score)
+        for post_id, items in related.items() for related_id, score in items
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_entries', to='blog.post')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_to', to='blog.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['post', '-score'], name='related_post_score_idx')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'related'), name='unique_related_post')],
+            },
+        ),
+        migrations.RunPython(backfill_related_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+def copy_created_to_updated(apps, schema_editor):
+    # Dữ liệu cũ chưa từng được sửa: lần sửa cuối chính là lúc tạo
+    for model_name in ('Post', 'Comment'):
+        model = apps.get_model('blog', model_name)
+        model.objects.update(updated=models.F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copy_created_to_updated, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:05
+
+from django.db import migrations, models
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+
+def enqueue_existing_thumbnails(apps, schema_editor):
+    # Thumbnail của dữ liệu cũ được tạo lại ngoài request (manage.py process_thumbnail_jobs hoặc warm_thumbnails)
+    Post = apps.get_model('blog', 'Post')
+    Profile = apps.get_model('blog', 'Profile')
+    ThumbnailJob = apps.get_model('blog', 'ThumbnailJob')
+    jobs = [
+        ThumbnailJob(model='blog.post', object_id=pk, spec='thumbnail')
+        for pk, name in Post.objects.exclude(attachment='').exclude(attachment__isnull=True).values_list('id', 'attachment')
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+    jobs += [
+        ThumbnailJob(model='blog.profile', object_id=pk, spec='avatar_thumbnail')
+        for pk in Profile.objects.exclude(avatar='').values_list('id', flat=True)
+    ]
+    ThumbnailJob.objects.bulk_create(jobs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_comment_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='avatar_thumbnail_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.PositiveIntegerField()),
+                ('spec', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='thumbnail_job_status_idx')],
+            },
+        ),
+        migrations.RunPython(enqueue_existing_thumbnails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:09
+
+from django.db import migrations, models
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+
+def enqueue_existing_variants(apps, schema_editor):
+    # Biến thể của ảnh cũ được tạo ngoài request (manage.py process_thumbnail_jobs hoặc warm_thumbnails)
+    Post = apps.get_model('blog', 'Post')
+    Profile = apps.get_model('blog', 'Profile')
+    ThumbnailJob = apps.get_model('blog', 'ThumbnailJob')
+    jobs = [
+        ThumbnailJob(model='blog.post', object_id=pk, spec='image_variants')
+        for pk, name in Post.objects.exclude(attachment='').exclude(attachment__isnull=True).values_list('id', 'attachment')
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+    jobs += [
+        ThumbnailJob(model='blog.profile', object_id=pk, spec='avatar_variants')
+        for pk in Profile.objects.exclude(avatar='').values_list('id', flat=True)
+    ]
+    ThumbnailJob.objects.bulk_create(jobs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_thumbnail_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='avatar_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(enqueue_existing_variants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:12
+
+import mimetypes
+
+from django.db import migrations, models
+from PIL import Image, UnidentifiedImageError
+
+# Bản sao sniff()/describe() (blog/uploads.py) tại thời điểm viết migration, để migration
+# cũ không đổi hành vi khi code của ứng dụng thay đổi
+SNIFF_LENGTH = 32
+SIGNATURES = [
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (8, b'WEBP', 'image/webp'),
+    (4, b'ftypavif', 'image/avif'),
+    (4, b'ftypheic', 'image/heic'),
+    (0, b'BM', 'image/bmp'),
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'PK\x03\x04', 'application/zip'),
+    (0, b'\x1f\x8b', 'application/gzip'),
+]
+IMAGE_MIME_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/avif', 'image/bmp'}
+
+
+def sniff(head, name=''):
+    for offset, signature, mime_type in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            if mime_type == 'image/webp' and not head.startswith(b'RIFF'):
+                continue
+            return mime_type
+    if not head:
+        return 'application/octet-stream'
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        if exc.start < len(head) - 3:
+            return 'application/octet-stream'
+    guessed, _ = mimetypes.guess_type(name)
+    return guessed if guessed and guessed.startswith('text/') else 'text/plain'
+
+
+def describe(file):
+    file.open('rb')
+    try:
+        head = file.read(SNIFF_LENGTH)
+        mime_type = sniff(head, file.name)
+        width = height = None
+        if mime_type in IMAGE_MIME_TYPES:
+            file.seek(0)
+            try:
+                with Image.open(file) as image:
+                    width, height = image.size
+            except (UnidentifiedImageError, OSError):
+                mime_type = 'application/octet-stream'
+        return {'mime_type': mime_type, 'width': width, 'height': height, 'size_bytes': file.size}
+    finally:
+        file.close()
+
+
+def backfill_attachment_metadata(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    for post in Post.objects.exclude(attachment='').exclude(attachment__isnull=True).only('id', 'attachment').iterator():
+        try:
+            metadata = describe(post.attachment)
+        except FileNotFoundError:
+            # Tệp đã mất khỏi storage: chỉ còn đoán được theo phần mở rộng như trước
+            guessed, _ = mimetypes.guess_type(post.attachment.name)
+            metadata = {'mime_type': guessed or 'application/octet-stream'}
+        Post.objects.filter(pk=post.pk).update(**metadata)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='mime_type',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='size_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_attachment_metadata, migrations.RunPython.noop),
+    ]
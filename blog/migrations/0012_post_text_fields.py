@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:15
+
+import html
+import math
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+WORDS_PER_MINUTE = 200
+EXCERPT_WORDS = 40
+
+
+# Bản sao text_fields() (blog/models.py) tại thời điểm viết migration, để migration
+# cũ không đổi hành vi khi code của ứng dụng thay đổi
+def text_fields(content):
+    plain_text = html.unescape(strip_tags(content or ''))
+    words = plain_text.split()
+    return {
+        'plain_text': plain_text,
+        'word_count': len(words),
+        'reading_minutes': max(1, math.ceil(len(words) / WORDS_PER_MINUTE)),
+        'excerpt': Truncator(' '.join(words[:EXCERPT_WORDS + 1])).words(EXCERPT_WORDS),
+    }
+
+
+def backfill_text_fields(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    fields = ['plain_text', 'word_count', 'reading_minutes', 'excerpt']
+    posts = []
+    for post in Post.objects.only('id', 'content').iterator(chunk_size=500):
+        for field, value in text_fields(post.content).items():
+            setattr(post, field, value)
+        posts.append(post)
+        if len(posts) >= 500:
+            Post.objects.bulk_update(posts, fields)
+            posts = []
+    Post.objects.bulk_update(posts, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_attachment_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='plain_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reading_minutes',
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_text_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+def backfill_notifications(apps, schema_editor):
+    # Thông báo cũ: mỗi thông báo một người gửi; trả lời được gắn thêm bài viết để gộp được
+    Notification = apps.get_model('blog', 'Notification')
+    fields = ['kind', 'actor_ids', 'post_id']
+    notifications = []
+    queryset = Notification.objects.select_related('comment').only('id', 'sender_id', 'post_id', 'verb', 'comment__post_id')
+    for notification in queryset.iterator(chunk_size=500):
+        notification.actor_ids = [notification.sender_id]
+        if notification.comment_id:
+            notification.kind = 'reply'
+            notification.post_id = notification.comment.post_id
+        elif notification.verb.startswith('liked'):
+            notification.kind = 'like'
+        notifications.append(notification)
+        if len(notifications) >= 500:
+            Notification.objects.bulk_update(notifications, fields)
+            notifications = []
+    Notification.objects.bulk_update(notifications, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_post_text_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(blank=True, choices=[('like', 'Like'), ('reply', 'Reply')], max_length=20),
+        ),
+        migrations.RunPython(backfill_notifications, migrations.RunPython.noop),
+    ]
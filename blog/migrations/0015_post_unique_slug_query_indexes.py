@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def deduplicate_slugs(apps, schema_editor):
+    # Bài cũ nhất giữ slug, các bài trùng sau nó nhận hậu tố -2, -3...; slug rỗng thành post-<id>
+    Post = apps.get_model('blog', 'Post')
+    duplicated = Post.objects.values('slug').annotate(total=Count('id')).filter(total__gt=1).values_list('slug', flat=True)
+    taken = set(Post.objects.values_list('slug', flat=True))
+    for post in Post.objects.filter(slug=''):
+        post.slug = f'post-{post.pk}'
+        taken.add(post.slug)
+        post.save(update_fields=['slug'])
+    for slug in duplicated:
+        if not slug:
+            continue
+        suffix = 2
+        for post in Post.objects.filter(slug=slug).order_by('id')[1:]:
+            while f'{slug}-{suffix}' in taken:
+                suffix += 1
+            post.slug = f'{slug}-{suffix}'
+            taken.add(post.slug)
+            post.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_notification_inbox_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='post',
+            name='slug',
+            field=models.SlugField(max_length=250, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('active', True), ('parent__isnull', True)), fields=['post', 'created', 'id'], name='comment_top_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['-timestamp'], name='contact_message_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('read', True)), fields=['timestamp'], name='notification_read_purge_idx'),
+        ),
+    ]
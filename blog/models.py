@@ -1,12 +1,25 @@
-from django.db import models
+import contextvars
+import math
+
+from django.db import models, transaction
 from imagekit.models import ImageSpecField
 from django.urls import reverse
 from django.conf import settings
 from taggit.managers import TaggableManager
+from taggit.models import TaggedItem
 from imagekit.processors import ResizeToFill, Transpose, SmartResize
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, pre_save, post_delete, m2m_changed
 from django.dispatch import receiver
+from django.db.models import F
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.text import Truncator, slugify
+from .caching import (forget_post_slug, invalidate_active_announcement, invalidate_content,
+                      invalidate_notification_summary, invalidate_post)
+from . import notifications
+from . import search
+from . import thumbnails
+from . import uploads
 
 '''
 File model.py
@@ -17,23 +30,100 @@ File model.py
 5. Khi thực hiện sửa models => chạy lại migrations
 
 '''
+WORDS_PER_MINUTE = 200 # Tốc độ đọc trung bình, dùng chung cho mọi nơi hiển thị thời gian đọc
+EXCERPT_WORDS = 40 # Trích đoạn lưu sẵn; template cắt ngắn hơn tuỳ chỗ (truncatewords)
+
+def reading_minutes(word_count):
+    """Số phút đọc, làm tròn lên, ít nhất 1 phút."""
+    return max(1, math.ceil(word_count / WORDS_PER_MINUTE))
+
+def text_fields(content):
+    """Văn bản thuần, số từ, thời gian đọc và trích đoạn của nội dung HTML `content`."""
+    plain_text = search.plain_text(content)
+    words = plain_text.split()
+    return {
+        'plain_text': plain_text,
+        'word_count': len(words),
+        'reading_minutes': reading_minutes(len(words)),
+        'excerpt': Truncator(' '.join(words[:EXCERPT_WORDS + 1])).words(EXCERPT_WORDS),
+    }
+
+def unique_slug(title, exclude_pk=None):
+    """
+    Slug cho bài viết từ `title`, thêm hậu tố -2, -3... nếu đã có bài khác dùng
+    (một truy vấn lấy các slug cùng tiền tố). `exclude_pk`: bài đang được sửa.
+    """
+    max_length = Post._meta.get_field('slug').max_length
+    base = slugify(title)[:max_length - 6].strip('-') or 'post'
+    taken = Post.objects.filter(slug__startswith=base)
+    if exclude_pk is not None:
+        taken = taken.exclude(pk=exclude_pk)
+    taken = set(taken.values_list('slug', flat=True))
+    slug, suffix = base, 2
+    while slug in taken:
+        slug, suffix = f'{base}-{suffix}', suffix + 1
+    return slug
+
+# Các cột mà thẻ bài viết (index, tag, tìm kiếm, hồ sơ, bài liên quan) hiển thị
+LISTING_FIELDS = (
+    'id', 'slug', 'title', 'created', 'likes', 'comment_count', 'excerpt', 'reading_minutes',
+    'attachment', 'mime_type', 'thumbnail_ready', 'image_variants',
+    'author__username', 'author__profile__avatar', 'author__profile__avatar_thumbnail_ready',
+    'author__profile__avatar_variants',
+)
+
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Chỉ các cột thẻ bài viết cần (kèm tác giả và avatar trong cùng truy vấn):
+        trích đoạn/thời gian đọc đã tính sẵn nên không tải toàn văn.
+        """
+        return self.select_related('author__profile').only(*LISTING_FIELDS)
+
 # Create your models here.
 class Post(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='blog_posts')
     title = models.CharField(max_length=255)
-    slug = models.SlugField(max_length=250)
+    slug = models.SlugField(max_length=250, unique=True) # Tạo bằng unique_slug()
     attachment = models.FileField(upload_to='attachments/%Y/%m/%d/', blank=True, null=True, verbose_name="Attachment/Image")
+    # Thông tin tệp đính kèm, đo một lần khi tệp thay đổi (blog/uploads.py)
+    mime_type = models.CharField(max_length=100, blank=True, editable=False)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    size_bytes = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
     content = models.TextField()
+    # Tính lại từ content mỗi lần lưu (xem save())
+    plain_text = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_minutes = models.PositiveSmallIntegerField(default=1, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
     thumbnail = ImageSpecField(source='attachment',
                                processors=[ResizeToFill(400, 250)],
                                format='JPEG',
-                               options={'quality': 80})
+                               options={'quality': 80},
+                               cachefile_strategy='blog.thumbnails.DeferredStrategy')
+    # Thumbnail đã được tạo sẵn ngoài request (blog/thumbnails.py)
+    thumbnail_ready = models.BooleanField(default=False, editable=False)
+    # Ảnh responsive nhiều kích thước/định dạng: {bộ: [{format, width, height, bytes, name}]}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True) # Lần sửa gần nhất, dùng cho Last-Modified/ETag
     viewer = models.IntegerField(default=0)
     likes = models.PositiveIntegerField(default=0, verbose_name="Likes")
     liked_by = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_posts', blank=True)
+    # Số bình luận (kể cả trả lời), cập nhật qua signal của Comment; sửa lệch bằng reconcile_comment_counts
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
     tags = TaggableManager()
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Khoá của phân trang theo con trỏ (blog/pagination.py)
+            models.Index(fields=['created', 'id'], name='post_created_id_idx'),
+            models.Index(fields=['author', 'created', 'id'], name='post_author_created_idx'),
+        ]
     
     def __str__(self):
         return self.title # nhìn đc rõ hon
@@ -42,50 +132,257 @@ class Post(models.Model):
         return reverse('blog:post_detail', args=[self.slug])
 
     def estimate_reading_time(self):
-        word_count = len(self.content.split())
-        reading_time = round(word_count / 200) # Giả sử tốc độ đọc trung bình là 200 từ/phút
-        return max(1, reading_time) # Trả về ít nhất 1 phút
+        return self.reading_minutes
+
+    def save(self, *args, **kwargs):
+        # content bị defer (vd. nạp bằng for_listing()) thì không thể đã bị sửa
+        if 'content' in self.__dict__:
+            fields = text_fields(self.content)
+            for field, value in fields.items():
+                setattr(self, field, value)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'content' in update_fields:
+                kwargs['update_fields'] = {*update_fields, *fields}
+        super().save(*args, **kwargs)
     
     @property
     def is_image(self):
-        """Kiểm tra xem tệp đính kèm có phải là ảnh không."""
-        if not self.attachment:
-            return False
-        image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp']
-        return any(self.attachment.name.lower().endswith(ext) for ext in image_extensions)
+        """Tệp đính kèm có phải là ảnh không (theo kiểu MIME đã đo lúc tải lên)."""
+        return self.mime_type in uploads.IMAGE_MIME_TYPES
+
+@receiver(pre_save, sender=Post)
+def describe_attachment(sender, instance, **kwargs):
+    # File mới tải lên chưa được lưu (_committed=False): đọc magic bytes/kích thước ngay lúc này
+    if not instance.attachment:
+        instance.mime_type, instance.width, instance.height, instance.size_bytes = '', None, None, None
+    elif not instance.attachment._committed:
+        for field, value in uploads.describe(instance.attachment).items():
+            setattr(instance, field, value)
+
+# --- Đồng bộ chỉ mục tìm kiếm toàn văn (blog/search.py) ---
+@receiver(post_save, sender=Post)
+def index_post_for_search(sender, instance, **kwargs):
+    search.index_post(instance)
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_search(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+@receiver(m2m_changed, sender=TaggedItem)
+def reindex_post_tags(sender, instance, action, **kwargs):
+    # taggit phát m2m_changed khi tags của bài viết thay đổi (vd. form.save_m2m())
+    if isinstance(instance, Post) and action in ('post_add', 'post_remove', 'post_clear'):
+        search.index_post(instance)
+        invalidate_content()
+
+class RelatedPost(models.Model):
+    """Bài liên quan được tính sẵn (xem blog/related.py)."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_to')
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'related'], name='unique_related_post'),
+        ]
+        indexes = [
+            models.Index(fields=['post', '-score'], name='related_post_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post} -> {self.related} ({self.score:.2f})'
+
+class TrendingPost(models.Model):
+    """Điểm thịnh hành tính sẵn của bài viết gần đây (xem blog/trending.py)."""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    score = models.FloatField(default=0)
+    # Bộ đếm của bài ở lần tính trước: lần sau chỉ cộng phần chênh lệch
+    likes = models.PositiveIntegerField(default=0)
+    views = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score', '-post'], name='trending_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post} ({self.score:.2f})'
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments_made')
     body = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
     active = models.BooleanField(default=True)
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='replies')
     likes = models.PositiveIntegerField(default=0)
     liked_by = models.ManyToManyField(User, related_name='liked_comments', blank=True)
-
+    # Thông tin cây được phi chuẩn hoá, tự tính khi tạo bình luận (xem save()):
+    # root  - bình luận gốc (top-level) của nhánh, None nếu chính nó là gốc
+    # depth - độ sâu, gốc = 0
+    # path  - id các tổ tiên (đệm 0, ngăn cách bởi '/'), sắp xếp được theo thứ tự cây
+    root = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='descendants', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    path = models.CharField(max_length=1000, blank=True, default='', editable=False)
 
     class Meta:
         ordering = ('created',)
+        indexes = [
+            models.Index(fields=['root', 'path'], name='comment_root_path_idx'),
+            models.Index(fields=['post', 'created', 'id'], name='comment_post_created_idx'),
+            # Trang bình luận gốc đang hiển thị của bài viết (post_detail): chỉ mục một phần,
+            # không chứa trả lời và bình luận bị ẩn
+            models.Index(fields=['post', 'created', 'id'], name='comment_top_level_idx',
+                         condition=models.Q(active=True, parent__isnull=True)),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post}'
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.parent_id:
+            parent = self.parent
+            self.root_id = parent.root_id or parent.id
+            self.depth = parent.depth + 1
+            self.path = parent.subtree_path
+        super().save(*args, **kwargs)
+
+    @property
+    def root_comment_id(self):
+        return self.root_id or self.id
+
+    @property
+    def subtree_path(self):
+        """Tiền tố `path` chung của mọi trả lời nằm dưới bình luận này."""
+        return f'{self.path}{self.id:010d}/'
+
+    def subtree(self, include_self=False):
+        """
+        Toàn bộ trả lời (mọi cấp) bên dưới bình luận này, lấy bằng một truy vấn
+        theo khoảng trên chỉ mục (root, path).
+        """
+        prefix = self.subtree_path
+        # '0' là ký tự đứng ngay sau '/' nên [prefix, prefix[:-1] + '0') chứa đúng các path bắt đầu bằng prefix
+        condition = models.Q(root_id=self.root_comment_id, path__gte=prefix, path__lt=prefix[:-1] + '0')
+        if include_self:
+            condition |= models.Q(pk=self.pk)
+        return Comment.objects.filter(condition)
+
+    def delete_subtree(self):
+        """
+        Xoá bình luận cùng toàn bộ nhánh trả lời của nó. Bộ đếm comment_count được trừ
+        bằng một câu UPDATE và cache được vô hiệu hoá một lần cho cả nhánh.
+        """
+        token = _deleting_subtree.set(True)
+        try:
+            with transaction.atomic():
+                result = self.subtree(include_self=True).delete()
+                deleted = result[1].get(Comment._meta.label, 0)
+                if deleted:
+                    Post.objects.filter(pk=self.post_id)\
+                                .update(comment_count=Greatest(F('comment_count') - deleted, 0))
+        finally:
+            _deleting_subtree.reset(token)
+        invalidate_post(self.post_id)
+        return result
+
+# Đang trong delete_subtree(): các receiver post_delete của Comment bỏ qua từng dòng
+_deleting_subtree = contextvars.ContextVar('deleting_subtree', default=False)
+
+def counted_elsewhere(origin):
+    """
+    Bình luận bị xoá mà không cần xử lý từng dòng: trong delete_subtree(), hoặc theo
+    cascade khi chính bài viết bị xoá (dòng Post cũng sắp biến mất).
+    """
+    if _deleting_subtree.get():
+        return True
+    return isinstance(origin, Post) or (isinstance(origin, models.QuerySet) and origin.model is Post)
+
+# --- Vô hiệu hoá cache trang/mảnh template (blog/caching.py) ---
+# Like được vô hiệu hoá trong blog/likes.py, bài liên quan trong blog/related.py
+@receiver([post_save, post_delete], sender=Post)
+def content_changed(sender, instance, **kwargs):
+    invalidate_content()
+    if 'slug' in instance.__dict__:
+        forget_post_slug(instance.slug)  # Slug có thể đã đổi hoặc được bài khác dùng lại
+
+@receiver([post_save, post_delete], sender=Comment)
+def comment_changed(sender, instance, origin=None, **kwargs):
+    # Bình luận chỉ làm mới trang chi tiết của bài viết đó
+    if not counted_elsewhere(origin):
+        invalidate_post(instance.post_id)
+
+# --- Bộ đếm Post.comment_count ---
+# post_delete được phát cho từng bình luận, kể cả các trả lời bị xoá theo cascade;
+# xoá cả nhánh hay cả bài viết thì không cập nhật từng dòng (xem counted_elsewhere)
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(comment_count=F('comment_count') + 1)
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, origin=None, **kwargs):
+    if counted_elsewhere(origin):
+        return
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(comment_count=F('comment_count') - 1)
+
+def reconcile_comment_counts():
+    """Ghi lại comment_count từ bảng Comment cho các bài bị lệch. Trả về số bài đã sửa."""
+    actual = Comment.objects.filter(post=models.OuterRef('pk')).order_by().values('post')\
+                            .annotate(total=models.Count('id')).values('total')
+    actual = Coalesce(models.Subquery(actual), 0)
+    return Post.objects.annotate(actual=actual).exclude(comment_count=F('actual')).update(comment_count=actual)
+
 class Notification(models.Model):
+    # Loại sự kiện: các sự kiện cùng loại, cùng bài viết được gộp (blog/notifications.py)
+    KIND_CHOICES = [(notifications.LIKE, 'Like'), (notifications.REPLY, 'Reply')]
+
     recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sent_notifications')
     post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True, related_name='+') # Thông báo liên quan đến bài viết (like, etc.)
     comment = models.ForeignKey(Comment, on_delete=models.CASCADE, null=True, blank=True, related_name='+') # Bình luận trả lời
     verb = models.CharField(max_length=255)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, blank=True)
+    # id những người đã gây ra sự kiện trong thông báo gộp; sender là người gần nhất
+    actor_ids = models.JSONField(default=list, blank=True)
     read = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ('-timestamp',)
+        indexes = [
+            # Hộp thư: trang theo con trỏ (-timestamp, -id) của một người nhận
+            models.Index(fields=['recipient', '-timestamp', '-id'], name='notification_inbox_idx'),
+            # Số chưa đọc và "Mark all as read" tới một mốc thời gian
+            models.Index(fields=['recipient', 'read', '-timestamp'], name='notification_unread_idx'),
+            # Dọn thông báo đã đọc cũ (notifications.purge_read)
+            models.Index(fields=['timestamp'], name='notification_read_purge_idx', condition=models.Q(read=True)),
+        ]
 
     def __str__(self):
         return f'Notification for {self.recipient.username}: {self.verb}'
 
+    @property
+    def others_count(self):
+        """Số người khác (ngoài sender) được gộp vào thông báo: "X and N others ..."."""
+        return max(len(self.actor_ids) - 1, 0)
+
+    def get_absolute_url(self):
+        """Đường dẫn tới nội dung mà thông báo nhắc tới (None nếu nội dung đã bị xoá)."""
+        if self.comment_id:
+            return reverse('blog:post_detail', args=[self.comment.post.slug]) + f'?comment_id={self.comment_id}#comment-{self.comment_id}'
+        if self.post_id:
+            return self.post.get_absolute_url()
+        return None
+
+@receiver([post_save, post_delete], sender=Notification)
+def notification_changed(sender, instance, **kwargs):
+    # Tóm tắt thông báo trong dropdown của người nhận cần được dựng lại
+    invalidate_notification_summary(instance.recipient_id)
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     bio = models.TextField(max_length=500, blank=True)
@@ -93,11 +390,64 @@ class Profile(models.Model):
     avatar_thumbnail = ImageSpecField(source='avatar',
                                       processors=[ResizeToFill(150, 150)],
                                       format='JPEG',
-                                      options={'quality': 90})
+                                      options={'quality': 90},
+                                      cachefile_strategy='blog.thumbnails.DeferredStrategy')
+    avatar_thumbnail_ready = models.BooleanField(default=False, editable=False)
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return f'{self.user.username} Profile'
 
+def rendered_author_fields(instance):
+    """Các trường của tác giả hiển thị trên trang công khai (thẻ bài viết, trang chi tiết)."""
+    fields = ('username',) if isinstance(instance, User) else ('avatar', 'bio')
+    # Đọc thẳng __dict__ để không nạp trường bị defer
+    values = (instance.__dict__.get(field) for field in fields)
+    return tuple(getattr(value, 'name', value) for value in values)
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=Profile)
+def remember_author_fields(sender, instance, **kwargs):
+    instance._rendered_fields = rendered_author_fields(instance)
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+def author_changed(sender, instance, created, **kwargs):
+    # Đăng nhập (last_login) hay lưu lại Profile mà không đổi gì thì không làm mới cache;
+    # tài khoản mới chưa xuất hiện trên trang nào
+    fields = rendered_author_fields(instance)
+    if not created and fields != instance._rendered_fields:
+        invalidate_content()
+    instance._rendered_fields = fields
+
+@receiver(post_delete, sender=Profile)
+def profile_deleted(sender, instance, **kwargs):
+    invalidate_content()
+
+# --- Thumbnail tạo nền (blog/thumbnails.py) ---
+@receiver(post_init, sender=Post)
+@receiver(post_init, sender=Profile)
+def remember_thumbnail_sources(sender, instance, **kwargs):
+    thumbnails.remember_sources(instance)
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Profile)
+def reset_thumbnail_ready(sender, instance, **kwargs):
+    # Ảnh gốc đổi: thumbnail cũ không còn đúng, template hiện placeholder tới khi job chạy xong
+    instance._thumbnail_changed = thumbnails.changed_specs(instance)
+    for spec in instance._thumbnail_changed:
+        thumbnails.reset(instance, spec)
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Profile)
+def enqueue_thumbnails(sender, instance, **kwargs):
+    for spec in getattr(instance, '_thumbnail_changed', []):
+        # Tệp đính kèm không phải ảnh thì không có thumbnail
+        if sender is not Post or instance.is_image:
+            thumbnails.enqueue(instance, spec)
+    instance._thumbnail_changed = []
+    thumbnails.remember_sources(instance)
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created and not hasattr(instance, 'profile'):
@@ -108,6 +458,34 @@ def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, 'profile'):
         instance.profile.save()
 
+class ThumbnailJob(models.Model):
+    """Hàng đợi tạo thumbnail ngay trong DB, được worker của blog/thumbnails.py xử lý."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    model = models.CharField(max_length=100) # vd. 'blog.post'
+    object_id = models.PositiveIntegerField()
+    spec = models.CharField(max_length=50) # Tên ImageSpecField, vd. 'thumbnail'
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True) # Lúc worker nhận job (status = running)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='thumbnail_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.spec} for {self.model} #{self.object_id} ({self.status})'
+
 class ContactMessage(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField()
@@ -117,6 +495,9 @@ class ContactMessage(models.Model):
 
     class Meta:
         ordering = ('-timestamp',)
+        indexes = [
+            models.Index(fields=['-timestamp'], name='contact_message_timestamp_idx'),
+        ]
         verbose_name = "Contact Message"
         verbose_name_plural = "Contact Messages"
 
@@ -145,4 +526,8 @@ class Announcement(models.Model):
         return f"Announcement from {self.created_at.strftime('%Y-%m-%d')}"
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+@receiver([post_save, post_delete], sender=Announcement)
+def announcement_changed(sender, instance, **kwargs):
+    invalidate_active_announcement()
@@ -0,0 +1,205 @@
+"""
+Hàng đợi thông báo (like bài viết, trả lời bình luận).
+
+View chỉ gọi emit(): sự kiện được đưa vào hàng đợi trong bộ nhớ tiến trình sau khi
+transaction của request commit, không có INSERT nào trong request. Một luồng nền
+(mỗi tiến trình một luồng) gom hàng đợi theo chu kỳ NOTIFICATION_FLUSH_INTERVAL
+giây, hoặc sớm hơn khi hàng đợi vượt NOTIFICATION_MAX_PENDING, rồi ghi bằng
+bulk_create/bulk_update.
+
+Gộp thông báo: các sự kiện cùng (người nhận, loại, bài viết) trong khoảng
+NOTIFICATION_COALESCE_WINDOW giây được gộp vào một thông báo, vd. "X and 12 others
+liked your post". Người gửi đã có trong thông báo thì like lại không tạo gì mới
+(like/unlike/like liên tục không sinh thông báo trùng).
+
+Hàng đợi nằm trong RAM: tiến trình chết đột ngột thì mất các sự kiện chưa ghi
+(tối đa vài giây), được chấp nhận với thông báo. Khi NOTIFICATION_QUEUE_SYNC bật
+(chỉ dùng cho test/chạy local) sự kiện được ghi ngay trong request, không có luồng nền.
+
+purge_read() (manage.py purge_notifications) xoá dần theo lô các thông báo đã đọc
+cũ hơn NOTIFICATION_RETENTION_DAYS ngày để hộp thư không phình mãi.
+"""
+import atexit
+import logging
+import threading
+from collections import deque, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .caching import invalidate_notification_summary
+
+logger = logging.getLogger(__name__)
+
+LIKE = 'like'
+REPLY = 'reply'
+# Loại mà mỗi sự kiện đều là nội dung mới (một trả lời mới): người gửi cũ vẫn làm thông báo nổi lên lại
+REFRESH_ON_REPEAT = {REPLY}
+
+Event = namedtuple('Event', ['kind', 'recipient_id', 'sender_id', 'post_id', 'comment_id', 'verb'])
+
+_queue = deque()
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_worker = None
+
+
+def _flush_interval():
+    return getattr(settings, 'NOTIFICATION_FLUSH_INTERVAL', 2)
+
+
+def _max_pending():
+    return getattr(settings, 'NOTIFICATION_MAX_PENDING', 500)
+
+
+def _coalesce_window():
+    return timedelta(seconds=getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 3600))
+
+
+def emit(kind, recipient_id, sender_id, verb, post_id=None, comment_id=None):
+    """Phát một sự kiện thông báo. Không thông báo cho chính người gây ra sự kiện."""
+    if recipient_id == sender_id:
+        return
+    event = Event(kind, recipient_id, sender_id, post_id, comment_id, verb)
+    if getattr(settings, 'NOTIFICATION_QUEUE_SYNC', False):
+        deliver([event])
+    else:
+        # Chỉ xếp hàng khi request thành công: worker không thấy nội dung bị rollback
+        transaction.on_commit(lambda: _enqueue(event))
+
+
+def _enqueue(event):
+    with _lock:
+        _queue.append(event)
+        full = len(_queue) >= _max_pending()
+    _ensure_worker()
+    if full:
+        _wakeup.set()
+
+
+def pending():
+    """Số sự kiện đang chờ ghi trong tiến trình này."""
+    return len(_queue)
+
+
+def flush():
+    """Ghi mọi sự kiện đang chờ. Lỗi thì trả sự kiện về đầu hàng đợi để thử lại."""
+    with _lock:
+        events = list(_queue)
+        _queue.clear()
+    if not events:
+        return 0
+    try:
+        return deliver(events)
+    except Exception:
+        with _lock:
+            _queue.extendleft(reversed(events))
+        raise
+
+
+def deliver(events):
+    """
+    Gộp `events` theo (người nhận, loại, bài viết) rồi ghi: một truy vấn tìm các thông báo
+    còn trong cửa sổ gộp, một bulk_update và một bulk_create. Trả về số thông báo đã tạo/cập nhật.
+    bulk_* không phát signal nên tóm tắt thông báo của người nhận được vô hiệu hoá tại đây.
+    """
+    from .models import Notification
+
+    groups = {}
+    for event in events:
+        groups.setdefault((event.recipient_id, event.kind, event.post_id), []).append(event)
+
+    now = timezone.now()
+    existing = {}
+    candidates = Notification.objects.filter(
+        recipient_id__in={key[0] for key in groups}, kind__in={key[1] for key in groups},
+        post_id__in={key[2] for key in groups}, timestamp__gte=now - _coalesce_window(),
+    ).order_by('timestamp', 'id')
+    for notification in candidates:
+        existing[(notification.recipient_id, notification.kind, notification.post_id)] = notification  # Mới nhất thắng
+
+    created, updated = [], []
+    for (recipient_id, kind, post_id), group in groups.items():
+        notification = existing.get((recipient_id, kind, post_id))
+        actors = list(notification.actor_ids) if notification else []
+        fresh = []
+        for event in group:
+            if event.sender_id not in actors:
+                actors.append(event.sender_id)
+                fresh.append(event)
+            elif kind in REFRESH_ON_REPEAT:
+                fresh.append(event)
+        if not fresh:
+            continue
+        latest = fresh[-1]
+        if notification is None:
+            created.append(Notification(recipient_id=recipient_id, sender_id=latest.sender_id, kind=kind,
+                                        post_id=post_id, comment_id=latest.comment_id, verb=latest.verb,
+                                        actor_ids=actors, timestamp=now))
+        else:
+            notification.sender_id = latest.sender_id
+            notification.comment_id = latest.comment_id
+            notification.verb = latest.verb
+            notification.actor_ids = actors
+            notification.read = False
+            notification.timestamp = now
+            updated.append(notification)
+
+    if not created and not updated:
+        return 0
+    with transaction.atomic():
+        if updated:
+            Notification.objects.bulk_update(updated, ['sender', 'comment', 'verb', 'actor_ids', 'read', 'timestamp'])
+        if created:
+            Notification.objects.bulk_create(created)
+    for recipient_id in {notification.recipient_id for notification in created + updated}:
+        invalidate_notification_summary(recipient_id)
+    return len(created) + len(updated)
+
+
+def purge_read(days=None, batch_size=1000):
+    """
+    Xoá các thông báo đã đọc cũ hơn `days` ngày (mặc định NOTIFICATION_RETENTION_DAYS),
+    mỗi lô một transaction ngắn để không khoá bảng lâu. Trả về số thông báo đã xoá.
+    """
+    from .models import Notification
+
+    if days is None:
+        days = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+    cutoff = timezone.now() - timedelta(days=days)
+    expired = Notification.objects.filter(read=True, timestamp__lt=cutoff).order_by('id')
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        # delete() phát post_delete nên tóm tắt thông báo của người nhận được làm mới
+        Notification.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+def _run_worker():
+    while True:
+        _wakeup.wait(max(_flush_interval(), 0.1))
+        _wakeup.clear()
+        try:
+            flush()
+        except Exception:
+            logger.exception('Notification flush failed')  # Sự kiện vẫn trong hàng đợi, thử lại ở vòng sau
+        finally:
+            close_old_connections()
+
+
+def _ensure_worker():
+    """Khởi động (một lần) luồng nền ghi thông báo."""
+    global _worker
+    if _worker is not None:
+        return
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run_worker, name='notification-worker', daemon=True)
+            _worker.start()
+            # Ghi nốt hàng đợi khi tiến trình thoát bình thường
+            atexit.register(flush)
@@ -0,0 +1,197 @@
+"""
+Phân trang theo con trỏ (keyset pagination).
+
+Paginator của Django cần COUNT toàn bộ queryset và OFFSET tới trang cần xem,
+nên trang càng sâu càng chậm. CursorPaginator lọc theo khoá sắp xếp
+(mặc định (created, id)) của phần tử cuối/đầu trang trước, nhờ chỉ mục nên
+trang thứ N tốn đúng bằng trang đầu tiên.
+
+Con trỏ là chuỗi base64 mờ (opaque) chứa hướng đi và khoá của phần tử mốc.
+Liên kết cũ dạng ?page=N vẫn dùng được (quy về OFFSET như trước).
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Số nguyên lớn nhất DB nhận được (INTEGER 64 bit) cho khoá con trỏ và OFFSET
+MAX_INTEGER = 2 ** 63 - 1
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    """
+    Một trang kết quả. Truy vấn chỉ chạy khi trang được dùng tới lần đầu, nên nếu
+    template lấy phần hiển thị từ {% cache %} thì không tốn truy vấn nào.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    @cached_property
+    def _result(self):
+        return self._loader()
+
+    @property
+    def object_list(self):
+        return self._result['object_list']
+
+    @object_list.setter
+    def object_list(self, value):
+        self._result['object_list'] = value
+
+    @property
+    def has_next(self):
+        return self._result['has_next']
+
+    @property
+    def has_previous(self):
+        return self._result['has_previous']
+
+    @property
+    def next_cursor(self):
+        return self._result['next_cursor']
+
+    @property
+    def previous_cursor(self):
+        return self._result['previous_cursor']
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class CursorPaginator:
+    """
+    Chia `queryset` thành các trang `per_page` phần tử theo `ordering`
+    (các trường duy nhất khi ghép lại, trường cuối thường là id).
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created', '-id')):
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [field.lstrip('-') for field in ordering]
+
+    # --- Con trỏ ---
+
+    def encode_cursor(self, obj, direction):
+        values = []
+        for field in self.fields:
+            value = getattr(obj, field)
+            values.append(value.isoformat() if isinstance(value, datetime) else value)
+        payload = json.dumps({'d': direction, 'k': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            direction, values = payload['d'], payload['k']
+            if direction not in ('next', 'previous', 'at') or len(values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            return direction, [self._to_python(field, value) for field, value in zip(self.fields, values)]
+        except (ValueError, KeyError, TypeError, ValidationError) as exc:
+            raise InvalidCursor(cursor) from exc
+
+    def _to_python(self, field, value):
+        value = self.queryset.model._meta.get_field(field).to_python(value)
+        # Con trỏ do encode_cursor() tạo không bao giờ chứa null hay số vượt kiểu INTEGER của DB
+        if value is None or (isinstance(value, int) and abs(value) > MAX_INTEGER):
+            raise ValueError(value)
+        return value
+
+    def cursor_at(self, obj):
+        """Con trỏ tới trang bắt đầu đúng tại `obj` (dùng cho liên kết sâu tới một phần tử)."""
+        return self.encode_cursor(obj, 'at')
+
+    def _beyond(self, values, forward=True, inclusive=False):
+        """
+        Điều kiện "đứng sau" (hoặc "đứng trước" nếu forward=False) khoá `values`
+        theo thứ tự sắp xếp, tức so sánh bộ giá trị (a, b) > (x, y) viết bằng Q.
+        """
+        def lookup(position):
+            descending = self.ordering[position].startswith('-')
+            return 'lt' if descending == forward else 'gt'
+
+        condition = Q(**dict(zip(self.fields, values))) if inclusive else Q(pk__in=[])
+        for position, field in enumerate(self.fields):
+            equal = dict(zip(self.fields[:position], values[:position]))
+            condition |= Q(**equal, **{f'{field}__{lookup(position)}': values[position]})
+        # Thêm điều kiện khoảng trên trường đầu tiên để DB quét chỉ mục theo thứ tự
+        # từ vị trí con trỏ thay vì gom mọi dòng khớp rồi mới sắp xếp
+        return Q(**{f'{self.fields[0]}__{lookup(0)}e': values[0]}) & condition
+
+    # --- Trang ---
+
+    def get_page(self, cursor=None, page=None):
+        """
+        Trang theo `cursor`; nếu không có con trỏ thì theo số trang cũ `page`
+        (OFFSET, giữ cho liên kết ?page=N cũ). Con trỏ/số trang sai hoặc vượt quá dữ
+        liệu trả về trang đầu.
+        """
+        return CursorPage(lambda: self._load(cursor, page))
+
+    def _load(self, cursor, page):
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                return self._forward(self.queryset, has_previous=False)
+            if direction == 'previous':
+                return self._backward(values)
+            return self._forward(self.queryset.filter(self._beyond(values, inclusive=direction == 'at')),
+                                 has_previous=True)
+
+        try:
+            number = max(int(page), 1) if page else 1
+        except (TypeError, ValueError):
+            number = 1
+        offset = (number - 1) * self.per_page
+        if offset + self.per_page + 1 > MAX_INTEGER:
+            number, offset = 1, 0  # OFFSET quá lớn so với kiểu INTEGER của DB
+        result = self._forward(self.queryset[offset:], has_previous=number > 1)
+        if number > 1 and not result['object_list']:
+            # Số trang vượt quá dữ liệu (liên kết cũ, dữ liệu đã bị xoá): về trang đầu
+            return self._forward(self.queryset, has_previous=False)
+        return result
+
+    def _forward(self, queryset, has_previous):
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return self._page(rows, has_next, has_previous and bool(rows))
+
+    def _backward(self, values):
+        reverse = [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+        rows = list(self.queryset.filter(self._beyond(values, forward=False)).order_by(*reverse)[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        if not rows:
+            # Không còn gì phía trước (vd. con trỏ 'at' trỏ đúng phần tử đầu): về trang đầu
+            return self._forward(self.queryset, has_previous=False)
+        return self._page(rows, has_next=True, has_previous=has_previous)
+
+    def _page(self, rows, has_next, has_previous):
+        return {
+            'object_list': rows,
+            'has_next': has_next,
+            'has_previous': has_previous,
+            'next_cursor': self.encode_cursor(rows[-1], 'next') if has_next else None,
+            'previous_cursor': self.encode_cursor(rows[0], 'previous') if has_previous else None,
+        }
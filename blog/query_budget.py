@@ -0,0 +1,142 @@
+"""
+Ngân sách truy vấn cho từng view.
+
+Mỗi view khai báo số truy vấn và số dòng (model instance được nạp) tối đa:
+
+    @query_budget(queries=8, rows=40)
+    def index(request): ...
+
+- Khi settings.QUERY_BUDGET_CHECK bật (mặc định theo DEBUG), mỗi request được
+  đo và ghi cảnh báo vào logger 'blog.query_budget' nếu vượt ngân sách.
+- QueryBudgetMixin cho test: assertWithinBudget() đo một request và so với ngân
+  sách của view xử lý URL đó; assertConstantQueries() so số truy vấn giữa các
+  lần đo với lượng dữ liệu khác nhau để bắt lỗi N+1.
+
+"Dòng" được đếm qua signal post_init, tức chỉ các model instance thật sự được
+dựng (values()/values_list() không tính), vì đó mới là phần tốn bộ nhớ/CPU.
+Signal là toàn cục nên chỉ các instance dựng trong cùng luồng/context với khối
+đang đo mới được tính (không tính luồng nền hay request song song); truy vấn vốn
+đã theo luồng vì mỗi luồng có kết nối DB riêng.
+"""
+import contextvars
+import logging
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import post_init
+from django.urls import resolve
+
+logger = logging.getLogger(__name__)
+
+# rows=None: chưa giới hạn số dòng (danh sách chưa được phân trang)
+Budget = namedtuple('Budget', ['queries', 'rows'], defaults=[None])
+
+# Các QueryCount đang đo trong context hiện tại (khối count_queries có thể lồng nhau)
+_active_counts = contextvars.ContextVar('active_query_counts', default=())
+
+
+class QueryCount:
+    def __init__(self):
+        self.queries = []
+        self.rows = 0
+
+    def __len__(self):
+        return len(self.queries)
+
+    def summary(self):
+        return '\n'.join(f'{position}. {sql}' for position, sql in enumerate(self.queries, 1))
+
+
+@contextmanager
+def count_queries():
+    """Đếm truy vấn (trên mọi kết nối DB) và số model instance được nạp trong khối lệnh."""
+    count = QueryCount()
+
+    def record_query(execute, sql, params, many, context):
+        count.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def record_row(sender, **kwargs):
+        if count in _active_counts.get():
+            count.rows += 1
+
+    token = _active_counts.set(_active_counts.get() + (count,))
+    post_init.connect(record_row, weak=False, dispatch_uid=id(count))
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record_query))
+            yield count
+    finally:
+        post_init.disconnect(dispatch_uid=id(count))
+        _active_counts.reset(token)
+
+
+def query_budget(queries, rows=None):
+    """Decorator: gắn ngân sách vào view (view.query_budget) và kiểm tra khi chạy nếu được bật."""
+    budget = Budget(queries, rows)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'QUERY_BUDGET_CHECK', settings.DEBUG):
+                return view(request, *args, **kwargs)
+            with count_queries() as count:
+                response = view(request, *args, **kwargs)
+            problems = exceeded(budget, count)
+            if problems:
+                logger.warning('%s %s exceeded its query budget: %s', request.method, request.path, ', '.join(problems))
+            response.query_count = count
+            return response
+
+        wrapper.query_budget = budget
+        return wrapper
+    return decorator
+
+
+def exceeded(budget, count):
+    problems = []
+    if len(count) > budget.queries:
+        problems.append(f'{len(count)} queries > {budget.queries}')
+    if budget.rows is not None and count.rows > budget.rows:
+        problems.append(f'{count.rows} rows > {budget.rows}')
+    return problems
+
+
+def budget_for(path):
+    """Ngân sách của view xử lý `path` (None nếu view chưa khai báo)."""
+    return getattr(resolve(path.split('?')[0]).func, 'query_budget', None)
+
+
+class QueryBudgetMixin:
+    """
+    Mixin cho TestCase. Số đo lấy từ chính decorator (response.query_count) nên chỉ
+    tính phần việc của view, không tính middleware (session...) của test client.
+    """
+
+    def measure(self, method, path, data=None, **extra):
+        with self.settings(QUERY_BUDGET_CHECK=True):
+            response = getattr(self.client, method)(path, data or {}, **extra)
+        self.assertTrue(hasattr(response, 'query_count'), f'{path} has no @query_budget')
+        return response, response.query_count
+
+    def assertWithinBudget(self, method, path, data=None, **extra):
+        """Gửi request, kiểm tra số truy vấn/dòng không vượt ngân sách của view. Trả về (response, count)."""
+        response, count = self.measure(method, path, data, **extra)
+        problems = exceeded(budget_for(path), count)
+        self.assertFalse(problems, f'{method.upper()} {path}: {", ".join(problems)}\n{count.summary()}')
+        return response, count
+
+    def assertConstantQueries(self, counts, label=''):
+        """`counts`: {kích thước dữ liệu: QueryCount}. Số truy vấn không được tăng theo dữ liệu."""
+        sizes = sorted(counts)
+        baseline = counts[sizes[0]]
+        for size in sizes[1:]:
+            self.assertEqual(
+                len(counts[size]), len(baseline),
+                f'{label}: {len(baseline)} queries with {sizes[0]} rows of data, '
+                f'{len(counts[size])} with {size}\n{counts[size].summary()}',
+            )
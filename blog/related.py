@@ -0,0 +1,134 @@
+"""
+Bài viết liên quan được tính sẵn (bảng RelatedPost).
+
+Điểm liên quan giữa hai bài là tổng IDF của các tag chung: tag càng hiếm
+(ít bài dùng) thì càng có trọng số, tag phổ biến như "python" gần như không
+đóng góp. Mỗi bài lưu tối đa RELATED_POSTS_STORED dòng tốt nhất, nên trang chi
+tiết chỉ cần một truy vấn theo chỉ mục (post, -score) thay vì GROUP BY trên
+bảng tag trung gian ở mỗi lượt xem.
+
+- refresh_related_posts(post): gọi sau form.save_m2m() khi tạo/sửa bài.
+- rebuild_related_posts(): tính lại toàn bộ (lệnh manage.py rebuild_related_posts),
+  dùng khi IDF đã trôi nhiều sau nhiều lần cập nhật từng bài.
+"""
+import math
+from collections import defaultdict
+
+from django.db import transaction
+
+from .caching import invalidate_content
+
+RELATED_POSTS_LIMIT = 4  # Số bài hiển thị trên trang chi tiết
+RELATED_POSTS_STORED = 10  # Số dòng lưu cho mỗi bài
+NEIGHBOUR_UPDATE_LIMIT = 50  # Số bài "hàng xóm" được cập nhật điểm khi một bài đổi tag
+
+
+def idf(total_posts, document_frequency):
+    return math.log(1 + total_posts / document_frequency) if document_frequency else 0.0
+
+
+def score_related(pairs, total_posts, limit=RELATED_POSTS_STORED):
+    """
+    Tính bài liên quan từ các cặp (post_id, tag_id).
+    Trả về {post_id: [(related_id, score), ...]} đã sắp theo điểm giảm dần.
+    """
+    posts_by_tag = defaultdict(set)
+    for post_id, tag_id in pairs:
+        posts_by_tag[tag_id].add(post_id)
+
+    scores = defaultdict(lambda: defaultdict(float))
+    for post_ids in posts_by_tag.values():
+        weight = idf(total_posts, len(post_ids))
+        for post_id in post_ids:
+            for other_id in post_ids:
+                if other_id != post_id:
+                    scores[post_id][other_id] += weight
+
+    return {post_id: _top(related, limit) for post_id, related in scores.items()}
+
+
+def _top(scores, limit):
+    # Hoà điểm thì ưu tiên bài mới hơn (id lớn hơn), khớp với thứ tự đọc ra
+    return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:limit]
+
+
+def _post_tagged_items():
+    from taggit.models import TaggedItem
+    from .models import Post
+
+    return TaggedItem.objects.filter(content_type__app_label=Post._meta.app_label,
+                                     content_type__model=Post._meta.model_name)
+
+
+def refresh_related_posts(post):
+    """
+    Tính lại bài liên quan của `post` và cập nhật điểm của `post` trong danh sách
+    của các bài có chung tag. Chỉ chạm tới các tag của bài này, không quét toàn bảng.
+    """
+    from .models import Post, RelatedPost
+
+    tagged = _post_tagged_items()
+    tag_ids = list(tagged.filter(object_id=post.pk).values_list('tag_id', flat=True))
+    total_posts = Post.objects.count()
+
+    candidates = defaultdict(float)
+    if tag_ids:
+        frequencies = defaultdict(int)
+        pairs = list(tagged.filter(tag_id__in=tag_ids).values_list('object_id', 'tag_id'))
+        for _, tag_id in pairs:
+            frequencies[tag_id] += 1
+        for object_id, tag_id in pairs:
+            if object_id != post.pk:
+                candidates[object_id] += idf(total_posts, frequencies[tag_id])
+
+    best = _top(candidates, max(RELATED_POSTS_STORED, NEIGHBOUR_UPDATE_LIMIT))
+    rows = [RelatedPost(post_id=post.pk, related_id=related_id, score=score)
+            for related_id, score in best[:RELATED_POSTS_STORED]]
+    rows += [RelatedPost(post_id=related_id, related_id=post.pk, score=score)
+             for related_id, score in best[:NEIGHBOUR_UPDATE_LIMIT]]
+
+    neighbours = [related_id for related_id, _ in best[:NEIGHBOUR_UPDATE_LIMIT]]
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id=post.pk).delete()
+        RelatedPost.objects.filter(related_id=post.pk).delete()
+        RelatedPost.objects.bulk_create(rows)
+        _trim(neighbours)
+    invalidate_content()
+
+
+def _trim(post_ids):
+    """Chỉ giữ RELATED_POSTS_STORED dòng tốt nhất của mỗi bài trong `post_ids`."""
+    from .models import RelatedPost
+
+    if not post_ids:
+        return
+    kept, excess = defaultdict(int), []
+    entries = RelatedPost.objects.filter(post_id__in=post_ids).order_by('post_id', '-score', '-related_id')
+    for pk, post_id in entries.values_list('pk', 'post_id'):
+        kept[post_id] += 1
+        if kept[post_id] > RELATED_POSTS_STORED:
+            excess.append(pk)
+    if excess:
+        RelatedPost.objects.filter(pk__in=excess).delete()
+
+
+def rebuild_related_posts(batch_size=1000):
+    """Tính lại toàn bộ bảng RelatedPost. Trả về số dòng đã ghi."""
+    from .models import Post, RelatedPost
+
+    pairs = _post_tagged_items().values_list('object_id', 'tag_id').iterator()
+    related = score_related(pairs, Post.objects.count())
+    rows = [RelatedPost(post_id=post_id, related_id=related_id, score=score)
+            for post_id, items in related.items() for related_id, score in items]
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        RelatedPost.objects.bulk_create(rows, batch_size=batch_size)
+    invalidate_content()
+    return len(rows)
+
+
+def get_related_posts(post, limit=RELATED_POSTS_LIMIT):
+    """Các bài liên quan nhất của `post` (một truy vấn theo chỉ mục (post, -score))."""
+    from .models import Post
+
+    return Post.objects.for_listing().filter(related_to__post=post).order_by('-related_to__score', '-id')[:limit]
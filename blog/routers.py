@@ -0,0 +1,70 @@
+"""
+Định tuyến truy vấn giữa DB chính (default) và bản sao chỉ đọc (replica).
+
+Bản sao chỉ được dùng khi settings.DATABASES có alias 'replica' (vd. một file SQLite
+được Litestream/LiteFS sao chép, hoặc một standby PostgreSQL). Nó không bao giờ
+được migrate hay ghi trực tiếp.
+
+- ReplicaMiddleware: request GET/HEAD/OPTIONS đọc từ replica; mọi việc ngoài
+  request (worker nền, lệnh manage.py, migrate) luôn dùng DB chính.
+- Ngay khi request ghi (db_for_write), phần còn lại của request đọc từ DB chính.
+- Sau một request POST/PUT/DELETE, cookie `pin_primary` ghim người dùng vào DB chính
+  trong REPLICA_PIN_SECONDS giây để họ thấy ngay dữ liệu mình vừa ghi dù replica trễ.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+def replica_enabled():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def reading_from_replica(enabled=True):
+    """Cho phép (hoặc cấm) đọc từ replica trong khối lệnh."""
+    token = _use_replica.set(enabled and replica_enabled())
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Trong transaction trên DB chính thì phải đọc cùng kết nối đó
+        if _use_replica.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _use_replica.set(False)  # Đọc lại được chính dữ liệu vừa ghi trong request này
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Cùng một cơ sở dữ liệu, chỉ khác bản sao
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        read_only = request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+        with reading_from_replica(read_only):
+            response = self.get_response(request)
+        if request.method not in SAFE_METHODS and replica_enabled():
+            response.set_cookie(PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                                httponly=True, samesite='Lax')
+        return response
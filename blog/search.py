@@ -0,0 +1,285 @@
+"""
+Tìm kiếm toàn văn cho bài viết.
+
+Chỉ mục đảo (inverted index) phủ tiêu đề, nội dung (đã bỏ thẻ HTML) và tên tag.
+Backend được chọn qua settings.BLOG_SEARCH_BACKEND:
+
+- SQLiteFTS5Backend: bảng ảo FTS5 `blog_post_fts` (tạo trong migration 0004),
+  xếp hạng bằng bm25, hỗ trợ tìm theo tiền tố cho live search.
+- LikeBackend: quét LIKE như trước, dùng khi DB không có FTS5.
+
+Backend khác (vd. cột tsvector + chỉ mục GIN trên PostgreSQL) chỉ cần cài đặt
+các phương thức của SearchBackend. Chỉ mục được đồng bộ qua signal trong models.py.
+"""
+import hashlib
+import html
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, When
+from django.utils.html import strip_tags
+from django.utils.module_loading import import_string
+
+from .caching import bump_version, get_cache, get_version
+
+FIELDS = ('title', 'content', 'tags')
+LIVE_SEARCH_FIELDS = ('title', 'tags')
+LIVE_SEARCH_LIMIT = 5
+LIVE_SEARCH_MIN_LENGTH = 3
+SEARCH_VERSION_KEY = 'search:version'
+
+_backend = None
+
+
+def plain_text(content):
+    """Nội dung bài viết dạng văn bản thuần (bỏ thẻ HTML và giải mã entity)."""
+    return html.unescape(strip_tags(content or ''))
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def normalize_query(query):
+    """Dạng chuẩn của câu truy vấn (các từ viết thường, cách nhau một dấu cách)."""
+    return ' '.join(search_terms(query))
+
+
+def fold(text):
+    """Chữ thường, bỏ dấu - gần giống tokenizer unicode61 (remove_diacritics) của FTS5."""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class SearchBackend:
+    """Giao diện chung cho các backend tìm kiếm bài viết."""
+
+    def index_post(self, post):
+        """Thêm mới hoặc cập nhật một bài viết trong chỉ mục."""
+        raise NotImplementedError
+
+    def remove_post(self, post_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, query, fields=FIELDS, prefix=False, limit=None):
+        """
+        Trả về danh sách id bài viết khớp với `query`, xếp theo độ liên quan giảm dần.
+        `fields` giới hạn các cột được tìm; `prefix=True` khớp cả từ đang gõ dở.
+        """
+        raise NotImplementedError
+
+    def rebuild(self, batch_size=500):
+        """Dựng lại toàn bộ chỉ mục từ bảng Post. Trả về số bài đã đánh chỉ mục."""
+        from .models import Post
+
+        self.clear()
+        count = 0
+        for post in Post.objects.defer('content').prefetch_related('tags').iterator(chunk_size=batch_size):
+            self.index_post(post)
+            count += 1
+        return count
+
+
+class LikeBackend(SearchBackend):
+    """Không có chỉ mục: tìm bằng LIKE trên bảng Post (cách làm cũ)."""
+
+    lookups = {'title': 'title__icontains', 'content': 'content__icontains', 'tags': 'tags__name__icontains'}
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def rebuild(self, batch_size=500):
+        return 0
+
+    def search(self, query, fields=FIELDS, prefix=False, limit=None):
+        from .models import Post
+
+        terms = search_terms(query)
+        if not terms:
+            return []
+        condition = Q()
+        for term in terms:
+            term_condition = Q()
+            for field in fields:
+                term_condition |= Q(**{self.lookups[field]: term})
+            condition &= term_condition
+        ids = Post.objects.filter(condition).order_by('-created').values_list('id', flat=True).distinct()
+        return list(ids[:limit] if limit else ids)
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    table = 'blog_post_fts'
+    # Trọng số bm25 theo thứ tự cột (title, content, tags)
+    weights = (10.0, 1.0, 5.0)
+
+    def index_post(self, post):
+        tags = ' '.join(tag.name for tag in post.tags.all())
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)',
+                [post.pk, post.title, post.plain_text, tags],
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [post_id])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def rebuild(self, batch_size=500):
+        from .models import Post
+
+        count = 0
+        posts = Post.objects.only('id', 'title', 'plain_text').prefetch_related('tags')
+        # Trong một transaction để người dùng không bao giờ thấy chỉ mục rỗng giữa chừng
+        with transaction.atomic(), connection.cursor() as cursor:
+            self.clear()
+            batch = []
+            for post in posts.iterator(chunk_size=batch_size):
+                batch.append([post.pk, post.title, post.plain_text, ' '.join(tag.name for tag in post.tags.all())])
+                if len(batch) >= batch_size:
+                    self._insert_many(cursor, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self._insert_many(cursor, batch)
+                count += len(batch)
+        return count
+
+    def _insert_many(self, cursor, rows):
+        cursor.executemany(f'INSERT INTO {self.table} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)', rows)
+
+    def match_expression(self, query, fields=FIELDS, prefix=False):
+        terms = search_terms(query)
+        if not terms:
+            return None
+        suffix = '*' if prefix else ''
+        expression = ' '.join(f'"{term}"{suffix}' for term in terms)
+        if tuple(fields) != FIELDS:
+            expression = '{%s} : (%s)' % (' '.join(fields), expression)
+        return expression
+
+    def search(self, query, fields=FIELDS, prefix=False, limit=None):
+        expression = self.match_expression(query, fields, prefix)
+        if expression is None:
+            return []
+        sql = (f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+               f'ORDER BY bm25({self.table}, %s, %s, %s), rowid DESC')
+        params = [expression, *self.weights]
+        if limit:
+            sql += ' LIMIT %s'
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        default = 'blog.search.SQLiteFTS5Backend' if connection.vendor == 'sqlite' else 'blog.search.LikeBackend'
+        _backend = import_string(getattr(settings, 'BLOG_SEARCH_BACKEND', default))()
+    return _backend
+
+
+def index_post(post):
+    get_backend().index_post(post)
+    bump_version(SEARCH_VERSION_KEY)
+
+
+def remove_post(post_id):
+    get_backend().remove_post(post_id)
+    bump_version(SEARCH_VERSION_KEY)
+
+
+def search_posts(query, fields=FIELDS, prefix=False, limit=None):
+    """QuerySet các bài viết khớp với `query`, giữ nguyên thứ tự độ liên quan của backend."""
+    from .models import Post
+
+    ids = get_backend().search(query, fields=fields, prefix=prefix, limit=limit)
+    if not ids:
+        return Post.objects.none()
+    relevance = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)], output_field=IntegerField())
+    return Post.objects.filter(pk__in=ids).order_by(relevance)
+
+
+def live_search(query):
+    """
+    Gợi ý cho ô tìm kiếm trên thanh điều hướng: danh sách {'title', 'url'}.
+
+    Kết quả theo từng tiền tố được cache ngắn hạn (khoá gắn phiên bản chỉ mục).
+    Nếu chưa có cache cho "djang" nhưng đã có cho "djan" và tập đó không bị cắt bớt,
+    kết quả được lọc lại từ cache thay vì truy vấn DB.
+    """
+    normalized = normalize_query(query)
+    if len(normalized) < LIVE_SEARCH_MIN_LENGTH:
+        return []
+
+    cache = get_cache()
+    version = get_version(SEARCH_VERSION_KEY)
+    timeout = getattr(settings, 'LIVE_SEARCH_CACHE_TIMEOUT', 60)
+    key = _live_search_key(version, normalized)
+    entry = cache.get(key)
+    if entry is None:
+        entry = _narrow_cached(cache, version, normalized) or _live_search_entry(normalized)
+        cache.set(key, entry, timeout)
+    return [{'title': item['title'], 'url': item['url']} for item in entry['results']]
+
+
+def _live_search_key(version, query):
+    # Câu truy vấn có dấu cách, tiếng Việt và độ dài tuỳ ý: băm để khoá hợp lệ với mọi backend (vd. memcached)
+    return f'live_search:{version}:{hashlib.md5(query.encode()).hexdigest()}'
+
+
+def _live_search_entry(query):
+    from .models import Post
+
+    # Lấy dư một kết quả để biết tập kết quả có bị cắt bớt hay không
+    ids = get_backend().search(query, fields=LIVE_SEARCH_FIELDS, prefix=True, limit=LIVE_SEARCH_LIMIT + 1)
+    posts = Post.objects.in_bulk(ids[:LIVE_SEARCH_LIMIT])
+    tags = {}
+    if posts:
+        from taggit.models import TaggedItem
+        for object_id, name in TaggedItem.objects.filter(object_id__in=posts, content_type__app_label='blog',
+                                                         content_type__model='post').values_list('object_id', 'tag__name'):
+            tags.setdefault(object_id, []).append(name)
+    results = []
+    for pk in ids[:LIVE_SEARCH_LIMIT]:
+        post = posts.get(pk)
+        if post is None:
+            continue
+        # Các từ (đã bỏ dấu) của tiêu đề và tag, dùng khi lọc lại cho tiền tố dài hơn
+        tokens = set(search_terms(fold(' '.join([post.title, *tags.get(pk, [])]))))
+        results.append({'title': post.title, 'url': post.get_absolute_url(), 'tokens': sorted(tokens)})
+    return {'results': results, 'truncated': len(ids) > LIVE_SEARCH_LIMIT}
+
+
+def _narrow_cached(cache, version, query):
+    """Lọc kết quả từ tiền tố ngắn hơn đã có trong cache (None nếu không dùng được)."""
+    candidates = [query[:length] for length in range(len(query) - 1, LIVE_SEARCH_MIN_LENGTH - 1, -1)]
+    cached = cache.get_many([_live_search_key(version, prefix) for prefix in candidates])
+    for prefix in candidates:
+        entry = cached.get(_live_search_key(version, prefix))
+        if entry is None:
+            continue
+        if entry['truncated']:
+            return None
+        terms = [fold(term) for term in search_terms(query)]
+        results = [item for item in entry['results']
+                   if all(any(token.startswith(term) for token in item['tokens']) for term in terms)]
+        return {'results': results, 'truncated': False}
+    return None
@@ -1,6 +1,13 @@
-import math
 from django import template
 from django.template.defaultfilters import stringfilter
+from django.core.files.storage import default_storage
+from django.db.models import Model
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from blog import thumbnails
+from blog.models import reading_minutes
 
 register = template.Library()
 
@@ -8,15 +15,73 @@ register = template.Library()
 @stringfilter
 def reading_time(value):
     """
-    Ước tính thời gian đọc cho một đoạn văn bản.
-    Giả định tốc độ đọc trung bình là 180 từ mỗi phút.
+    Ước tính thời gian đọc cho một đoạn văn bản, cùng công thức với Post.reading_minutes.
+    Bài viết đã có sẵn post.reading_minutes, filter này dành cho văn bản khác.
+    """
+    return reading_minutes(len(value.split()))
+
+PLACEHOLDERS = {
+    'thumbnail': 'blog/img/thumbnail-placeholder.svg',
+    'avatar_thumbnail': 'blog/img/avatar-placeholder.svg',
+}
+
+@register.filter(name='spec_url')
+def spec_url(instance, spec):
+    """
+    URL của thumbnail `spec` (ImageSpecField) nếu đã được tạo sẵn, ngược lại là ảnh placeholder.
+    Ảnh gốc mặc định dùng chung (avatar mặc định) không có thumbnail riêng nên được dùng thẳng.
+    Không bao giờ tạo ảnh trong lúc render (xem blog/thumbnails.py).
     """
-    if not value:
-        return 1
+    if instance is not None and getattr(instance, f'{spec}_ready', False):
+        return getattr(instance, spec).url
+    # instance có thể là chuỗi rỗng (vd. user.profile của khách chưa đăng nhập)
+    if isinstance(instance, Model) and thumbnails.uses_default_source(instance, spec):
+        return getattr(instance, thumbnails.all_specs(instance._meta.label_lower)[spec]).url
+    return static(PLACEHOLDERS[spec])
+
+# Bộ biến thể -> ImageSpecField dùng làm ảnh dự phòng khi biến thể chưa được tạo
+VARIANT_FALLBACKS = {
+    'card': 'thumbnail',
+    'avatar': 'avatar_thumbnail',
+}
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+
+@register.simple_tag
+def picture(instance, variant_set, sizes='100vw', **attrs):
+    """
+    Thẻ <picture> responsive từ các biến thể đã tạo sẵn (blog/thumbnails.py):
+    mỗi định dạng hiện đại một <source> với srcset/sizes, <img> JPEG làm dự phòng,
+    kèm width/height để trình duyệt giữ chỗ trước khi ảnh tải xong.
+    Biến thể chưa có thì trả về <img> thường (thumbnail/placeholder hoặc ảnh gốc).
+
+    {% picture post 'card' sizes='(min-width: 992px) 33vw, 100vw' class='card-img-top' alt=post.title %}
+    """
+    variants = thumbnails.get_variants(instance, variant_set) if instance is not None else []
+    if not variants:
+        if variant_set in VARIANT_FALLBACKS:
+            src = spec_url(instance, VARIANT_FALLBACKS[variant_set])
+        else:
+            src = thumbnails.variant_source(instance, variant_set).url
+        return format_html('<img src="{}"{}>', src, flatatt(attrs))
+
+    by_format = {}
+    for variant in variants:
+        by_format.setdefault(variant['format'], []).append(variant)
+    fallback = by_format.get('jpeg') or variants
+    attrs.setdefault('width', fallback[0]['width'])
+    attrs.setdefault('height', fallback[0]['height'])
+    attrs.setdefault('decoding', 'async')
 
-    word_count = len(value.split())
-    words_per_minute = 180 # Giảm tốc độ đọc để ước tính sát hơn
-    minutes = word_count / words_per_minute
-    read_time = math.ceil(minutes) # Làm tròn lên số nguyên gần nhất
+    sources = format_html_join('', '<source type="{}" srcset="{}" sizes="{}">', (
+        (MIME_TYPES[image_format], _srcset(items), sizes)
+        for image_format, items in by_format.items() if image_format != 'jpeg'
+    ))
+    return format_html('<picture>{}<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+                       sources, default_storage.url(fallback[0]['name']), _srcset(fallback), sizes, flatatt(attrs))
 
-    return read_time if read_time > 0 else 1
\ No newline at end of file
+def _srcset(items):
+    return ', '.join(f"{default_storage.url(item['name'])} {item['width']}w" for item in items)
@@ -1,3 +1,1185 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import random
+import threading
+import time
+import unittest
+import warnings
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import CacheKeyWarning
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.template import Context, Template
+from django.templatetags.static import static
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import notifications, search, thumbnails, trending, uploads, view_counter, views
+from .caching import (ANNOUNCEMENT_VERSION_KEY, get_active_announcement, get_content_version, get_notification_summary,
+                      get_post_version, get_version)
+from .comment_tree import build_comment_tree
+from .likes import add_likes, toggle_like
+from .models import (EXCERPT_WORDS, WORDS_PER_MINUTE, Announcement, Comment, ContactMessage, Notification, Post,
+                     Profile, RelatedPost, ThumbnailJob, TrendingPost, reading_minutes, text_fields)
+from .pagination import CursorPaginator
+from .query_budget import QueryBudgetMixin, count_queries
+from .related import refresh_related_posts, score_related
+from .routers import PrimaryReplicaRouter, reading_from_replica
+from .templatetags.blog_extras import PLACEHOLDERS, picture, reading_time, spec_url
+
+
+# Không chạy luồng nền ghi lượt xem: nó ghi nốt bộ đệm lúc tiến trình thoát (atexit),
+# khi kết nối đã trỏ lại DB thật chứ không còn là DB test
+_test_settings = override_settings(VIEW_COUNTER_FLUSHER=False)
+
+
+def setUpModule():
+    _test_settings.enable()
+
+
+def tearDownModule():
+    _test_settings.disable()
+
+
+@override_settings(VIEW_COUNTER_FLUSH_INTERVAL=3600, VIEW_COUNTER_MAX_PENDING=3)
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.post = Post.objects.create(author=self.author, title='Hello', slug='hello', content='...')
+        caches['view_counter'].clear()
+        view_counter.flush()  # Đặt lại bộ đếm ngưỡng của tiến trình
+
+    def viewer(self):
+        return Post.objects.values_list('viewer', flat=True).get(pk=self.post.pk)
+
+    def test_views_are_buffered_until_flush(self):
+        view_counter.record_view(self.post.id)
+        view_counter.record_view(self.post.id)
+        self.assertEqual(self.viewer(), 0)
+        self.assertEqual(view_counter.pending_views(self.post.id), 2)
+
+        self.assertEqual(view_counter.flush(), 2)
+        self.assertEqual(self.viewer(), 2)
+        self.assertEqual(view_counter.pending_views(self.post.id), 0)
+
+    def test_flushes_when_pending_views_reach_threshold(self):
+        for _ in range(3):
+            view_counter.record_view(self.post.id)
+        self.assertEqual(self.viewer(), 3)
+        self.assertEqual(view_counter.pending_views(self.post.id), 0)
+
+    def test_failed_flush_keeps_views_buffered(self):
+        view_counter.record_view(self.post.id)
+        view_counter.record_view(self.post.id)
+        with mock.patch('blog.models.Post.objects.filter', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('blog.view_counter', 'ERROR'):
+            view_counter.record_view(self.post.id)  # Tới ngưỡng: ghi trong request nhưng DB lỗi
+        self.assertEqual(self.viewer(), 0)
+        self.assertEqual(view_counter.pending_views(self.post.id), 3)
+
+        self.assertEqual(view_counter.flush(), 3)
+        self.assertEqual(self.viewer(), 3)
+
+    def test_cached_page_view_is_counted(self):
+        cache.clear()
+        first = self.client.get(self.post.get_absolute_url())
+        second = self.client.get(self.post.get_absolute_url())
+        self.assertEqual(first.content, second.content)  # Lần hai lấy từ cache trang
+        self.assertEqual(view_counter.pending_views(self.post.id), 2)
+
+
+class CommentTreeTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.post = Post.objects.create(author=self.author, title='Hello', slug='hello', content='...')
+
+    def comment(self, body, parent=None, **extra):
+        return Comment.objects.create(post=self.post, author=self.author, body=body, parent=parent, **extra)
+
+    def test_replies_are_nested_with_one_query(self):
+        first, second = self.comment('first'), self.comment('second')
+        reply = self.comment('reply', first)
+        nested = self.comment('nested', reply)
+        self.comment('hidden', first, active=False)
+        self.comment('other page', self.comment('not on this page'))
+
+        with self.assertNumQueries(1):
+            roots = build_comment_tree([first, second])
+        self.assertEqual(roots, [first, second])
+        self.assertEqual(first.children, [reply])
+        self.assertEqual(first.children[0].children, [nested])
+        self.assertEqual(second.children, [])
+
+    def test_no_roots_no_query(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(build_comment_tree([]), [])
+
+
+class CommentPathTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.post = Post.objects.create(author=self.author, title='Hello', slug='hello', content='...')
+
+    def comment(self, body, parent=None):
+        return Comment.objects.create(post=self.post, author=self.author, body=body, parent=parent)
+
+    def test_root_depth_and_path(self):
+        root = self.comment('root')
+        reply = self.comment('reply', root)
+        nested = self.comment('nested', reply)
+        self.assertEqual((root.root_id, root.depth, root.path), (None, 0, ''))
+        self.assertEqual((reply.root_id, reply.depth, reply.path), (root.id, 1, f'{root.id:010d}/'))
+        self.assertEqual((nested.root_id, nested.depth, nested.path), (root.id, 2, f'{root.id:010d}/{reply.id:010d}/'))
+
+    def test_path_order_is_tree_order(self):
+        root = self.comment('root')
+        first = self.comment('first', root)
+        second = self.comment('second', root)
+        under_first = self.comment('under first', first)
+        # path + id của chính bình luận sắp theo chuỗi là thứ tự duyệt cây theo chiều sâu
+        replies = sorted(Comment.objects.filter(root=root), key=lambda comment: comment.subtree_path)
+        self.assertEqual(replies, [first, under_first, second])
+
+    def test_subtree(self):
+        root = self.comment('root')
+        first = self.comment('first', root)
+        second = self.comment('second', root)
+        under_first = self.comment('under first', first)
+        deeper = self.comment('deeper', under_first)
+        self.assertCountEqual(first.subtree(), [under_first, deeper])
+        self.assertCountEqual(first.subtree(include_self=True), [first, under_first, deeper])
+        self.assertCountEqual(root.subtree(), [first, second, under_first, deeper])
+        self.assertFalse(second.subtree().exists())
+
+
+class LikeToggleTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Hello', slug='hello', content='...')
+
+    def test_toggle_uses_constant_queries(self):
+        fans = [User.objects.create_user(f'fan{i}') for i in range(50)]
+        self.post.liked_by.add(*fans)
+        Post.objects.filter(pk=self.post.pk).update(likes=len(fans))
+
+        with self.assertNumQueries(7):
+            liked, likes = toggle_like(self.post, self.author)
+        self.assertEqual((liked, likes), (True, 51))
+
+        with self.assertNumQueries(4):
+            liked, likes = toggle_like(self.post, self.author)
+        self.assertEqual((liked, likes), (False, 50))
+
+    def test_counter_without_update_returning(self):
+        with mock.patch('blog.likes.supports_update_returning', return_value=False):
+            self.assertEqual(add_likes(Post, self.post.pk, 1), 1)
+            self.assertEqual(add_likes(Post, self.post.pk, -1), 0)
+            self.assertEqual(add_likes(Post, self.post.pk, -1), 0)  # Không xuống dưới 0
+
+    def test_like_endpoint(self):
+        self.client.login(username='author', password='pass12345')
+        response = self.client.post('/like/hello/')
+        self.assertEqual(response.json(), {'likes': 1, 'liked': True})
+        response = self.client.post('/like/hello/')
+        self.assertEqual(response.json(), {'likes': 0, 'liked': False})
+
+
+# Transaction thật được commit: không để luồng tạo thumbnail ghi ảnh vào MEDIA_ROOT
+@override_settings(THUMBNAIL_WORKERS=0)
+class ConcurrentLikeTests(TransactionTestCase):
+    def test_counter_matches_through_table(self):
+        author = User.objects.create_user('author')
+        post = Post.objects.create(author=author, title='Viral', slug='viral', content='...')
+        users = [User.objects.create_user(f'user{i}') for i in range(8)]
+        errors = []
+        toggled = []
+
+        def hammer(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(25):
+                    try:
+                        toggle_like(post, rng.choice(users))
+                        toggled.append(seed)
+                    except OperationalError as exc:
+                        # SQLite in-memory (shared cache) báo "locked" ngay khi tranh chấp ghi;
+                        # transaction bị rollback trọn vẹn nên dữ liệu vẫn phải nhất quán.
+                        if 'locked' not in str(exc):
+                            raise
+            except Exception as exc:  # pragma: no cover - báo lỗi cho luồng chính
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=hammer, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertTrue(toggled)
+        post.refresh_from_db()
+        self.assertEqual(post.likes, post.liked_by.count())
+
+
+class NotificationSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author')
+        self.fan = User.objects.create_user('fan')
+        self.post = Post.objects.create(author=self.author, title='Hello', slug='hello', content='...')
+        self.notification = self.notify('liked your post')
+        self.client.force_login(self.author)
+
+    def notify(self, verb):
+        return Notification.objects.create(recipient=self.author, sender=self.fan, post=self.post, verb=verb)
+
+    def unread(self):
+        return get_notification_summary(self.author)['unread_count']
+
+    def test_summary_is_cached_until_a_new_notification(self):
+        self.assertEqual(self.unread(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread(), 1)
+        self.notify('commented on your post')
+        summary = get_notification_summary(self.author)
+        self.assertEqual(summary['unread_count'], 2)
+        self.assertEqual(summary['latest'][0]['verb'], 'commented on your post')
+
+    def test_reading_invalidates_summary(self):
+        self.assertEqual(self.unread(), 1)
+        self.client.get(reverse('blog:notification_list'))
+        self.assertEqual(self.unread(), 0)
+
+        self.notify('commented on your post')
+        self.assertEqual(self.unread(), 1)
+        self.client.post(reverse('blog:mark_notifications_read'), {'up_to': timezone.now().isoformat()})
+        self.assertEqual(self.unread(), 0)
+
+    def test_open_marks_read_only_on_post(self):
+        url = reverse('blog:notification_open', args=[self.notification.id])
+        self.assertRedirects(self.client.get(url), self.post.get_absolute_url(), fetch_redirect_response=False)
+        self.assertEqual(self.unread(), 1)
+        self.assertRedirects(self.client.post(url), self.post.get_absolute_url(), fetch_redirect_response=False)
+        self.assertEqual(self.unread(), 0)
+
+
+class AnnouncementCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.announcement = Announcement.objects.create(content='Bảo trì lúc 22h')
+
+    def test_cached_in_process(self):
+        self.assertEqual(get_active_announcement(), self.announcement)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_active_announcement(), self.announcement)
+
+    def test_save_and_delete_invalidate(self):
+        get_active_announcement()
+        self.announcement.content = 'Bảo trì lúc 23h'
+        self.announcement.save()
+        self.assertEqual(get_active_announcement().content, 'Bảo trì lúc 23h')
+        self.announcement.delete()
+        self.assertIsNone(get_active_announcement())
+
+    def test_admin_actions_invalidate(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_login(admin)
+        url = reverse('admin:blog_announcement_changelist')
+        get_active_announcement()
+        for action, expected in (('deactivate_announcements', None), ('activate_announcements', self.announcement)):
+            with self.subTest(action=action):
+                self.client.post(url, {'action': action, '_selected_action': [self.announcement.pk]})
+                self.assertEqual(get_active_announcement(), expected)
+
+    def test_change_from_another_process_is_seen_after_timeout(self):
+        get_active_announcement()
+        version = get_version(ANNOUNCEMENT_VERSION_KEY)
+        # update() không phát signal: giống thay đổi do tiến trình khác (cache không dùng chung)
+        Announcement.objects.update(is_active=False)
+        self.assertEqual(get_active_announcement(), self.announcement)
+        later = time.monotonic() + settings.ANNOUNCEMENT_CACHE_TIMEOUT + 1
+        with mock.patch('blog.caching.time.monotonic', return_value=later):
+            self.assertIsNone(get_active_announcement())
+        # Các trang đã cache kèm announcement cũ cũng được làm mới
+        self.assertNotEqual(get_version(ANNOUNCEMENT_VERSION_KEY), version)
+
+
+class SearchBackendTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user('author')
+        self.in_title = Post.objects.create(author=author, title='Django tips', slug='django-tips',
+                                            content='<p>Small things about the framework.</p>')
+        self.in_content = Post.objects.create(author=author, title='Weekend notes', slug='weekend-notes',
+                                              content='<p>I read about <b>Django</b> and tea.</p>')
+        self.in_content.tags.add('python')
+        self.unrelated = Post.objects.create(author=author, title='Gardening', slug='gardening', content='<p>Roses.</p>')
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 của SQLite')
+    def test_fts5_ranks_title_matches_first(self):
+        backend = search.SQLiteFTS5Backend()
+        self.assertEqual(backend.search('django'), [self.in_title.id, self.in_content.id])
+        self.assertEqual(backend.search('django', fields=('title',)), [self.in_title.id])
+        self.assertEqual(backend.search('pyth'), [])
+        self.assertEqual(backend.search('pyth', prefix=True), [self.in_content.id])
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 của SQLite')
+    def test_fts5_index_follows_edits_and_deletes(self):
+        backend = search.SQLiteFTS5Backend()
+        self.in_title.title = 'Flask tips'
+        self.in_title.save()
+        self.assertEqual(backend.search('flask'), [self.in_title.id])
+        self.in_content.delete()
+        self.assertEqual(backend.search('django'), [])
+
+    def test_like_fallback(self):
+        backend = search.LikeBackend()
+        self.assertCountEqual(backend.search('django'), [self.in_title.id, self.in_content.id])
+        self.assertEqual(backend.search('django tea'), [self.in_content.id])
+        self.assertEqual(backend.search('python', fields=('tags',)), [self.in_content.id])
+        self.assertEqual(backend.search('!!'), [])
+
+    def test_search_posts_keeps_backend_order(self):
+        with mock.patch.object(search.get_backend(), 'search', return_value=[self.unrelated.id, self.in_title.id]):
+            self.assertEqual(list(search.search_posts('anything')), [self.unrelated, self.in_title])
+
+
+class LiveSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user('author')
+        self.post = Post.objects.create(author=author, title='Django tips', slug='django-tips', content='...')
+        Post.objects.create(author=author, title='Djangology', slug='djangology', content='...')
+
+    def titles(self, query):
+        return [item['title'] for item in search.live_search(query)]
+
+    def test_short_queries_are_ignored(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(search.live_search('dj'), [])
+
+    def test_longer_prefix_is_narrowed_from_cache(self):
+        self.assertCountEqual(self.titles('dja'), ['Django tips', 'Djangology'])
+        # Tập kết quả của "dja" không bị cắt bớt nên "django t" lọc lại từ cache, không chạm DB
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles('django t'), ['Django tips'])
+
+    def test_truncated_results_are_not_narrowed(self):
+        author = self.post.author
+        for i in range(search.LIVE_SEARCH_LIMIT):
+            Post.objects.create(author=author, title=f'Django {i}', slug=f'django-{i}', content='...')
+        self.titles('dja')
+        with self.assertNumQueries(3):  # Tìm trong chỉ mục, nạp bài viết và tag
+            self.titles('djangol')
+
+    def test_cache_keys_are_valid_for_any_query(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            self.assertEqual(self.titles('django tiếng việt ' * 20), [])
+            self.assertEqual(self.titles('django t'), ['Django tips'])
+
+    def test_index_change_invalidates_cached_suggestions(self):
+        self.assertEqual(len(self.titles('djan')), 2)
+        self.post.title = 'Flask tips'
+        self.post.save()
+        self.assertEqual(self.titles('djan'), ['Djangology'])
+
+
+@override_settings(THUMBNAIL_WORKERS=0)
+class RelatedPostTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pass12345')
+
+    def post(self, slug, *tags):
+        post = Post.objects.create(author=self.author, title=slug, slug=slug, content='...')
+        post.tags.add(*tags)
+        refresh_related_posts(post)
+        return post
+
+    def related(self, post):
+        return list(RelatedPost.objects.filter(post=post).order_by('-score', '-related_id')
+                                       .values_list('related_id', flat=True))
+
+    def test_rare_tags_score_higher(self):
+        # Tag "python" có ở mọi bài, "orm" chỉ ở bài 1 và 2; hoà điểm thì bài mới (id lớn) trước
+        pairs = [(post_id, 'python') for post_id in (1, 2, 3, 4)] + [(1, 'orm'), (2, 'orm')]
+        scored = score_related(pairs, total_posts=4)
+        self.assertEqual([related_id for related_id, _ in scored[1]], [2, 4, 3])
+        self.assertEqual(len(score_related(pairs, total_posts=4, limit=2)[3]), 2)
+
+    def test_neighbours_are_trimmed(self):
+        with mock.patch('blog.related.RELATED_POSTS_STORED', 2):
+            posts = [self.post(f'post-{i}', 'python') for i in range(5)]
+        for post in posts:
+            self.assertLessEqual(len(self.related(post)), 2)
+        # Bài mới nhất vẫn có mặt trong danh sách của các bài cũ
+        self.assertIn(posts[-1].pk, self.related(posts[0]))
+
+    def test_refreshed_when_post_is_created_and_retagged(self):
+        other = self.post('other', 'orm', 'python')
+        self.client.force_login(self.author)
+        self.client.post(reverse('blog:post_create'), {'title': 'New', 'content': '...', 'tags': 'orm'})
+        new = Post.objects.get(title='New')
+        self.assertEqual(self.related(new), [other.pk])
+        self.assertEqual(self.related(other), [new.pk])
+
+        self.client.post(reverse('blog:post_edit', args=[new.slug]), {'title': 'New', 'content': '...',
+                                                                      'tags': 'flask'})
+        self.assertEqual(self.related(new), [])
+        self.assertEqual(self.related(other), [])
+
+
+class CommentCountTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.post = Post.objects.create(author=self.author, title='Hello', slug='hello', content='...')
+
+    def comment(self, parent=None):
+        return Comment.objects.create(post=self.post, author=self.author, body='...', parent=parent)
+
+    def comment_count(self):
+        return Post.objects.values_list('comment_count', flat=True).get(pk=self.post.pk)
+
+    def post_updates(self, queries):
+        return [query['sql'] for query in queries if query['sql'].startswith('UPDATE "blog_post"')]
+
+    def test_counter_follows_replies_and_deletes(self):
+        root = self.comment()
+        reply = self.comment(root)
+        nested = self.comment(reply)
+        self.comment(reply)
+        self.comment()
+        self.assertEqual(self.comment_count(), 5)
+
+        nested.delete()
+        self.assertEqual(self.comment_count(), 4)
+
+        version = get_post_version(self.post.pk)
+        with CaptureQueriesContext(connection) as queries:
+            root.delete_subtree()
+        self.assertEqual(self.comment_count(), 1)
+        # Một câu UPDATE bộ đếm và một lần vô hiệu hoá cache cho cả nhánh
+        self.assertEqual(len(self.post_updates(queries)), 1)
+        self.assertEqual(get_post_version(self.post.pk), version + 1)
+
+    def test_deleting_post_skips_per_comment_updates(self):
+        root = self.comment()
+        for _ in range(3):
+            self.comment(root)
+        with CaptureQueriesContext(connection) as queries:
+            self.post.delete()
+        self.assertEqual(self.post_updates(queries), [])
+        self.assertFalse(Comment.objects.exists())
+
+
+class CursorPaginatorTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user('author')
+        now = timezone.now()
+        for i in range(7):
+            Post.objects.create(author=author, title=f'Post {i}', slug=f'post-{i}', content='...')
+        # Hai bài trùng thời điểm: thứ tự phải được phân định bằng id
+        for i, post in enumerate(Post.objects.order_by('id')):
+            Post.objects.filter(pk=post.pk).update(created=now - timedelta(minutes=min(i, 5)))
+        self.ordered = list(Post.objects.order_by('-created', '-id'))
+        self.paginator = CursorPaginator(Post.objects.all(), 3)
+
+    def test_next_and_previous_cursors(self):
+        first = self.paginator.get_page()
+        self.assertEqual(list(first), self.ordered[:3])
+        self.assertFalse(first.has_previous)
+
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+        self.assertEqual(list(second), self.ordered[3:6])
+        self.assertEqual(list(third), self.ordered[6:])
+        self.assertFalse(third.has_next)
+
+        self.assertEqual(list(self.paginator.get_page(third.previous_cursor)), self.ordered[3:6])
+        back = self.paginator.get_page(second.previous_cursor)
+        self.assertEqual(list(back), self.ordered[:3])
+        self.assertFalse(back.has_previous)
+
+    def test_cursor_at_starts_page_on_object(self):
+        page = self.paginator.get_page(self.paginator.cursor_at(self.ordered[4]))
+        self.assertEqual(list(page), self.ordered[4:7])
+        self.assertTrue(page.has_previous)
+
+    def test_page_number_fallback(self):
+        self.assertEqual(list(self.paginator.get_page(page='2')), self.ordered[3:6])
+        self.assertEqual(list(self.paginator.get_page(page='abc')), self.ordered[:3])
+        self.assertEqual(list(self.paginator.get_page(cursor='not-a-cursor')), self.ordered[:3])
+        # Vượt quá dữ liệu hoặc quá lớn cho OFFSET của DB
+        self.assertEqual(list(self.paginator.get_page(page='4')), self.ordered[:3])
+        self.assertEqual(list(self.paginator.get_page(page='99999999999999999999999')), self.ordered[:3])
+
+    def cursor(self, payload):
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        payloads = [
+            {'d': 'next', 'k': ['garbage', 1]},
+            {'d': 'next', 'k': [None, 1]},
+            {'d': 'next', 'k': ['2020-01-01T00:00:00+00:00', 'abc']},
+            {'d': 'next', 'k': ['2020-01-01T00:00:00+00:00', 10 ** 30]},
+            {'d': 'previous', 'k': 'ab'},
+            ['next', [1, 2]],
+        ]
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                page = self.paginator.get_page(self.cursor(payload))
+                self.assertEqual(list(page), self.ordered[:3])
+                self.assertFalse(page.has_previous)
+
+    def test_bad_page_links_render(self):
+        for query in ('?page=99999999999999999999999', '?cursor=' + self.cursor({'d': 'next', 'k': [None, 1]})):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(reverse('blog:home') + query).status_code, 200)
+
+    def test_page_is_loaded_lazily(self):
+        with self.assertNumQueries(0):
+            page = self.paginator.get_page()
+        with self.assertNumQueries(1):
+            self.assertEqual(len(page), 3)
+
+
+@override_settings(THUMBNAIL_WORKERS=0, VIEW_COUNTER_FLUSH_INTERVAL=3600, VIEW_COUNTER_MAX_PENDING=10 ** 6,
+                   TRENDING_REFRESH_INTERVAL=0)
+class PageCacheInvalidationTests(TestCase):
+    """Trang đã cache cho khách chỉ bị làm mới khi nội dung hiển thị trên đó thay đổi."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='pass12345')
+        self.liked = Post.objects.create(author=self.author, title='Liked', slug='liked', content='...')
+        self.other = Post.objects.create(author=self.author, title='Other', slug='other', content='...')
+        self.guest = Client()
+        self.urls = [reverse('blog:home'), self.liked.get_absolute_url(), self.other.get_absolute_url()]
+        for url in self.urls:
+            self.assertEqual(self.guest.get(url).status_code, 200)
+
+    def assertCached(self, url):
+        with self.assertNumQueries(0):
+            self.guest.get(url)
+
+    def assertRendered(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.guest.get(url)
+        self.assertTrue(queries.captured_queries, f'{url} vẫn được phục vụ từ cache')
+
+    def test_login_keeps_pages(self):
+        self.assertTrue(self.client.login(username='author', password='pass12345'))
+        self.author.profile.save()
+        for url in self.urls:
+            self.assertCached(url)
+
+    def test_like_only_refreshes_liked_post(self):
+        toggle_like(self.liked, self.author)
+        self.assertCached(self.urls[0])
+        self.assertCached(self.other.get_absolute_url())
+        self.assertRendered(self.liked.get_absolute_url())
+
+    def test_comment_only_refreshes_its_post(self):
+        Comment.objects.create(post=self.liked, author=self.author, body='Hi')
+        self.assertCached(self.other.get_absolute_url())
+        self.assertRendered(self.liked.get_absolute_url())
+
+    def test_username_change_refreshes_pages(self):
+        self.author.username = 'renamed'
+        self.author.save()
+        self.assertRendered(self.urls[0])
+        self.assertContains(self.guest.get(self.other.get_absolute_url()), 'renamed')
+
+    def test_avatar_change_refreshes_pages(self):
+        profile = self.author.profile
+        profile.avatar = 'profile_pics/author.jpg'
+        profile.save()
+        for url in self.urls:
+            self.assertRendered(url)
+
+
+@override_settings(THUMBNAIL_WORKERS=0, VIEW_COUNTER_FLUSH_INTERVAL=3600, VIEW_COUNTER_MAX_PENDING=10 ** 6,
+                   TRENDING_REFRESH_INTERVAL=0)
+class PostDetailETagTests(TestCase):
+    """Trang chi tiết trả 304 cho tới khi nội dung hiển thị thay đổi, rồi lại 200 với ETag mới."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author')
+        self.reader = User.objects.create_user('reader', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Hello', slug='hello', content='...',
+                                        attachment='uploads/hello.jpg')
+        self.client.login(username='reader', password='pass12345')
+        self.url = self.post.get_absolute_url()
+
+    def assertChangedAfter(self, mutate):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        mutate()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_like(self):
+        self.assertChangedAfter(lambda: toggle_like(self.post, self.reader))
+
+    def test_comment_delete(self):
+        comment = Comment.objects.create(post=self.post, author=self.author, body='Hi')
+        self.assertChangedAfter(comment.delete_subtree)
+
+    def test_thumbnail_ready(self):
+        self.assertChangedAfter(lambda: thumbnails.mark_ready(Post, [(self.post.pk, 'uploads/hello.jpg', True)],
+                                                              'thumbnail'))
+
+    def test_author_avatar(self):
+        def change_avatar():
+            profile = Profile.objects.get(user=self.author)
+            profile.avatar = 'profile_pics/author.jpg'
+            profile.save()
+        self.assertChangedAfter(change_avatar)
+
+
+@override_settings(THUMBNAIL_WORKERS=0, THUMBNAIL_JOB_TIMEOUT=600)
+class ThumbnailJobTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user('author')
+        self.post = Post.objects.create(author=author, title='Hello', slug='hello', content='...')
+
+    def job(self, **fields):
+        return ThumbnailJob.objects.create(model='blog.post', object_id=self.post.pk, spec='thumbnail', **fields)
+
+    def status(self, job):
+        return ThumbnailJob.objects.values_list('status', flat=True).get(pk=job.pk)
+
+    def test_claim_records_time(self):
+        job = self.job()
+        claimed = thumbnails.claim_next_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(self.status(job), ThumbnailJob.RUNNING)
+        self.assertIsNotNone(ThumbnailJob.objects.get(pk=job.pk).claimed_at)
+
+    def test_stale_running_jobs_are_requeued(self):
+        now = timezone.now()
+        stale = self.job(status=ThumbnailJob.RUNNING, attempts=1, claimed_at=now - timedelta(hours=1))
+        alive = self.job(status=ThumbnailJob.RUNNING, attempts=1, claimed_at=now - timedelta(minutes=1))
+        exhausted = self.job(status=ThumbnailJob.RUNNING, attempts=thumbnails.MAX_ATTEMPTS,
+                             claimed_at=now - timedelta(hours=1))
+        self.assertEqual(thumbnails.requeue_stale_jobs(now), 1)
+        self.assertEqual(self.status(stale), ThumbnailJob.PENDING)
+        self.assertEqual(self.status(alive), ThumbnailJob.RUNNING)
+        self.assertEqual(self.status(exhausted), ThumbnailJob.FAILED)
+
+    def test_worker_finishes_abandoned_job(self):
+        # Job được nhận trước khi có claimed_at, tiến trình đã chết
+        job = self.job(status=ThumbnailJob.RUNNING, attempts=1)
+        self.assertEqual(thumbnails.process_pending(), 1)
+        self.assertFalse(ThumbnailJob.objects.filter(pk=job.pk).exists())
+
+    def test_default_avatar_is_shared(self):
+        profile = Profile.objects.get(user__username='author')
+        self.assertFalse(ThumbnailJob.objects.filter(model='blog.profile').exists())
+        self.assertEqual(spec_url(profile, 'avatar_thumbnail'), profile.avatar.url)
+        self.assertIn(f'src="{profile.avatar.url}"', picture(profile, 'avatar'))
+
+        profile.avatar = 'profile_pics/author.jpg'
+        profile.save()
+        self.assertEqual(ThumbnailJob.objects.filter(model='blog.profile', object_id=profile.pk).count(),
+                         len(thumbnails.all_specs('blog.profile')))
+        self.assertNotEqual(spec_url(profile, 'avatar_thumbnail'), profile.avatar.url)
+
+    def render_picture(self, variant_set, **variants):
+        Post.objects.filter(pk=self.post.pk).update(attachment='uploads/hello.jpg', image_variants=variants)
+        template = Template("{% load blog_extras %}{% picture post set sizes='33vw' class='card-img-top' %}")
+        return template.render(Context({'post': Post.objects.get(pk=self.post.pk), 'set': variant_set}))
+
+    def test_picture_renders_variants(self):
+        def variant(image_format, width, height):
+            return {'format': image_format, 'width': width, 'height': height, 'bytes': 1,
+                    'name': f'CACHE/variants/hello-{width}.{image_format}'}
+
+        html = self.render_picture('card', card=[variant('webp', 400, 250), variant('webp', 800, 500),
+                                                 variant('jpeg', 400, 250), variant('jpeg', 800, 500)])
+        webp = '/media/CACHE/variants/hello-400.webp 400w, /media/CACHE/variants/hello-800.webp 800w'
+        jpeg = '/media/CACHE/variants/hello-400.jpeg 400w, /media/CACHE/variants/hello-800.jpeg 800w'
+        self.assertIn(f'<source type="image/webp" srcset="{webp}" sizes="33vw">', html)
+        self.assertIn(f'<img src="/media/CACHE/variants/hello-400.jpeg" srcset="{jpeg}" sizes="33vw"', html)
+        self.assertIn('width="400"', html)
+        self.assertIn('height="250"', html)
+        self.assertIn('class="card-img-top"', html)
+        self.assertNotIn('image/jpeg', html)
+
+    def test_picture_falls_back_until_variants_are_ready(self):
+        # Bộ 'card' dùng thumbnail (ở đây là placeholder), bộ 'full' dùng thẳng ảnh gốc
+        html = self.render_picture('card')
+        self.assertNotIn('<picture>', html)
+        self.assertIn(f'<img src="{static(PLACEHOLDERS["thumbnail"])}" class="card-img-top">', html)
+        html = self.render_picture('full', card=[])
+        self.assertIn('<img src="/media/uploads/hello.jpg" class="card-img-top">', html)
+
+
+class UploadTests(TestCase):
+    def image_bytes(self, image_format='PNG', size=(40, 30)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, image_format)
+        return buffer.getvalue()
+
+    def test_sniff_uses_content_not_extension(self):
+        self.assertEqual(uploads.sniff(self.image_bytes()[:uploads.SNIFF_LENGTH], 'notes.txt'), 'image/png')
+        self.assertEqual(uploads.sniff(self.image_bytes('WEBP')[:uploads.SNIFF_LENGTH], 'a.jpg'), 'image/webp')
+        self.assertEqual(uploads.sniff(b'%PDF-1.7\n', 'a.png'), 'application/pdf')
+        self.assertEqual(uploads.sniff(b'\x00\x01\x02\xff' * 8, 'a.txt'), 'application/octet-stream')
+        self.assertEqual(uploads.sniff(b'', 'a.png'), 'application/octet-stream')
+
+    def test_sniff_text(self):
+        self.assertEqual(uploads.sniff(b'a,b\n1,2\n', 'data.csv'), 'text/csv')
+        # Ký tự nhiều byte bị cắt ở cuối đoạn đọc vẫn là văn bản
+        self.assertEqual(uploads.sniff('Xin chào'.encode()[:-1], 'note'), 'text/plain')
+
+    def test_describe_reads_image_header(self):
+        data = self.image_bytes()
+        post = Post(attachment=SimpleUploadedFile('cover.txt', data))
+        self.assertEqual(uploads.describe(post.attachment),
+                         {'mime_type': 'image/png', 'width': 40, 'height': 30, 'size_bytes': len(data)})
+
+    def test_describe_broken_image(self):
+        data = self.image_bytes()[:40]
+        post = Post(attachment=SimpleUploadedFile('cover.png', data))
+        self.assertEqual(uploads.describe(post.attachment),
+                         {'mime_type': 'application/octet-stream', 'width': None, 'height': None,
+                          'size_bytes': len(data)})
+
+    @override_settings(BLOG_MAX_UPLOAD_SIZE=1024)
+    def test_oversized_upload_is_rejected(self):
+        User.objects.create_user('author', password='pass12345')
+        self.client.login(username='author', password='pass12345')
+        response = self.client.post(reverse('blog:post_create'), {
+            'title': 'Big', 'content': '...', 'tags': 'python',
+            'attachment': SimpleUploadedFile('big.bin', b'x' * 4096),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context['form'], 'attachment', uploads.size_error('big.bin'))
+        self.assertFalse(Post.objects.exists())
+
+
+class TextFieldsTests(TestCase):
+    def test_html_is_stripped(self):
+        fields = text_fields('<p>Xin &amp; chào <b>bạn</b></p>')
+        self.assertEqual(fields, {'plain_text': 'Xin & chào bạn', 'word_count': 4, 'reading_minutes': 1,
+                                  'excerpt': 'Xin & chào bạn'})
+
+    def test_reading_minutes_rounds_up(self):
+        self.assertEqual(reading_minutes(0), 1)
+        self.assertEqual(reading_minutes(WORDS_PER_MINUTE), 1)
+        self.assertEqual(reading_minutes(WORDS_PER_MINUTE + 1), 2)
+        self.assertEqual(reading_time('word ' * (WORDS_PER_MINUTE * 2 + 1)), 3)
+
+    def test_excerpt_is_truncated(self):
+        fields = text_fields(' '.join(f'w{i}' for i in range(EXCERPT_WORDS * 3)))
+        self.assertEqual(fields['word_count'], EXCERPT_WORDS * 3)
+        self.assertEqual(fields['excerpt'], ' '.join(f'w{i}' for i in range(EXCERPT_WORDS)) + '…')
+
+    def test_save_keeps_fields_in_sync(self):
+        author = User.objects.create_user('author')
+        post = Post.objects.create(author=author, title='Hello', slug='hello', content='<p>one two</p>')
+        post.content = '<p>' + 'word ' * (WORDS_PER_MINUTE + 1) + '</p>'
+        post.save(update_fields=['content'])
+        stored = Post.objects.values('word_count', 'reading_minutes').get(pk=post.pk)
+        self.assertEqual(stored, {'word_count': WORDS_PER_MINUTE + 1, 'reading_minutes': 2})
+
+        # content bị defer: không tính lại (và không ghi đè) các cột văn bản
+        listed = Post.objects.defer('content').get(pk=post.pk)
+        listed.title = 'Renamed'
+        listed.save(update_fields=['title'])
+        self.assertEqual(Post.objects.values_list('word_count', flat=True).get(pk=post.pk), WORDS_PER_MINUTE + 1)
+
+
+@override_settings(THUMBNAIL_WORKERS=0, VIEW_COUNTER_FLUSH_INTERVAL=3600, VIEW_COUNTER_MAX_PENDING=10 ** 6,
+                   TRENDING_REFRESH_INTERVAL=0)
+class ViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Mọi URL của blog/urls.py phải nằm trong ngân sách @query_budget của view và số
+    truy vấn không được tăng khi dữ liệu tăng (dữ liệu được bơm thêm giữa các lần đo).
+    """
+    SIZES = (1, 4, 12)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pass12345')
+        cls.reader = User.objects.create_user('reader', password='pass12345')
+        cls.staff = User.objects.create_user('staff', password='pass12345', is_staff=True)
+        cls.fans = [User.objects.create_user(f'fan{i}') for i in range(max(cls.SIZES))]
+        cls.tags = ['python', 'django', 'sqlite']
+        cls.seeded = 0
+
+    def seed(self, size):
+        """Bơm thêm dữ liệu tới khi có `size` bài viết (mỗi bài kèm tag, bình luận, like, thông báo)."""
+        for i in range(self.seeded, size):
+            post = Post.objects.create(author=self.author, title=f'Post {i}', slug=f'post-{i}',
+                                       content='<p>' + 'lorem ipsum ' * 50 + '</p>')
+            post.tags.add(*self.tags[:i % len(self.tags) + 1])
+            fans = self.fans[:i + 1]
+            post.liked_by.add(*fans)
+            Post.objects.filter(pk=post.pk).update(likes=len(fans))
+            for fan in fans:
+                comment = Comment.objects.create(post=post, author=fan, body=f'Comment by {fan.username}')
+                reply = Comment.objects.create(post=post, author=self.reader, body='Reply', parent=comment)
+                comment.liked_by.add(self.reader)
+                Notification.objects.create(recipient=self.author, sender=fan, post=post, verb='liked your post')
+                Notification.objects.create(recipient=fan, sender=self.reader, comment=reply, verb='replied')
+            ContactMessage.objects.create(name=f'Guest {i}', email='guest@example.com', message='Hello')
+        self.seeded = max(self.seeded, size)
+        refresh_related_posts(Post.objects.get(slug='post-0'))
+        trending.refresh_trending()
+
+    def requests(self):
+        """(nhãn, người dùng, method, đường dẫn, dữ liệu) cho mọi URL trong blog/urls.py."""
+        post = Post.objects.get(slug='post-0')
+        popular = Post.objects.get(slug=f'post-{self.seeded - 1}')  # Số người like tăng theo dữ liệu
+        comment = Comment.objects.filter(post=post, parent__isnull=True).first()
+        notification = Notification.objects.filter(recipient=self.author).first()
+        victim = Post.objects.create(author=self.author, title='Victim', slug='victim', content='...')
+        doomed_comment = Comment.objects.create(post=post, author=self.reader, body='Doomed')
+        # Trạng thái like cố định trước mỗi lượt đo: like/unlike tốn số truy vấn khác nhau
+        post.liked_by.remove(self.reader)
+        comment.liked_by.remove(self.reader)
+        return [
+            ('home', None, 'get', reverse('blog:home'), None),
+            ('home', self.reader, 'get', reverse('blog:home'), None),
+            ('about', None, 'get', reverse('blog:about'), None),
+            ('contact', None, 'get', reverse('blog:contact'), None),
+            ('post_create', self.author, 'get', reverse('blog:post_create'), None),
+            ('post_detail', None, 'get', post.get_absolute_url(), None),
+            ('post_detail', self.reader, 'get', post.get_absolute_url(), None),
+            ('post_detail', self.reader, 'get', f'{post.get_absolute_url()}?comment_id={comment.id}', None),
+            ('post_likers', None, 'get', reverse('blog:post_likers', args=[popular.slug]), None),
+            ('post_edit', self.author, 'get', reverse('blog:post_edit', args=[post.slug]), None),
+            ('post_delete', self.author, 'post', reverse('blog:post_delete', args=[victim.slug]), None),
+            ('user_profile', self.author, 'get', reverse('blog:user_profile'), None),
+            ('public_user_profile', None, 'get', reverse('blog:public_user_profile', args=['author']), None),
+            ('search', None, 'get', reverse('blog:search') + '?q=lorem', None),
+            ('live_search', None, 'get', reverse('blog:live_search') + '?q=post', None),
+            ('tagged_posts', None, 'get', reverse('blog:tagged_posts', args=['python']), None),
+            ('trending', None, 'get', reverse('blog:trending'), None),
+            ('like_post', self.reader, 'post', reverse('blog:like_post', args=[post.slug]), None),
+            ('like_post', self.reader, 'post', f'/post/{post.id}/like/', None),
+            ('notification_list', self.author, 'get', reverse('blog:notification_list'), None),
+            ('mark_notifications_read', self.author, 'post', reverse('blog:mark_notifications_read'),
+             {'up_to': notification.timestamp.isoformat()}),
+            ('notification_open', self.author, 'get', reverse('blog:notification_open', args=[notification.id]), None),
+            ('notification_open', self.author, 'post', reverse('blog:notification_open', args=[notification.id]), None),
+            ('like_comment', self.reader, 'post', reverse('blog:like_comment', args=[comment.id]), None),
+            ('delete_comment', self.reader, 'post', reverse('blog:delete_comment', args=[doomed_comment.id]), None),
+            ('password_reset', None, 'get', reverse('blog:password_reset'), None),
+            ('password_reset_done', None, 'get', reverse('blog:password_reset_done'), None),
+            ('password_reset_confirm', None, 'get', reverse('blog:password_reset_confirm', args=['MQ', 'bad-token']), None),
+            ('password_reset_complete', None, 'get', reverse('blog:password_reset_complete'), None),
+        ]
+
+    def test_every_url_is_covered(self):
+        from . import urls
+
+        self.seed(1)
+        covered = {name for name, *_ in self.requests()}
+        # Các URL admin/messages/... bị admin.site.urls ('admin/' trong Bai1/urls.py) che mất
+        shadowed = {'contact_messages', 'toggle_message_read', 'delete_contact_message'}
+        self.assertEqual({pattern.name for pattern in urls.urlpatterns} - shadowed, covered)
+
+    def test_rows_are_counted_per_thread(self):
+        with count_queries() as count:
+            thread = threading.Thread(target=lambda: [Post() for _ in range(5)])
+            thread.start()
+            thread.join()
+            Post()
+        self.assertEqual(count.rows, 1)
+
+    def test_queries_within_budget_and_constant(self):
+        counts = {}
+        for size in self.SIZES:
+            self.seed(size)
+            for position, (name, user, method, path, data) in enumerate(self.requests()):
+                self.client.logout()
+                if user is not None:
+                    self.client.force_login(user)
+                cache.clear()
+                with self.subTest(url=name, path=path, size=size):
+                    response, count = self.assertWithinBudget(method, path, data)
+                    self.assertLess(response.status_code, 400)
+                    counts.setdefault((position, name), {})[size] = count
+        for (_, name), by_size in counts.items():
+            with self.subTest(url=name):
+                self.assertConstantQueries(by_size, name)
+
+
+@override_settings(NOTIFICATION_QUEUE_SYNC=True)
+class NotificationQueueTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Hello', slug='hello', content='...')
+        self.fans = [User.objects.create_user(f'fan{i}', password='pass12345') for i in range(3)]
+
+    def like(self, user):
+        self.client.force_login(user)
+        # Ghi thông báo đồng bộ cũng phải nằm trong ngân sách của like_post
+        with self.settings(QUERY_BUDGET_CHECK=True), self.assertNoLogs('blog.query_budget', 'WARNING'):
+            return self.client.post(f'/like/{self.post.slug}/')
+
+    def test_likes_are_coalesced_and_deduplicated(self):
+        for _ in range(3):  # like/unlike/like
+            self.like(self.fans[0])
+        self.like(self.fans[1])
+        self.like(self.fans[2])
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.actor_ids, [fan.id for fan in self.fans])
+        self.assertEqual((notification.sender, notification.others_count), (self.fans[2], 2))
+
+        self.client.force_login(self.author)
+        self.assertContains(self.client.get(reverse('blog:notification_list')), 'and 2 others liked your post')
+
+    def test_events_are_only_queued_inside_the_request(self):
+        with self.settings(NOTIFICATION_QUEUE_SYNC=False), self.captureOnCommitCallbacks() as callbacks:
+            self.like(self.fans[0])
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(notifications.flush(), 1)
+        self.assertEqual(Notification.objects.get().sender, self.fans[0])
+
+    def test_reply_notification_points_to_saved_reply(self):
+        comment = Comment.objects.create(post=self.post, author=self.author, body='First')
+        self.client.force_login(self.fans[0])
+        response = self.client.post(self.post.get_absolute_url(), {'body': 'Reply', 'parent_id': comment.id})
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.comment_id, response.json()['comment_id'])
+        self.assertEqual((notification.kind, notification.post), (notifications.REPLY, self.post))
+
+
+class NotificationInboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='pass12345')
+        sender = User.objects.create_user('sender')
+        post = Post.objects.create(author=self.user, title='Hello', slug='hello', content='...')
+        Notification.objects.bulk_create([
+            Notification(recipient=self.user, sender=sender, post=post, verb=f'liked your post #{i}')
+            for i in range(views.NOTIFICATIONS_PER_PAGE + 5)
+        ])
+        self.client.force_login(self.user)
+
+    def test_only_rendered_page_is_marked_read(self):
+        response = self.client.get(reverse('blog:notification_list'))
+        self.assertEqual(response.content.decode().count('list-group-item unread'), views.NOTIFICATIONS_PER_PAGE)
+        self.assertEqual(Notification.objects.filter(read=False).count(), 5)
+
+        response = self.client.get(reverse('blog:notification_list'), {'cursor': response.context['notifications'].next_cursor})
+        self.assertEqual(len(response.context['notifications']), 5)
+        self.assertFalse(Notification.objects.filter(read=False).exists())
+
+    def test_mark_all_read_stops_at_high_water_mark(self):
+        newest = Notification.objects.order_by('-timestamp', '-id').first()
+        later = Notification.objects.create(recipient=self.user, sender=newest.sender, verb='later')
+        Notification.objects.filter(pk=later.pk).update(timestamp=newest.timestamp + timedelta(seconds=1))
+        self.client.post(reverse('blog:mark_notifications_read'), {'up_to': newest.timestamp.isoformat()})
+        self.assertEqual(list(Notification.objects.filter(read=False)), [later])
+
+    def test_purge_removes_old_read_notifications_in_batches(self):
+        old = timezone.now() - timedelta(days=100)
+        Notification.objects.filter(pk__in=Notification.objects.values('pk')[:10]).update(timestamp=old)
+        Notification.objects.filter(pk__in=Notification.objects.filter(timestamp=old).values('pk')[:7]).update(read=True)
+        self.assertEqual(notifications.purge_read(days=90, batch_size=3), 7)
+        self.assertEqual(Notification.objects.count(), views.NOTIFICATIONS_PER_PAGE + 5 - 7)
+
+
+@mock.patch.object(views, 'LIKERS_PER_PAGE', 2)
+class PostLikersTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user('author')
+        self.post = Post.objects.create(author=author, title='Hello', slug='hello', content='...')
+        # Like lần lượt: fan0 cũ nhất, fan4 mới nhất
+        for i in range(5):
+            self.post.liked_by.add(User.objects.create_user(f'fan{i}'))
+        self.url = reverse('blog:post_likers', args=[self.post.slug])
+
+    def usernames(self, response):
+        return [like.user.username for like in response.context['likers']]
+
+    def test_newest_first_across_pages(self):
+        seen = []
+        response = self.client.get(self.url)
+        while True:
+            seen.append(self.usernames(response))
+            likers = response.context['likers']
+            if not likers.has_next:
+                break
+            self.assertContains(response, f'?cursor={likers.next_cursor}')
+            response = self.client.get(self.url, {'cursor': likers.next_cursor})
+        self.assertEqual(seen, [['fan4', 'fan3'], ['fan2', 'fan1'], ['fan0']])
+
+    def test_invalid_cursor_shows_first_page(self):
+        for cursor in ('garbage', '!!!', base64.urlsafe_b64encode(b'[null]').decode()):
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.usernames(response), ['fan4', 'fan3'])
+
+    def test_unknown_post(self):
+        response = self.client.get(reverse('blog:post_likers', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_no_likes(self):
+        self.post.liked_by.clear()
+        self.assertContains(self.client.get(self.url), 'This post has no likes yet.')
+
+
+@override_settings(THUMBNAIL_WORKERS=0, VIEW_COUNTER_FLUSH_INTERVAL=3600, VIEW_COUNTER_MAX_PENDING=10 ** 6)
+class CommentLikedStateTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.reader = User.objects.create_user('reader')
+        self.post = Post.objects.create(author=self.author, title='Thread', slug='thread', content='...')
+        self.comment = Comment.objects.create(post=self.post, author=self.author, body='Root')
+        self.reply = Comment.objects.create(post=self.post, author=self.author, body='Reply', parent=self.comment)
+        self.other = Comment.objects.create(post=self.post, author=self.author, body='Other')
+        self.comment.liked_by.add(self.reader)
+        self.reply.liked_by.add(self.reader)
+        self.client.force_login(self.reader)
+
+    def render(self):
+        cache.clear()
+        return self.measure('get', self.post.get_absolute_url())
+
+    def test_liked_flags_come_from_the_page_comments(self):
+        response, _ = self.render()
+        roots = response.context['comments'].object_list
+        liked = {comment.id: comment.liked for comment in roots}
+        liked.update({child.id: child.liked for child in roots[0].children})
+        self.assertEqual(liked, {self.comment.id: True, self.reply.id: True, self.other.id: False})
+
+    def test_cost_is_independent_of_like_history(self):
+        _, before = self.render()
+        elsewhere = Post.objects.create(author=self.author, title='Elsewhere', slug='elsewhere', content='...')
+        history = [Comment.objects.create(post=elsewhere, author=self.author, body=f'#{i}') for i in range(200)]
+        self.reader.liked_comments.add(*history)
+        response, after = self.render()
+        self.assertEqual(len(after), len(before))
+        self.assertEqual(after.rows, before.rows)
+        # Bảng like của bình luận chỉ được tra qua EXISTS theo từng bình luận trên trang
+        self.assertFalse([sql for sql in after.queries if 'blog_comment_liked_by' in sql and 'EXISTS' not in sql])
+        self.assertNotIn('user_liked_comment_ids', response.context)
+
+
+REPLICA_DATABASES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+    'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+}
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    router = PrimaryReplicaRouter()
+
+    def test_reads_use_replica_only_inside_read_only_requests(self):
+        with self.settings(DATABASES=REPLICA_DATABASES):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+            with reading_from_replica():
+                self.assertEqual(self.router.db_for_read(Post), 'replica')
+                # Sau khi ghi, phần còn lại của request đọc từ DB chính
+                self.assertEqual(self.router.db_for_write(Post), 'default')
+                self.assertEqual(self.router.db_for_read(Post), 'default')
+            with reading_from_replica(enabled=False):
+                self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_no_replica_configured(self):
+        with reading_from_replica():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_replica_is_never_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'blog'))
+        self.assertFalse(self.router.allow_migrate('replica', 'blog'))
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN của SQLite')
+class QueryPlanTests(TestCase):
+    """Các truy vấn nóng phải đi qua chỉ mục: không được có bước SCAN cả bảng."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader')
+        cls.post = Post.objects.create(author=cls.user, title='Hello', slug='hello', content='...')
+
+    def assertUsesIndexes(self, queryset):
+        plan = queryset.explain()
+        scans = [line for line in plan.splitlines()
+                 if 'SCAN ' in line and 'INDEX' not in line and 'CONSTANT ROW' not in line]
+        self.assertFalse(scans, f'{queryset.query}\n{plan}')
+
+    def test_post_queries(self):
+        now = timezone.now()
+        listing = Post.objects.for_listing().filter(created__lte=now)
+        self.assertUsesIndexes(listing.order_by('-created', '-id')[:10])
+        self.assertUsesIndexes(listing.filter(created__gte=now - timedelta(days=7)).order_by('-likes', '-created')[:1])
+        self.assertUsesIndexes(Post.objects.filter(slug='hello'))
+        self.assertUsesIndexes(Post.objects.filter(slug__startswith='hello').values_list('slug', flat=True))
+        self.assertUsesIndexes(Post.objects.for_listing().filter(author=self.user).order_by('-created', '-id')[:10])
+        self.assertUsesIndexes(Post.liked_by.through.objects.filter(post_id=self.post.id).order_by('-id')[:20])
+
+    def test_comment_queries(self):
+        top_level = self.post.comments.filter(active=True, parent__isnull=True).order_by('created', 'id')[:10]
+        self.assertUsesIndexes(top_level)
+        self.assertUsesIndexes(Comment.objects.filter(root__in=[1, 2], active=True).order_by('created', 'id'))
+        self.assertUsesIndexes(Comment.liked_by.through.objects.filter(comment_id=1, user_id=self.user.id))
+
+    def test_notification_queries(self):
+        inbox = Notification.objects.filter(recipient=self.user)
+        self.assertUsesIndexes(inbox.order_by('-timestamp', '-id')[:20])
+        self.assertUsesIndexes(inbox.filter(read=False, timestamp__lte=timezone.now()))
+        cutoff = timezone.now() - timedelta(days=90)
+        self.assertUsesIndexes(Notification.objects.filter(read=True, timestamp__lt=cutoff).values_list('id', flat=True))
+
+    def test_other_queries(self):
+        self.assertUsesIndexes(ContactMessage.objects.order_by('-timestamp'))
+        self.assertUsesIndexes(ThumbnailJob.objects.filter(status=ThumbnailJob.PENDING).order_by('id')[:50])
+        self.assertUsesIndexes(trending.trending_entries()[:trending.TRENDING_PER_PAGE])
+
+
+@override_settings(TRENDING_REFRESH_INTERVAL=0, TRENDING_HALF_LIFE_HOURS=24, TRENDING_WINDOW_DAYS=7)
+class TrendingTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.quiet = Post.objects.create(author=self.author, title='Quiet', slug='quiet', content='...')
+        self.busy = Post.objects.create(author=self.author, title='Busy', slug='busy', content='...')
+        Post.objects.filter(pk=self.busy.pk).update(likes=4, viewer=10)
+        self.now = timezone.now()
+        trending.refresh_trending(now=self.now)
+
+    def scores(self):
+        return dict(TrendingPost.objects.values_list('post__slug', 'score'))
+
+    def test_ranks_by_activity_and_decays(self):
+        self.assertEqual([entry.post for entry in trending.trending_entries()], [self.busy, self.quiet])
+        self.assertAlmostEqual(self.scores()['busy'], trending.activity_score(4, 10, 0))
+
+        # Một chu kỳ bán rã không có hoạt động mới: điểm giảm một nửa, không dòng nào phải cộng điểm
+        self.assertEqual(trending.refresh_trending(now=self.now + timedelta(hours=24)), 0)
+        self.assertAlmostEqual(self.scores()['busy'], trending.activity_score(4, 10, 0) / 2)
+
+    def test_only_new_activity_is_added(self):
+        Post.objects.filter(pk=self.quiet.pk).update(likes=1, comment_count=3)
+        self.assertEqual(trending.refresh_trending(now=self.now), 1)
+        self.assertAlmostEqual(self.scores()['quiet'], trending.activity_score(1, 0, 3))
+        self.assertEqual(trending.top_post(), self.quiet)
+        self.assertEqual(self.client.get(reverse('blog:home')).context['featured_post'], self.quiet)
+
+    def test_posts_leave_the_window(self):
+        Post.objects.filter(pk=self.quiet.pk).update(created=self.now - timedelta(days=8))
+        trending.refresh_trending(now=self.now)
+        self.assertEqual(list(self.scores()), ['busy'])
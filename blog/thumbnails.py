@@ -0,0 +1,348 @@
+"""
+Tạo thumbnail (ImageSpecField của imagekit) ngoài request.
+
+Mặc định imagekit tạo ảnh ngay lần đầu template gọi `.url` (chiến lược JustInTime)
+và kiểm tra sự tồn tại của file ở mọi lần render sau. Ở đây:
+
+- DeferredStrategy: `.url` chỉ tính đường dẫn, không bao giờ tạo ảnh hay chạm tới storage.
+- Khi ảnh gốc (attachment/avatar) thay đổi, cờ `<spec>_ready` về False và một
+  ThumbnailJob được ghi vào bảng hàng đợi; một pool luồng trong tiến trình
+  (settings.THUMBNAIL_WORKERS) lấy job ra tạo ảnh rồi bật lại cờ. Không cần broker.
+- Template dùng filter `spec_url` (blog_extras): ảnh chưa sẵn sàng thì hiện placeholder.
+- Biến thể responsive (VARIANTS): ảnh gốc được thu nhỏ về nhiều chiều rộng, mỗi
+  chiều rộng ở AVIF (nếu Pillow hỗ trợ), WebP và JPEG. Kích thước, số byte và đường
+  dẫn từng file được lưu vào một JSONField (vd. Post.image_variants) bằng cùng hàng
+  đợi job; tag `{% picture %}` (blog_extras) dựng <picture> với srcset/sizes.
+- Job bị bỏ dở khi tiến trình chết giữa chừng (status "running" quá THUMBNAIL_JOB_TIMEOUT
+  giây kể từ claimed_at) được đưa lại hàng đợi mỗi khi worker bắt đầu xử lý.
+- manage.py process_thumbnail_jobs xử lý hàng đợi thủ công (vd. khi THUMBNAIL_WORKERS = 0),
+  manage.py warm_thumbnails tạo hàng loạt song song bằng ProcessPoolExecutor.
+"""
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .caching import invalidate_content
+
+logger = logging.getLogger(__name__)
+
+# model -> {spec: trường ảnh gốc}
+SPECS = {
+    'blog.post': {'thumbnail': 'attachment'},
+    'blog.profile': {'avatar_thumbnail': 'avatar'},
+}
+# model -> {JSONField lưu biến thể: (trường ảnh gốc, {bộ biến thể: (tỉ lệ khung cắt hoặc None, các chiều rộng)})}
+VARIANTS = {
+    'blog.post': {'image_variants': ('attachment', {
+        'card': ((8, 5), (400, 800)),  # Ảnh thẻ bài viết (aspect-ratio 16/10)
+        'full': (None, (640, 1024, 1600)),  # Ảnh lớn trên trang chi tiết, giữ tỉ lệ gốc
+    })},
+    'blog.profile': {'avatar_variants': ('avatar', {
+        'avatar': ((1, 1), (48, 96, 150)),
+    })},
+}
+# (đuôi file, định dạng Pillow, tuỳ chọn khi lưu), ưu tiên định dạng nhỏ nhất trước
+VARIANT_FORMATS = [
+    ('webp', 'WEBP', {'quality': 75, 'method': 6}),
+    ('jpeg', 'JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+]
+if features.check('avif'):
+    VARIANT_FORMATS.insert(0, ('avif', 'AVIF', {'quality': 55}))
+MAX_ATTEMPTS = 3
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class DeferredStrategy:
+    """Chiến lược cachefile của imagekit: không tạo ảnh trong request, không kiểm tra tồn tại."""
+
+    def on_existence_required(self, file):
+        pass
+
+    def on_content_required(self, file):
+        # Chỉ khi thực sự đọc nội dung ảnh (không phải khi lấy url)
+        file.generate()
+
+    def on_source_saved(self, file):
+        pass  # Job được xếp hàng bởi signal trong models.py
+
+    def should_verify_existence(self, file):
+        return False
+
+
+def ready_field(spec):
+    return f'{spec}_ready'
+
+
+def is_variant(label, spec):
+    return spec in VARIANTS.get(label, {})
+
+
+def all_specs(label):
+    """{spec: trường ảnh gốc} gồm cả ImageSpecField và các JSONField biến thể của model."""
+    specs = dict(SPECS.get(label, {}))
+    specs.update({field: source for field, (source, _) in VARIANTS.get(label, {}).items()})
+    return specs
+
+
+def pending_filter(label, spec):
+    """Điều kiện lọc các dòng chưa có thumbnail/biến thể `spec`."""
+    return {spec: {}} if is_variant(label, spec) else {ready_field(spec): False}
+
+
+def reset(instance, spec):
+    """Đánh dấu thumbnail/biến thể `spec` của `instance` là chưa sẵn sàng (chưa lưu)."""
+    if is_variant(instance._meta.label_lower, spec):
+        setattr(instance, spec, {})
+    else:
+        setattr(instance, ready_field(spec), False)
+
+
+def _source_name(instance, source):
+    """Tên file ảnh gốc, đọc thẳng từ __dict__ để không nạp trường bị defer (None nếu chưa nạp)."""
+    if source not in instance.__dict__:
+        return None
+    value = instance.__dict__[source]
+    return (getattr(value, 'name', value) or '') if value is not None else ''
+
+
+def default_source(model, source):
+    """Tên ảnh gốc mặc định của trường `source` (vd. avatar mặc định), None nếu trường không có mặc định."""
+    field = model._meta.get_field(source)
+    return (field.get_default() or None) if field.has_default() else None
+
+
+def uses_default_source(instance, spec):
+    """
+    Ảnh gốc của `spec` là ảnh mặc định dùng chung cho mọi dòng: không tạo thumbnail/biến
+    thể riêng cho từng dòng, template dùng thẳng ảnh mặc định (xem spec_url trong blog_extras).
+    """
+    source = all_specs(instance._meta.label_lower)[spec]
+    default = default_source(type(instance), source)
+    return default is not None and _source_name(instance, source) == default
+
+
+def remember_sources(instance):
+    sources = all_specs(instance._meta.label_lower).values()
+    instance._thumbnail_sources = {source: _source_name(instance, source) for source in sources}
+
+
+def changed_specs(instance):
+    """Các spec có ảnh gốc khác lúc instance được nạp (gọi trong pre_save)."""
+    changed = []
+    for spec, source in all_specs(instance._meta.label_lower).items():
+        current = _source_name(instance, source)
+        if current is None:
+            continue  # Trường chưa từng được nạp nên cũng không thể bị sửa
+        if instance._state.adding:
+            if current:
+                changed.append(spec)
+        elif current != instance._thumbnail_sources.get(source):
+            changed.append(spec)
+    return changed
+
+
+def enqueue(instance, spec):
+    """Xếp hàng tạo thumbnail `spec` của `instance`; pool luồng bắt đầu sau khi transaction commit."""
+    from .models import ThumbnailJob
+
+    if uses_default_source(instance, spec):
+        return
+    ThumbnailJob.objects.get_or_create(model=instance._meta.label_lower, object_id=instance.pk, spec=spec,
+                                       status=ThumbnailJob.PENDING)
+    transaction.on_commit(start_workers)
+
+
+def start_workers():
+    workers = getattr(settings, 'THUMBNAIL_WORKERS', 2)
+    if workers <= 0:
+        return
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnails')
+    _executor.submit(_run_in_thread)
+
+
+def _run_in_thread():
+    try:
+        process_pending()
+    except Exception:  # pragma: no cover - chỉ ghi log, luồng nền không được chết âm thầm
+        logger.exception('Thumbnail worker failed')
+    finally:
+        close_old_connections()
+
+
+def claim_next_job():
+    """Lấy job đang chờ cũ nhất; UPDATE có điều kiện để hai worker không nhận trùng một job."""
+    from .models import ThumbnailJob
+
+    while True:
+        job = ThumbnailJob.objects.filter(status=ThumbnailJob.PENDING).order_by('id').first()
+        if job is None:
+            return None
+        claimed = ThumbnailJob.objects.filter(pk=job.pk, status=ThumbnailJob.PENDING)\
+                                      .update(status=ThumbnailJob.RUNNING, attempts=F('attempts') + 1,
+                                              claimed_at=timezone.now())
+        if claimed:
+            job.attempts += 1
+            return job
+
+
+def requeue_stale_jobs(now=None):
+    """
+    Đưa các job "running" quá THUMBNAIL_JOB_TIMEOUT giây (tiến trình xử lý đã chết giữa
+    chừng) về hàng đợi; job đã hết lượt thử thì đánh dấu thất bại. Trả về số job được xử lý lại.
+    """
+    from .models import ThumbnailJob
+
+    deadline = (now or timezone.now()) - timedelta(seconds=getattr(settings, 'THUMBNAIL_JOB_TIMEOUT', 600))
+    # claimed_at rỗng: job được nhận trước khi có cột này
+    stale = ThumbnailJob.objects.filter(Q(claimed_at__lt=deadline) | Q(claimed_at__isnull=True),
+                                        status=ThumbnailJob.RUNNING)
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(status=ThumbnailJob.FAILED, claimed_at=None,
+                                                    last_error='Worker stopped while processing the job')
+    return stale.update(status=ThumbnailJob.PENDING, claimed_at=None)
+
+
+def process_pending(limit=None):
+    """Xử lý các job đang chờ (sau khi nhận lại job bị bỏ dở). Trả về số job đã xử lý xong."""
+    requeue_stale_jobs()
+    done = 0
+    while limit is None or done < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+
+def run_job(job):
+    from .models import ThumbnailJob
+
+    model = apps.get_model(job.model)
+    instance = model.objects.filter(pk=job.object_id).first()
+    try:
+        if instance is not None:
+            generate(instance, job.spec)
+    except Exception as exc:
+        logger.warning('Thumbnail %s for %s #%s failed: %s', job.spec, job.model, job.object_id, exc)
+        status = ThumbnailJob.PENDING if job.attempts < MAX_ATTEMPTS else ThumbnailJob.FAILED
+        ThumbnailJob.objects.filter(pk=job.pk).update(status=status, last_error=str(exc)[:1000])
+        return
+    job.delete()
+
+
+def generate(instance, spec):
+    """Tạo file thumbnail/biến thể rồi đánh dấu sẵn sàng, nếu ảnh gốc chưa đổi trong lúc tạo."""
+    source = all_specs(instance._meta.label_lower)[spec]
+    name = getattr(instance, source).name
+    if not name or uses_default_source(instance, spec):
+        return  # Job xếp hàng trước khi ảnh mặc định được bỏ qua
+    mark_ready(type(instance), [(instance.pk, name, render(instance, spec))], spec)
+
+
+def render(instance, spec):
+    """Tạo file cho `spec`. Trả về giá trị cần ghi vào DB (True, hoặc dict biến thể)."""
+    if is_variant(instance._meta.label_lower, spec):
+        return build_variants(instance, spec)
+    getattr(instance, spec).generate()
+    return True
+
+
+def mark_ready(model, items, spec):
+    """Ghi kết quả cho các bộ (pk, tên ảnh gốc lúc tạo, giá trị của render())."""
+    label = model._meta.label_lower
+    source = all_specs(label)[spec]
+    field = spec if is_variant(label, spec) else ready_field(spec)
+    updated = 0
+    for pk, name, value in items:
+        updated += model.objects.filter(pk=pk, **{source: name}).update(**{field: value})
+    if updated:
+        # Các trang đã cache đang hiển thị placeholder
+        invalidate_content()
+    return updated
+
+
+def build_variants(instance, spec):
+    """
+    Thu nhỏ ảnh gốc theo VARIANTS và lưu vào storage. Trả về
+    {bộ: [{'format', 'width', 'height', 'bytes', 'name'}, ...]} sắp theo chiều rộng tăng dần.
+    Không phóng to: chiều rộng lớn hơn ảnh gốc được gộp về chiều rộng tối đa có thể.
+    """
+    label = instance._meta.label_lower
+    source, sets = VARIANTS[label][spec]
+    file = getattr(instance, source)
+    with file.open('rb'):
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    # Thư mục theo tên ảnh gốc: đổi ảnh thì URL đổi, trình duyệt/CDN không dùng nhầm bản cũ
+    digest = hashlib.md5(file.name.encode()).hexdigest()[:8]
+    directory = f'CACHE/variants/{instance._meta.model_name}/{instance.pk}/{digest}'
+    result = {}
+    for set_name, (ratio, widths) in sets.items():
+        if ratio:
+            limit = min(image.width, image.height * ratio[0] // ratio[1])
+        else:
+            limit = image.width
+        items = []
+        for width in sorted({min(width, limit) for width in widths}):
+            if ratio:
+                resized = ImageOps.fit(image, (width, width * ratio[1] // ratio[0]), Image.LANCZOS)
+            else:
+                resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            for extension, image_format, options in VARIANT_FORMATS:
+                items.append(_save_variant(resized, f'{directory}/{set_name}-{width}.{extension}', image_format, options))
+        result[set_name] = items
+    return result
+
+
+def _save_variant(image, name, image_format, options):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        # JPEG không có kênh alpha: ghép lên nền trắng
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    name = default_storage.save(name, ContentFile(buffer.getvalue()))
+    return {'format': image_format.lower(), 'width': image.width, 'height': image.height,
+            'bytes': buffer.tell(), 'name': name}
+
+
+def _variant_field(instance, set_name):
+    for field, (source, sets) in VARIANTS.get(instance._meta.label_lower, {}).items():
+        if set_name in sets:
+            return field, source
+    raise KeyError(set_name)
+
+
+def get_variants(instance, set_name):
+    """Các biến thể đã tạo của bộ `set_name` (rỗng nếu chưa có)."""
+    field, _ = _variant_field(instance, set_name)
+    return (getattr(instance, field) or {}).get(set_name, [])
+
+
+def variant_source(instance, set_name):
+    """File ảnh gốc của bộ biến thể `set_name`."""
+    _, source = _variant_field(instance, set_name)
+    return getattr(instance, source)
@@ -0,0 +1,154 @@
+"""
+Bài viết thịnh hành được tính sẵn (bảng TrendingPost).
+
+Điểm của một bài là tổng có trọng số của like, lượt xem và bình luận, mỗi hoạt
+động giảm một nửa sau TRENDING_HALF_LIFE_HOURS giờ. Chỉ các bài đăng trong
+TRENDING_WINDOW_DAYS ngày gần đây có mặt trong bảng, nên trang chủ (bài nổi bật)
+và trang /trending/ chỉ cần một truy vấn theo chỉ mục (-score, -post).
+
+refresh_trending() tính tăng dần: nhân mọi điểm với hệ số suy giảm bằng một câu
+UPDATE, rồi chỉ cộng phần hoạt động mới (chênh lệch giữa các bộ đếm của Post và
+giá trị đã lưu ở lần trước) cho các bài có thay đổi. Được gọi bởi luồng nền mỗi
+TRENDING_REFRESH_INTERVAL giây (khởi động khi trang đọc bảng lần đầu) hoặc bằng
+manage.py refresh_trending (vd. cron, hay ngay sau khi deploy).
+"""
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .caching import get_cache, invalidate_content
+
+logger = logging.getLogger(__name__)
+
+LIKE_WEIGHT = 3.0
+COMMENT_WEIGHT = 5.0
+VIEW_WEIGHT = 0.2
+TRENDING_PER_PAGE = 12
+LOCK_KEY = 'trending:lock'
+
+_lock = threading.Lock()
+_refresher = None
+
+
+def _half_life():
+    return timedelta(hours=getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24))
+
+
+def _window():
+    return timedelta(days=getattr(settings, 'TRENDING_WINDOW_DAYS', 7))
+
+
+def _refresh_interval():
+    return getattr(settings, 'TRENDING_REFRESH_INTERVAL', 300)
+
+
+def decay(elapsed):
+    """Hệ số giữ lại của điểm sau khoảng thời gian `elapsed`."""
+    return math.pow(0.5, max(elapsed / _half_life(), 0))
+
+
+def activity_score(likes, views, comments):
+    return LIKE_WEIGHT * likes + VIEW_WEIGHT * views + COMMENT_WEIGHT * comments
+
+
+def refresh_trending(now=None, batch_size=500):
+    """Cập nhật bảng TrendingPost. Trả về số bài có hoạt động mới (được cộng điểm)."""
+    cache = get_cache()
+    if not cache.add(LOCK_KEY, 1, timeout=300):
+        return 0  # Một luồng/tiến trình khác đang tính
+    try:
+        return _refresh(now or timezone.now(), batch_size)
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def _refresh(now, batch_size):
+    from .models import Post, TrendingPost
+
+    with transaction.atomic():
+        # Mọi dòng cùng được suy giảm tới `now` mỗi lần tính nên có chung thời điểm cập nhật
+        last = TrendingPost.objects.aggregate(last=Max('updated'))['last']
+        if last is not None:
+            TrendingPost.objects.update(score=F('score') * decay(now - last), updated=now)
+        entries = TrendingPost.objects.in_bulk()
+        top_before = _top_ids(entries.values())
+
+        kept, created, changed = [], [], []
+        recent = Post.objects.filter(created__gte=now - _window(), created__lte=now)\
+                             .values_list('id', 'likes', 'viewer', 'comment_count')
+        for post_id, likes, views, comments in recent:
+            entry = entries.pop(post_id, None)
+            if entry is None:
+                entry = TrendingPost(post_id=post_id, score=0.0, updated=now)
+                created.append(entry)
+            elif (entry.likes, entry.views, entry.comments) == (likes, views, comments):
+                kept.append(entry)
+                continue
+            else:
+                changed.append(entry)
+            # Unlike/bình luận bị xoá làm điểm giảm, nhưng không xuống dưới 0
+            entry.score = max(entry.score + activity_score(likes - entry.likes, views - entry.views,
+                                                           comments - entry.comments), 0.0)
+            entry.likes, entry.views, entry.comments = likes, views, comments
+
+        # Các dòng còn lại trong `entries` là bài đã ra khỏi cửa sổ thời gian
+        if entries:
+            TrendingPost.objects.filter(post_id__in=list(entries)).delete()
+        if changed:
+            TrendingPost.objects.bulk_update(changed, ['score', 'likes', 'views', 'comments'], batch_size=batch_size)
+        if created:
+            TrendingPost.objects.bulk_create(created, batch_size=batch_size)
+
+    if _top_ids(kept + changed + created) != top_before:
+        invalidate_content()  # Bài nổi bật/trang trending đã đổi thứ tự
+    return len(created) + len(changed)
+
+
+def _top_ids(entries):
+    ranked = sorted(entries, key=lambda entry: (-entry.score, -entry.post_id))
+    return [entry.post_id for entry in ranked[:TRENDING_PER_PAGE]]
+
+
+def trending_entries():
+    """QuerySet TrendingPost kèm bài viết (các cột của thẻ bài viết), xếp theo điểm giảm dần."""
+    from .models import LISTING_FIELDS, TrendingPost
+
+    _ensure_refresher()
+    return TrendingPost.objects.select_related('post__author__profile')\
+                               .only('post_id', 'score', *(f'post__{field}' for field in LISTING_FIELDS))\
+                               .order_by('-score', '-post_id')
+
+
+def top_post():
+    """Bài thịnh hành nhất (None nếu bảng trống)."""
+    entry = trending_entries().first()
+    return entry.post if entry else None
+
+
+def _run_refresher():
+    while True:
+        time.sleep(max(_refresh_interval(), 1))
+        try:
+            refresh_trending()
+        except Exception:
+            logger.exception('Trending refresh failed')  # Bảng giữ kết quả lần trước, thử lại ở vòng sau
+        finally:
+            close_old_connections()
+
+
+def _ensure_refresher():
+    """Khởi động (một lần) luồng nền tính lại bảng thịnh hành theo chu kỳ."""
+    global _refresher
+    if _refresher is not None or _refresh_interval() <= 0:
+        return
+    with _lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_run_refresher, name='trending-refresher', daemon=True)
+            _refresher.start()
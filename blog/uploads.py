@@ -0,0 +1,123 @@
+"""
+Xử lý file tải lên (tệp đính kèm bài viết, avatar).
+
+- UploadSizeLimitHandler đứng đầu settings.FILE_UPLOAD_HANDLERS: đếm số byte của
+  từng file theo từng chunk khi request đang được đọc và bỏ qua (SkipFile) file
+  vượt BLOG_MAX_UPLOAD_SIZE. Phần còn lại của file bị đọc bỏ chứ không được ghi
+  hay giữ trong bộ nhớ. Các handler phía sau vẫn là của Django: file nhỏ nằm
+  trong RAM, file lớn hơn FILE_UPLOAD_MAX_MEMORY_SIZE được ghi dần ra file tạm.
+- describe(file): đoán kiểu thật của file từ các byte đầu (magic bytes) thay vì
+  phần mở rộng, kèm kích thước ảnh và số byte. Được gọi một lần khi tệp đính kèm
+  đổi (signal pre_save trong models.py), kết quả lưu vào các cột của Post.
+"""
+import mimetypes
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, UnidentifiedImageError
+
+DEFAULT_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+SNIFF_LENGTH = 32
+
+# (vị trí, chữ ký, kiểu MIME); chữ ký dài hơn/cụ thể hơn đứng trước
+SIGNATURES = [
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (8, b'WEBP', 'image/webp'),  # Sau tiêu đề RIFF
+    (4, b'ftypavif', 'image/avif'),
+    (4, b'ftypheic', 'image/heic'),
+    (0, b'BM', 'image/bmp'),
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'PK\x03\x04', 'application/zip'),
+    (0, b'\x1f\x8b', 'application/gzip'),
+]
+# Các kiểu ảnh Pillow mở được, dùng cho thumbnail và biến thể responsive
+IMAGE_MIME_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/avif', 'image/bmp'}
+
+
+def max_upload_size():
+    return getattr(settings, 'BLOG_MAX_UPLOAD_SIZE', DEFAULT_MAX_UPLOAD_SIZE)
+
+
+class UploadSizeLimitHandler(FileUploadHandler):
+    """
+    Handler chỉ đếm byte và chuyển nguyên dữ liệu cho handler kế tiếp.
+    Tên các trường có file bị bỏ qua được ghi vào request.rejected_uploads.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request.rejected_uploads = {}
+        self.limit = max_upload_size()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.limit:
+            self.request.rejected_uploads[self.field_name] = self.file_name
+            raise SkipFile
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def rejected_uploads(request):
+    """{tên trường: tên file} các file bị bỏ qua vì quá lớn trong request này."""
+    request.FILES  # Đọc body (nếu chưa) để các upload handler chạy
+    return getattr(request, 'rejected_uploads', {})
+
+
+def size_error(file_name):
+    return f'Tệp "{file_name}" vượt quá dung lượng tối đa {filesizeformat(max_upload_size())}.'
+
+
+def sniff(head, name=''):
+    """Kiểu MIME từ các byte đầu của file; không nhận ra thì đoán văn bản/nhị phân."""
+    for offset, signature, mime_type in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            if mime_type == 'image/webp' and not head.startswith(b'RIFF'):
+                continue
+            return mime_type
+    if not head:
+        return 'application/octet-stream'
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        # Có thể chỉ là ký tự nhiều byte bị cắt ở cuối đoạn đã đọc
+        if exc.start < len(head) - 3:
+            return 'application/octet-stream'
+    guessed, _ = mimetypes.guess_type(name)
+    return guessed if guessed and guessed.startswith('text/') else 'text/plain'
+
+
+def describe(file):
+    """
+    {'mime_type', 'width', 'height', 'size_bytes'} của `file` (FieldFile, kể cả khi
+    chưa lưu xuống storage). Chỉ đọc phần đầu file: Pillow lấy kích thước từ header,
+    không giải mã cả ảnh. File đã lưu được đóng lại, file vừa upload thì để mở cho
+    FileField lưu tiếp.
+    """
+    file.open('rb')
+    try:
+        file.seek(0)
+        head = file.read(SNIFF_LENGTH)
+        mime_type = sniff(head, file.name)
+        width = height = None
+        if mime_type in IMAGE_MIME_TYPES:
+            file.seek(0)
+            try:
+                with Image.open(file) as image:
+                    width, height = image.size
+            except (UnidentifiedImageError, OSError):
+                mime_type = 'application/octet-stream'  # Chữ ký đúng nhưng ảnh hỏng
+        file.seek(0)
+        return {'mime_type': mime_type, 'width': width, 'height': height, 'size_bytes': file.size}
+    finally:
+        if getattr(file, '_committed', False):
+            file.close()
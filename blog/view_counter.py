@@ -0,0 +1,164 @@
+"""
+Bộ đếm lượt xem ghi trễ (write-behind) cho bài viết.
+
+Mỗi lượt xem chỉ được cộng vào bộ đệm nằm trong cache (settings.VIEW_COUNTER_CACHE).
+Định kỳ, hoặc khi bộ đệm đầy, các lượt xem được ghi dồn xuống DB bằng một số ít
+câu UPDATE ... SET viewer = viewer + n trong cùng một transaction.
+Số lượt xem hiển thị = giá trị đã ghi trong DB + phần đang chờ ghi.
+
+Với cache cục bộ (LocMemCache) bộ đệm nằm trong từng tiến trình; với cache dùng
+chung (Redis, Memcached...) mọi tiến trình, kể cả lệnh `flush_view_counts`, cùng
+thấy một bộ đệm. Khi tiến trình thoát bình thường, phần còn trong bộ đệm được
+ghi nốt (atexit); tiến trình chết đột ngột thì mất tối đa vài giây lượt xem.
+VIEW_COUNTER_FLUSHER = False tắt cả luồng nền lẫn việc ghi nốt khi thoát (vd. trong
+test); lượt xem khi đó chỉ được ghi khi tới hạn trong request hoặc bằng lệnh.
+
+Lỗi khi ghi (vd. "database is locked") chỉ được ghi log: transaction bị rollback
+nên lượt xem vẫn nằm trong bộ đệm và được ghi lại ở lần sau.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'view_counter:pending:{}'  # post_id -> số lượt xem chưa ghi
+SLOT_KEY = 'view_counter:slot:{}'        # số thứ tự -> post_id có lượt xem chờ ghi
+SEQ_KEY = 'view_counter:seq'             # số thứ tự slot lớn nhất đã cấp
+FLUSHED_KEY = 'view_counter:flushed'     # số thứ tự slot lớn nhất đã ghi
+LOCK_KEY = 'view_counter:lock'
+
+_lock = threading.Lock()
+_recorded_since_flush = 0
+_last_flush = time.monotonic()
+_flusher = None
+
+
+def _cache():
+    return caches[getattr(settings, 'VIEW_COUNTER_CACHE', 'default')]
+
+
+def _flush_interval():
+    return getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 10)
+
+
+def _max_pending():
+    return getattr(settings, 'VIEW_COUNTER_MAX_PENDING', 500)
+
+
+def _incr(cache, key, delta=1):
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:  # Khoá vừa bị xoá giữa add() và incr()
+        cache.set(key, delta, timeout=None)
+        return delta
+
+
+def _mark_dirty(cache, post_id):
+    slot = _incr(cache, SEQ_KEY)
+    cache.set(SLOT_KEY.format(slot), post_id, timeout=None)
+
+
+def record_view(post_id):
+    """Ghi nhận một lượt xem cho bài viết `post_id`."""
+    global _recorded_since_flush
+    cache = _cache()
+    if _incr(cache, PENDING_KEY.format(post_id)) == 1:
+        # Lượt xem đầu tiên kể từ lần ghi trước: đăng ký bài viết vào danh sách chờ
+        _mark_dirty(cache, post_id)
+
+    with _lock:
+        _recorded_since_flush += 1
+        due = (_recorded_since_flush >= _max_pending()
+               or time.monotonic() - _last_flush >= _flush_interval())
+
+    if due:
+        try:
+            flush()
+        except Exception:
+            # Không làm hỏng request đang xem bài: lượt xem vẫn chờ trong bộ đệm
+            logger.exception('View count flush failed')
+    _ensure_flusher()
+
+
+def pending_views(post_id):
+    """Số lượt xem của bài viết chưa được ghi xuống DB."""
+    return _cache().get(PENDING_KEY.format(post_id), 0)
+
+
+def flush():
+    """
+    Ghi toàn bộ lượt xem đang chờ xuống DB. Trả về tổng số lượt đã ghi.
+    Các bài có cùng số lượt tăng được gom vào chung một câu UPDATE.
+    """
+    global _recorded_since_flush, _last_flush
+    from .models import Post
+
+    with _lock:
+        _recorded_since_flush = 0
+        _last_flush = time.monotonic()
+
+    cache = _cache()
+    if not cache.add(LOCK_KEY, 1, timeout=60):
+        return 0  # Một tiến trình khác đang ghi
+    try:
+        last_slot = cache.get(SEQ_KEY, 0)
+        first_slot = cache.get(FLUSHED_KEY, 0) + 1
+        if last_slot < first_slot:
+            return 0
+
+        slot_keys = [SLOT_KEY.format(i) for i in range(first_slot, last_slot + 1)]
+        post_ids = set(cache.get_many(slot_keys).values())
+        pending = cache.get_many([PENDING_KEY.format(post_id) for post_id in post_ids])
+        counts = {post_id: pending.get(PENDING_KEY.format(post_id), 0) for post_id in post_ids}
+        counts = {post_id: count for post_id, count in counts.items() if count > 0}
+
+        by_delta = defaultdict(list)
+        for post_id, count in counts.items():
+            by_delta[count].append(post_id)
+
+        with transaction.atomic():
+            for count, ids in sorted(by_delta.items()):
+                Post.objects.filter(pk__in=sorted(ids)).update(viewer=F('viewer') + count)
+
+        # Chỉ trừ đi phần đã ghi; lượt xem phát sinh trong lúc ghi vẫn được giữ lại
+        for post_id, count in counts.items():
+            if cache.decr(PENDING_KEY.format(post_id), count) > 0:
+                _mark_dirty(cache, post_id)
+        cache.delete_many(slot_keys)
+        cache.set(FLUSHED_KEY, last_slot, timeout=None)
+        return sum(counts.values())
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def _run_flusher():
+    while True:
+        time.sleep(max(_flush_interval(), 1))
+        try:
+            flush()
+        except Exception:
+            logger.exception('View count flush failed')  # Lượt xem vẫn nằm trong bộ đệm, thử lại ở vòng sau
+        finally:
+            close_old_connections()
+
+
+def _ensure_flusher():
+    """Khởi động (một lần) luồng nền ghi dồn lượt xem theo chu kỳ."""
+    global _flusher
+    if _flusher is not None or _flush_interval() <= 0 or not getattr(settings, 'VIEW_COUNTER_FLUSHER', True):
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run_flusher, name='view-counter-flusher', daemon=True)
+            _flusher.start()
+            # Ghi nốt bộ đệm khi tiến trình thoát bình thường (restart/deploy)
+            atexit.register(flush)
@@ -1,48 +1,76 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Post, Notification, ContactMessage, Profile, Comment
+from .models import Post, Notification, ContactMessage, Profile, Comment, unique_slug
 from django.urls import reverse
 from taggit.models import Tag
 from django.http import HttpResponseForbidden, JsonResponse
 from .forms import CommentForm, PostForm, ContactForm, UserUpdateForm, ProfileUpdateForm
+from .uploads import rejected_uploads
 from django.core.mail import send_mail
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
-from django.utils.text import slugify
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login
 from django.contrib.auth.models import User
-from django.db.models import F, Q, Count
+from django.db.models import Count, F, Q, Sum
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_datetime
 from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.utils.cache import patch_cache_control
 from .forms import SignupForm
-
+from . import view_counter
+from .comment_tree import build_comment_tree, liked_by
+from .likes import toggle_like
+from .related import get_related_posts, refresh_related_posts
+from .pagination import CursorPaginator
+from .query_budget import query_budget
+from .caching import (cache_anonymous_page, get_content_version, get_post_version, get_version,
+                      invalidate_notification_summary, post_id_for_slug)
+from .conditional import Validators, conditional_page, make_etag, viewer_parts
+from . import notifications
+from . import search
+from . import trending
+
+SEARCH_RESULTS_LIMIT = 100 # Số kết quả tối đa trên trang tìm kiếm
+TAGGED_POSTS_PER_PAGE = 12
+PROFILE_POSTS_PER_PAGE = 12
+NOTIFICATIONS_PER_PAGE = 20
+LIKERS_PER_PAGE = 20
+# Các cột trang thông báo hiển thị (người gửi + avatar, bài/bình luận được nhắc tới)
+NOTIFICATION_LIST_FIELDS = (
+    'id', 'verb', 'actor_ids', 'read', 'timestamp', 'sender__username', 'sender__profile__avatar',
+    'sender__profile__avatar_thumbnail_ready', 'post__slug', 'comment__body', 'comment__post__slug',
+)
+# Các cột một dòng trong danh sách người like hiển thị (tên + avatar)
+LIKER_FIELDS = (
+    'id', 'user__username', 'user__profile__avatar', 'user__profile__avatar_thumbnail_ready',
+    'user__profile__avatar_variants',
+)
+
+@query_budget(queries=8, rows=30)
+@cache_anonymous_page()
 def index(request):
-    # Tối ưu: select_related profile để lấy avatar, annotate để đếm comment
-    base_qs = Post.objects.select_related('author__profile')\
-                          .filter(created__lte=timezone.now())\
-                          .annotate(num_comments=Count('comments'))
+    # Tối ưu: select_related profile để lấy avatar; số comment đọc từ cột comment_count;
+    # trích đoạn/thời gian đọc lấy từ cột tính sẵn nên không tải nội dung bài (for_listing)
+    base_qs = Post.objects.for_listing().filter(created__lte=timezone.now())
 
     all_posts = base_qs.order_by('-created')
     
-    # Logic mới: Bài viết nổi bật là bài có nhiều likes nhất trong 7 ngày qua
-    one_week_ago = timezone.now() - timedelta(days=7)
-    featured_post = base_qs.filter(created__gte=one_week_ago).order_by('-likes', '-created').first()
+    # Bài viết nổi bật là bài đứng đầu bảng thịnh hành tính sẵn (blog/trending.py)
+    featured_post = trending.top_post()
 
-    # Nếu không có bài nào trong 7 ngày qua, lấy bài mới nhất làm bài nổi bật
+    # Nếu bảng thịnh hành trống (chưa có bài nào gần đây), lấy bài mới nhất làm bài nổi bật
     if not featured_post:
         featured_post = all_posts.first()
 
     # Loại bài viết nổi bật khỏi danh sách bài viết thường
     other_posts_list = all_posts.exclude(pk=featured_post.pk) if featured_post else all_posts
 
-    paginator = Paginator(other_posts_list, 4) # 4 bài viết thường mỗi trang
-
-    page_number = request.GET.get('page')
-    posts = paginator.get_page(page_number)
+    # Phân trang theo con trỏ (created, id); ?page=N cũ vẫn được hỗ trợ
+    paginator = CursorPaginator(other_posts_list, 4) # 4 bài viết thường mỗi trang
+    posts = paginator.get_page(request.GET.get('cursor'), request.GET.get('page'))
 
     context = {
         'featured_post': featured_post,
@@ -51,9 +79,12 @@ def index(request):
 
     return render(request, 'blog/index.html', context)
 
+@query_budget(queries=2, rows=5)
+@cache_anonymous_page()
 def about(request):
     return render(request, 'blog/about.html')
 
+@query_budget(queries=2, rows=5)
 def contact(request):
     if request.method == 'POST':
         form = ContactForm(request.POST)
@@ -81,54 +112,76 @@ def contact(request):
     return render(request, 'blog/contact.html', {'form': form})
 
 
+def record_cached_view(request, context):
+    # Trang chi tiết phục vụ từ cache vẫn phải được tính lượt xem
+    view_counter.record_view(context['post_id'])
+
+def post_detail_validators(request, slug):
+    """
+    ETag của trang chi tiết, chỉ đọc cache (không truy vấn, không render):
+    - phiên bản nội dung: sửa bài/tag, bài liên quan, thumbnail/biến thể ảnh sẵn sàng,
+      tên/avatar/bio tác giả (blog/caching.py);
+    - phiên bản của bài viết: like, bình luận mới/sửa/xoá, like bình luận;
+    - phần giao diện theo người xem (thông báo, announcement).
+    Không gửi Last-Modified: mốc thời gian không phản ánh được like hay bình luận bị xoá.
+    """
+    post_id = post_id_for_slug(slug)
+    if post_id is None:
+        return None
+    etag = make_etag('post', post_id, get_content_version(), get_post_version(post_id),
+                     request.get_full_path(), *viewer_parts(request))
+    return Validators(etag, context={'post_id': post_id})
+
+def post_page_version(request, slug):
+    # Like/bình luận chỉ tăng phiên bản riêng của bài viết, không làm mới các trang khác
+    return get_post_version(post_id_for_slug(slug))
+
+@query_budget(queries=20) # rows chưa giới hạn: trả lời của các bình luận trên trang chưa phân trang
+@cache_anonymous_page(on_hit=record_cached_view, version=post_page_version)
+@conditional_page(post_detail_validators, on_not_modified=record_cached_view)
 def post_detail(request, slug):
-    # Tối ưu: Lấy luôn thông tin author và profile, đếm comment
-    queryset = Post.objects.select_related('author__profile').annotate(num_comments=Count('comments'))
+    # Tối ưu: Lấy luôn thông tin author và profile (số comment có sẵn trong comment_count);
+    # plain_text chỉ là bản sao của content dành cho danh sách/tìm kiếm
+    queryset = Post.objects.select_related('author__profile').defer('plain_text')
     post = get_object_or_404(queryset, slug=slug)
     
-    # Tăng lượt xem mỗi khi có người truy cập
-    post.viewer = F('viewer') + 1
-    post.save(update_fields=['viewer'])
-    post.refresh_from_db() # Lấy lại dữ liệu mới từ DB
-
-    # --- Logic tìm bài viết liên quan ---
-    post_tags_ids = post.tags.values_list('id', flat=True)
-    related_posts = Post.objects.filter(tags__in=post_tags_ids)\
-                                .exclude(id=post.id)
-    # Đếm số lượng tag chung và sắp xếp
-    related_posts = related_posts.select_related('author').annotate(same_tags=Count('tags'))\
-                                 .order_by('-same_tags', '-created')[:4] # Lấy 4 bài liên quan nhất
+    # Tăng lượt xem: chỉ cộng vào bộ đệm, việc ghi xuống DB được gom lại theo chu kỳ
+    view_counter.record_view(post.id)
+    post.viewer += view_counter.pending_views(post.id)
+
+    # --- Bài viết liên quan: đọc từ bảng RelatedPost đã tính sẵn (blog/related.py) ---
+    related_posts = get_related_posts(post)
 
     # --- Logic phân trang và tìm bình luận ---
     # Tối ưu hóa: Lấy sẵn author và profile của author để tránh N+1 query
+    # liked: người xem đã like bình luận chưa, chỉ tra cho các bình luận được lấy ra
     top_level_comments = post.comments.filter(active=True, parent__isnull=True)\
-                                      .select_related('author__profile').order_by('created')
+                                      .select_related('author__profile')\
+                                      .annotate(liked=liked_by(request.user))
     comments_per_page = 10 # Số bình luận mỗi trang
+    paginator = CursorPaginator(top_level_comments, comments_per_page, ordering=('created', 'id'))
 
     # Kiểm tra xem có hash comment trong URL không
     comment_id_str = request.GET.get('comment_id')
-    page_number = request.GET.get('page')
+    cursor = request.GET.get('cursor')
 
     if comment_id_str:
         try:
             target_comment_id = int(comment_id_str)
-            target_comment = get_object_or_404(Comment, id=target_comment_id)
-
-            # Tìm comment gốc (top-level) của comment mục tiêu
-            root_comment = target_comment
-            while root_comment.parent:
-                root_comment = root_comment.parent
-
-            # Tìm vị trí của comment gốc trong danh sách và tính trang
-            comment_ids = list(top_level_comments.values_list('id', flat=True))
-            if root_comment.id in comment_ids:
-                comment_index = comment_ids.index(root_comment.id)
-                page_number = (comment_index // comments_per_page) + 1
+            target_comment = get_object_or_404(Comment.objects.select_related('root'), id=target_comment_id)
+
+            # Comment gốc (top-level) được lưu sẵn trong cột root, không cần đi ngược từng cấp
+            root_comment = target_comment.root or target_comment
+
+            # Trang chứa comment bắt đầu ngay tại comment gốc của nó, không cần đếm vị trí
+            if root_comment.post_id == post.id and root_comment.active:
+                cursor = paginator.cursor_at(root_comment)
         except (ValueError, Comment.DoesNotExist):
             pass # Bỏ qua nếu comment_id không hợp lệ
 
-    paginator = Paginator(top_level_comments, comments_per_page)
-    comments = paginator.get_page(page_number)
+    comments = paginator.get_page(cursor, request.GET.get('page'))
+    # Lấy toàn bộ trả lời bằng một truy vấn và dựng sẵn cây cho template
+    comments.object_list = build_comment_tree(comments.object_list, request.user)
     new_comment = None
 
     if request.method == 'POST':
@@ -151,14 +204,15 @@ def post_detail(request, slug):
                 parent_comment = get_object_or_404(post.comments.model, id=parent_id)
                 new_comment.parent = parent_comment
 
-                # Tạo thông báo cho người chủ của bình luận cha
-                # Đảm bảo không tự thông báo cho chính mình
-                if parent_comment.author != request.user:
-                    verb = f'replied to your comment on "{post.title}"'
-                    Notification.objects.create(recipient=parent_comment.author, sender=request.user, comment=new_comment, verb=verb)
-
             # Lưu bình luận vào DB
             new_comment.save()
+
+            # Báo cho người chủ của bình luận cha (sau khi lưu để thông báo trỏ được tới trả lời);
+            # chỉ xếp hàng, việc ghi do worker của blog/notifications.py đảm nhận
+            if parent_id:
+                notifications.emit(notifications.REPLY, parent_comment.author_id, request.user.id,
+                                   f'replied to your comment on "{post.title}"',
+                                   post_id=post.id, comment_id=new_comment.id)
             # Trả về JSON cho AJAX
             return JsonResponse({
                 'status': 'success',
@@ -178,35 +232,34 @@ def post_detail(request, slug):
     if request.user.is_authenticated:
         user_has_liked = post.liked_by.filter(id=request.user.id).exists()
 
-    # Lấy danh sách ID các bình luận mà người dùng hiện tại đã like
-    user_liked_comment_ids = []
-    if request.user.is_authenticated:
-        user_liked_comment_ids = list(request.user.liked_comments.values_list('id', flat=True))
-
-    return render(request, 'blog/post_detail.html', {'post': post,
-                                                     'comments': comments,
-                                                     'new_comment': new_comment,
-                                                     'related_posts': related_posts,
-                                                     'comment_form': comment_form,
-                                                     'user_has_liked': user_has_liked,
-                                                     'user_liked_comment_ids': user_liked_comment_ids})
+    response = render(request, 'blog/post_detail.html', {'post': post,
+                                                         'comments': comments,
+                                                         'new_comment': new_comment,
+                                                         'related_posts': related_posts,
+                                                         'comment_form': comment_form,
+                                                         'user_has_liked': user_has_liked})
+    response.page_cache_context = {'post_id': post.id}
+    return response
 
+@query_budget(queries=7, rows=10)
 @login_required
 def post_create(request):
     if request.method == 'POST':
-        form = PostForm(request.POST, request.FILES)
+        form = PostForm(request.POST, request.FILES, rejected_uploads=rejected_uploads(request))
         if form.is_valid():
             post = form.save(commit=False)
-            post.slug = slugify(post.title)
+            post.slug = unique_slug(post.title)
             post.author = request.user # Gán tác giả là người dùng đang đăng nhập
             post.save()
             # Lưu các tags sau khi post đã được lưu
             form.save_m2m()
+            refresh_related_posts(post)
             return redirect('blog:post_detail', slug=post.slug)
     else:
         form = PostForm()
     return render(request, 'blog/post_form.html', {'form': form, 'title': 'Create Post'})
 
+@query_budget(queries=10, rows=15)
 @login_required
 def post_edit(request, slug):
     post = get_object_or_404(Post, slug=slug)
@@ -215,18 +268,20 @@ def post_edit(request, slug):
         return HttpResponseForbidden("You are not allowed to edit this post.")
 
     if request.method == 'POST':
-        form = PostForm(request.POST, request.FILES, instance=post)
+        form = PostForm(request.POST, request.FILES, instance=post, rejected_uploads=rejected_uploads(request))
         if form.is_valid():
             post = form.save(commit=False)
-            post.slug = slugify(post.title)
+            post.slug = unique_slug(post.title, exclude_pk=post.pk)
             post.save() # Lưu đối tượng post trước
             # Sau đó lưu các quan hệ many-to-many (tags)
             form.save_m2m()
+            refresh_related_posts(post)
             return redirect('blog:post_detail', slug=post.slug)
     else:
         form = PostForm(instance=post)
     return render(request, 'blog/post_form.html', {'form': form, 'title': 'Edit Post'})
 
+@query_budget(queries=12, rows=10)
 @login_required
 def post_delete(request, slug):
     post = get_object_or_404(Post, slug=slug)
@@ -260,10 +315,10 @@ def logout_view(request):
     logout(request)
     return redirect('blog:home')
 
+@query_budget(queries=12, rows=60)
 @login_required
 def user_profile(request):
     # Lấy hoặc tạo profile cho người dùng hiện tại.
-    from django.db.models import Sum
     # Điều này sẽ khắc phục lỗi "User has no profile" cho các tài khoản cũ.
     profile, created = Profile.objects.get_or_create(user=request.user)
 
@@ -286,7 +341,8 @@ def user_profile(request):
 
         elif 'update_profile' in request.POST:
             u_form = UserUpdateForm(request.POST, instance=request.user)
-            p_form = ProfileUpdateForm(request.POST, request.FILES, instance=profile)
+            p_form = ProfileUpdateForm(request.POST, request.FILES, instance=profile,
+                                       rejected_uploads=rejected_uploads(request))
             if u_form.is_valid() and p_form.is_valid():
                 u_form.save()
                 p_form.save()
@@ -307,17 +363,18 @@ def user_profile(request):
         # Với GET request, form đã được khởi tạo ở trên với instance, không cần làm gì thêm.
         pass
 
-    # Lấy danh sách bài viết và tính toán các thống kê
-    user_posts = Post.objects.filter(author=request.user).order_by('-created')
-    total_posts = user_posts.count()
-    total_likes_received = user_posts.aggregate(total_likes=Sum('likes'))['total_likes'] or 0
+    # Lấy các bài viết mới nhất (danh sách đầy đủ có phân trang ở trang hồ sơ công khai)
+    user_posts = Post.objects.for_listing().filter(author=request.user).order_by('-created', '-id')
+    stats = user_posts.aggregate(total=Count('id'), likes=Sum('likes'))
+    total_posts = stats['total']
+    total_likes_received = stats['likes'] or 0
     # Lưu ý: Giả định 'author' trong model Comment là CharField lưu username.
     total_comments_made = Comment.objects.filter(author=request.user).count()
     
     context = {
         'u_form': u_form,
         'p_form': p_form,
-        'user_posts': user_posts,
+        'user_posts': user_posts[:PROFILE_POSTS_PER_PAGE],
         'password_form': password_form,
         'total_posts': total_posts,
         'total_likes_received': total_likes_received,
@@ -325,22 +382,25 @@ def user_profile(request):
     }
     return render(request, 'blog/user_profile.html', context)
 
+@query_budget(queries=5) # rows: tối đa SEARCH_RESULTS_LIMIT bài kèm tag của chúng
 def search_view(request):
     query = request.GET.get('q', '')
     search_type = request.GET.get('type', 'all') # Lấy loại tìm kiếm, mặc định là 'all'
     results = Post.objects.none() # Mặc định là không có kết quả
 
     if query:
-        # Xây dựng điều kiện lọc dựa trên search_type
+        # Xây dựng danh sách cột cần tìm dựa trên search_type
         if search_type == 'tag':
-            filter_condition = Q(tags__name__icontains=query)
+            fields = ('tags',)
         elif search_type == 'title':
-            filter_condition = Q(title__icontains=query)
+            fields = ('title',)
         else:
-            # Mặc định: Tìm trong cả tiêu đề và tags
-            filter_condition = Q(title__icontains=query) | Q(tags__name__icontains=query)
+            # Mặc định: Tìm trong tiêu đề, nội dung và tags
+            fields = search.FIELDS
 
-        results = Post.objects.filter(filter_condition).select_related('author__profile').annotate(num_comments=Count('comments')).order_by('-created').distinct()
+        # Tra chỉ mục toàn văn, kết quả đã được xếp theo độ liên quan
+        results = search.search_posts(query, fields=fields, limit=SEARCH_RESULTS_LIMIT).for_listing()\
+                        .prefetch_related('tags')
 
     return render(request, 'blog/search_results.html', {
         'query': query,
@@ -353,82 +413,84 @@ def search_posts(request):
     results = []
     
     if query:
-        results = Post.objects.filter(
-            Q(title__icontains=query) | 
-            Q(tags__name__icontains=query)  # <--- Add this line to search by tag
-        ).distinct() # distinct() is important to avoid duplicate results
+        results = search.search_posts(query, limit=SEARCH_RESULTS_LIMIT).for_listing().prefetch_related('tags')
         
     return render(request, 'blog/search_results.html', {'results': results, 'query': query})
 
+@query_budget(queries=5, rows=60)
+@cache_anonymous_page()
 def tagged_posts(request, tag_slug):
     tag = get_object_or_404(Tag, slug=tag_slug)
-    posts = Post.objects.filter(tags__in=[tag]).select_related('author__profile').annotate(num_comments=Count('comments')).order_by('-created')
+    tagged = Post.objects.for_listing().filter(tags__in=[tag])
+    posts = CursorPaginator(tagged, TAGGED_POSTS_PER_PAGE).get_page(request.GET.get('cursor'), request.GET.get('page'))
     
     context = {
         'tag': tag,
-        'posts': posts
+        'posts': posts,
+        'total_posts': tagged.count(),
     }
     return render(request, 'blog/tagged_posts.html', context)
 
-def like_post(request, slug):
+@query_budget(queries=3, rows=60)
+@cache_anonymous_page()
+def trending_posts(request):
+    """Các bài viết thịnh hành, theo điểm tính sẵn trong bảng TrendingPost (chỉ mục (-score, -post))."""
+    entries = CursorPaginator(trending.trending_entries(), trending.TRENDING_PER_PAGE, ordering=('-score', '-post_id'))
+    page = entries.get_page(request.GET.get('cursor'), request.GET.get('page'))
+    return render(request, 'blog/trending.html', {'entries': page})
+
+@query_budget(queries=5, rows=70)
+def post_likers(request, slug):
+    """
+    Mảnh HTML danh sách người đã like bài viết, nạp khi mở modal "Liked by" trên trang
+    chi tiết. Người like gần nhất trước, phân trang theo con trỏ trên id của bảng trung gian;
+    tài khoản và avatar lấy cùng một truy vấn.
+    """
+    post = get_object_or_404(Post.objects.only('id', 'slug'), slug=slug)
+    likes = Post.liked_by.through.objects.filter(post_id=post.id).select_related('user__profile')\
+                                         .only(*LIKER_FIELDS)
+    likers = CursorPaginator(likes, LIKERS_PER_PAGE, ordering=('-id',)).get_page(request.GET.get('cursor'))
+    return render(request, 'blog/_likers.html', {'post': post, 'likers': likers})
+
+# Gồm cả trường hợp ghi thông báo ngay trong request (NOTIFICATION_QUEUE_SYNC): đọc thông
+# báo cũ để gộp, ghi và cặp SAVEPOINT của nó
+@query_budget(queries=14, rows=10)
+def like_post(request, slug=None, post_id=None):
     if not request.user.is_authenticated:
         return JsonResponse({'status': 'login_required'}, status=401)
-        
-    post = get_object_or_404(Post, slug=slug)
+
+    # Hai URL: like/<slug>/ và post/<post_id>/like/
+    lookup = {'slug': slug} if slug is not None else {'pk': post_id}
+    post = get_object_or_404(Post.objects.only('id', 'title', 'author_id'), **lookup)
     user = request.user
 
-    if user in post.liked_by.all():
-        # Người dùng đã like, giờ unlike
-        post.liked_by.remove(user)
-        post.likes = F('likes') - 1
-        liked = False
-    else:
-        # Người dùng chưa like, giờ like
-        post.liked_by.add(user)
-        post.likes = F('likes') + 1
-        liked = True
-        
-        # Tạo thông báo cho tác giả bài viết
-        # Đảm bảo người dùng không tự "like" bài của chính mình và nhận thông báo
-        if user != post.author:
-            verb = f'liked your post: "{post.title}"'
-            Notification.objects.create(recipient=post.author, sender=user, verb=verb, post=post)
+    # Kiểm tra/đảo trạng thái like ngay trên bảng trung gian, không tải danh sách liked_by
+    liked, likes = toggle_like(post, user)
+
+    # Báo cho tác giả bài viết (emit bỏ qua khi tự like bài của mình); like lại sau khi
+    # unlike được gộp vào thông báo cũ nên không sinh thông báo trùng
+    if liked:
+        notifications.emit(notifications.LIKE, post.author_id, user.id, f'liked your post: "{post.title}"',
+                           post_id=post.id)
 
-    post.save()
-    post.refresh_from_db()
-    return JsonResponse({'likes': post.likes, 'liked': liked})
+    return JsonResponse({'likes': likes, 'liked': liked})
 
+@query_budget(queries=11, rows=10)
 @login_required
 def like_comment(request, comment_id):
     """
     Xử lý việc like/unlike một bình luận.
     """
-    comment = get_object_or_404(Comment, id=comment_id)
-    user = request.user
-
-    if user in comment.liked_by.all():
-        # Người dùng đã like, giờ unlike
-        comment.liked_by.remove(user)
-        comment.likes = F('likes') - 1
-        liked = False
-    else:
-        # Người dùng chưa like, giờ like
-        comment.liked_by.add(user)
-        comment.likes = F('likes') + 1
-        liked = True
-
-    comment.save()
-    comment.refresh_from_db()
-    return JsonResponse({'status': 'success', 'likes': comment.likes, 'liked': liked})
+    comment = get_object_or_404(Comment.objects.only('id', 'post_id'), id=comment_id)
+    liked, likes = toggle_like(comment, request.user)
+    return JsonResponse({'status': 'success', 'likes': likes, 'liked': liked})
 
+@query_budget(queries=5, rows=80)
 def public_user_profile(request, username):
     user = get_object_or_404(User, username=username)
     # Tối ưu hóa: Lấy trước các tags liên quan để tránh N+1 query
-    user_posts = Post.objects.filter(author=user)\
-                             .prefetch_related('tags')\
-                             .select_related('author__profile')\
-                             .annotate(num_comments=Count('comments'))\
-                             .order_by('-created')
+    user_posts = Post.objects.for_listing().filter(author=user).prefetch_related('tags')
+    user_posts = CursorPaginator(user_posts, PROFILE_POSTS_PER_PAGE).get_page(request.GET.get('cursor'), request.GET.get('page'))
 
     context = {
         'profile_user': user, 
@@ -436,6 +498,7 @@ def public_user_profile(request, username):
     }
     return render(request, 'blog/public_user_profile.html', context)
 
+@query_budget(queries=13, rows=10)
 @login_required
 def delete_comment(request, comment_id):
     # Lấy đối tượng comment hoặc trả về lỗi 404 nếu không tìm thấy
@@ -446,22 +509,62 @@ def delete_comment(request, comment_id):
         return JsonResponse({'status': 'error', 'message': 'You do not have permission to delete this comment.'}, status=403)
 
     if request.method == 'POST':
-        comment.delete()
+        comment.delete_subtree()
         return JsonResponse({'status': 'success'})
     
     # Trả về lỗi nếu không phải là phương thức POST
     return JsonResponse({'status': 'error', 'message': 'Invalid request method.'}, status=405)
 
-
+@query_budget(queries=9, rows=130)
 @login_required
 def notification_list(request):
-    notifications = Notification.objects.filter(recipient=request.user).select_related('sender', 'comment__post')
-    # Đánh dấu tất cả là đã đọc khi người dùng truy cập trang
-    notifications.update(read=True)
-    return render(request, 'blog/notifications.html', {'notifications': notifications})
+    user_notifications = Notification.objects.filter(recipient=request.user)\
+                                             .select_related('sender__profile', 'post', 'comment__post')\
+                                             .only(*NOTIFICATION_LIST_FIELDS)
+    # Phân trang theo con trỏ trên chỉ mục (recipient, -timestamp, -id): trang nào cũng tốn như nhau
+    paginator = CursorPaginator(user_notifications, NOTIFICATIONS_PER_PAGE, ordering=('-timestamp', '-id'))
+    page = paginator.get_page(request.GET.get('cursor'), request.GET.get('page'))
+
+    # Chỉ đánh dấu đã đọc các thông báo trên trang này; lần hiển thị này vẫn giữ nổi bật
+    # (update() không phát signal nên phải tự làm mới cache tóm tắt thông báo)
+    unread_ids = [notification.id for notification in page if not notification.read]
+    if unread_ids and Notification.objects.filter(pk__in=unread_ids, read=False).update(read=True):
+        invalidate_notification_summary(request.user.id)
+    return render(request, 'blog/notifications.html', {'notifications': page})
+
+@query_budget(queries=5, rows=5)
+@login_required
+def mark_notifications_read(request):
+    """
+    "Mark all as read": đánh dấu mọi thông báo tới mốc `up_to` (thời điểm của thông báo mới
+    nhất người dùng đã thấy), dùng chỉ mục (recipient, read, -timestamp). Thông báo đến sau
+    mốc, kể cả thông báo gộp vừa được đẩy lên, vẫn chưa đọc.
+    """
+    if request.method == 'POST':
+        up_to = parse_datetime(request.POST.get('up_to', ''))
+        if up_to is not None:
+            unread = Notification.objects.filter(recipient=request.user, read=False, timestamp__lte=up_to)
+            if unread.update(read=True):
+                invalidate_notification_summary(request.user.id)
+    return redirect('blog:notification_list')
+
+@query_budget(queries=4, rows=5)
+@login_required
+def notification_open(request, notification_id):
+    """
+    Mở một thông báo từ dropdown rồi chuyển tới nội dung liên quan. Chỉ POST (form trong
+    dropdown) mới đánh dấu đã đọc: GET từ trình duyệt prefetch hay crawler không đổi trạng thái.
+    """
+    notification = get_object_or_404(Notification.objects.select_related('post', 'comment__post'),
+                                     id=notification_id, recipient=request.user)
+    if request.method == 'POST' and not notification.read:
+        notification.read = True
+        notification.save(update_fields=['read'])
+    return redirect(notification.get_absolute_url() or 'blog:notification_list')
 
 # --- Views for Admin Message Management ---
 
+@query_budget(queries=4) # rows chưa giới hạn: danh sách tin nhắn chưa phân trang
 @staff_member_required
 def contact_message_list(request):
     """
@@ -470,6 +573,7 @@ def contact_message_list(request):
     messages_list = ContactMessage.objects.all().order_by('-timestamp')
     return render(request, 'blog/admin_message_list.html', {'messages': messages_list})
 
+@query_budget(queries=5, rows=5)
 @staff_member_required
 def toggle_message_read(request, message_id):
     """
@@ -480,6 +584,7 @@ def toggle_message_read(request, message_id):
     message.save()
     return redirect('blog:contact_messages')
 
+@query_budget(queries=6, rows=5)
 @staff_member_required
 def delete_contact_message(request, message_id):
     """
@@ -492,20 +597,20 @@ def delete_contact_message(request, message_id):
     # Nếu không phải POST, có thể hiển thị trang xác nhận xóa (tùy chọn)
     return redirect('blog:contact_messages')
 
+def live_search_validators(request):
+    # Kết quả chỉ phụ thuộc câu truy vấn đã chuẩn hoá và phiên bản chỉ mục tìm kiếm
+    query = search.normalize_query(request.GET.get('q', ''))
+    return Validators(etag=make_etag('live_search', get_version(search.SEARCH_VERSION_KEY), query))
+
+@query_budget(queries=4, rows=10)
+@conditional_page(live_search_validators, vary_on_cookie=False)
 def live_search(request):
     """
     Xử lý yêu cầu tìm kiếm AJAX và trả về kết quả dưới dạng JSON.
     """
     query = request.GET.get('q', '')
-    results = []
-    if query and len(query) > 2: # Chỉ tìm kiếm khi query có hơn 2 ký tự
-        posts = Post.objects.filter(
-            Q(title__icontains=query) | Q(tags__name__icontains=query)
-        ).select_related('author').order_by('-created').distinct()[:5] # Giới hạn 5 kết quả
-
-        for post in posts:
-            results.append({
-                'title': post.title,
-                'url': post.get_absolute_url(),
-            })
-    return JsonResponse({'results': results})
+    # Gợi ý theo tiền tố được cache ngắn hạn phía server (xem search.live_search);
+    # ETag do @conditional_page gắn, trình duyệt được dùng lại kết quả trong max-age giây
+    response = JsonResponse({'results': search.live_search(query)})
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'LIVE_SEARCH_CACHE_TIMEOUT', 60))
+    return response